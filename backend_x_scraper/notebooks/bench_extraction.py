@@ -0,0 +1,99 @@
+import argparse
+import importlib.util
+import tempfile
+import time
+
+from def_fixture_replay import list_fixtures, load_fixture, write_synthetic_fixtures
+from def_tweet_extraction import count_articles, extract_tweets
+
+# Extraction benchmark: articles parsed per second for each parser backend and fixture.
+# Point --fixtures at a folder of pages captured with SCRAPE_CAPTURE_DIR (or
+# url_scraper(capture_dir=...)); without it, synthetic pages of several sizes are used.
+# Exits with an error if a backend's records differ from html.parser's or, on the
+# synthetic pages (which render every tweet's counts), if any count comes out Unknown.
+# Usage: python bench_extraction.py [--fixtures ../fixtures/] [--repeat 5]
+
+# Parser backends and the module each one needs ("html.parser" is the baseline).
+BACKENDS = {
+    "html.parser": None,
+    "lxml": "lxml",
+    "html5lib": "html5lib",
+    "lxml-fast": "lxml",
+    "selectolax": "selectolax",
+}
+
+
+def available_backends(requested=None):
+    """Returns the requested (default: all) backends whose dependency is installed."""
+    names = requested or list(BACKENDS)
+    return [
+        name
+        for name in names
+        if BACKENDS.get(name) is None or importlib.util.find_spec(BACKENDS[name])
+    ]
+
+
+def bench_fixture(html, backend, repeat):
+    """Returns (articles/sec, records extracted) for one fixture and backend."""
+    articles = count_articles(html)
+    records = extract_tweets(html, parser=backend)  # warm-up, and result check
+    start = time.perf_counter()
+    for _ in range(repeat):
+        extract_tweets(html, parser=backend)
+    elapsed = time.perf_counter() - start
+    return (articles * repeat / elapsed if elapsed else float("inf")), len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark tweet extraction.")
+    parser.add_argument("--fixtures", help="File or folder of captured page_source HTML")
+    parser.add_argument("--backends", nargs="*", help="Subset of backends to run")
+    parser.add_argument("--sizes", nargs="*", type=int, default=[10, 50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = available_backends(args.backends)
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = (
+            list_fixtures(args.fixtures)
+            if args.fixtures
+            else write_synthetic_fixtures(tmp, sizes=args.sizes)
+        )
+        pages = [(fixture.name, load_fixture(fixture)) for fixture in fixtures]
+
+    print(f"{'fixture':<40}{'articles':>9}{'backend':>14}{'records':>9}{'articles/s':>13}")
+    totals = {backend: [0, 0.0] for backend in backends}
+    mismatches = set()
+    unread_counts = set()
+    for name, html in pages:
+        reference = extract_tweets(html, parser="html.parser")
+        for backend in backends:
+            records = extract_tweets(html, parser=backend)
+            if records != reference:
+                mismatches.add(backend)
+            if not args.fixtures and any(
+                "Unknown" in (r["Likes"], r["Retweets"], r["Replies"]) for r in records
+            ):
+                unread_counts.add(backend)
+            rate, n_records = bench_fixture(html, backend, args.repeat)
+            totals[backend][0] += count_articles(html)
+            totals[backend][1] += count_articles(html) / rate if rate else 0.0
+            print(
+                f"{name[:39]:<40}{count_articles(html):>9}{backend:>14}"
+                f"{n_records:>9}{rate:>13.0f}"
+            )
+
+    print("-" * 85)
+    baseline = None
+    for backend, (articles, seconds) in totals.items():
+        rate = articles / seconds if seconds else float("inf")
+        baseline = baseline or rate
+        print(f"{backend:<20} overall {rate:>10.0f} articles/s ({rate / baseline:.2f}x)")
+    if mismatches:
+        print(f"WARNING: records differ from html.parser for: {sorted(mismatches)}")
+    else:
+        print("All backends produced identical records.")
+    if unread_counts:
+        print(f"WARNING: engagement counts came out Unknown for: {sorted(unread_counts)}")
+    if mismatches or unread_counts:
+        raise SystemExit(1)
@@ -0,0 +1,201 @@
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+from mock_x_server import start_server
+
+# End-to-end scrape benchmark against mock_x_server: for each result volume, a fresh
+# mock serves that many tweets per query and process_year runs against it with a
+# lookup, session pool and run ledger in a temporary output folder (login, scroll,
+# extract, dedupe, store to per-tag CSVs with a status index, checkpoints). Reports
+# time-to-complete and tweets/sec per volume.
+# Needs Chrome (or Playwright's Chromium with --engine playwright); no X account or
+# network access is used. Injected latency, errors and rate limits exercise the
+# backoff paths. With --queue the queries go through queue_worker's scrape jobs instead,
+# which also checks that the jobs store into the temporary folder they were queued from.
+# --refresh N then refreshes the engagement counts of N stored tweets in DOM mode from
+# the mock's status pages, and checks that every one was read and written back.
+# Usage: python bench_pipeline.py [--volumes 100 500 2000] [--engine selenium]
+#        [--urls 1] [--latency-ms 50] [--error-rate 0.02] [--rate-limit 120] [--queue]
+#        [--refresh 20]
+
+
+def run_queued(output_dir, pool, tags):
+    """
+    Queues one scrape job per lookup row of `output_dir` and works through them with a
+    JobRunner on that folder. Raises if a job's tweets or ledger entry ended up
+    anywhere else. Returns {tag: tweets added, None if failed} as process_year does.
+    """
+    from def_job_queue import JobQueue
+    from def_run_ledger import read_ledger
+    from queue_worker import JobRunner, enqueue_scrape, work
+
+    queue = JobQueue(output_dir / "job_queue.sqlite")
+    try:
+        enqueue_scrape(queue, "bench", output_dir=output_dir)
+        work(queue, JobRunner(output_dir, pool=pool), exit_when_idle=True)
+    finally:
+        queue.close()
+    yields = {}
+    for entry in read_ledger(output_dir / "run_ledger.jsonl"):
+        # A failed job is retried, so the last attempt's entry stands
+        yields[entry["tag"]] = None if entry.get("failure_reason") else entry["tweets_new"]
+    missing = [tag for tag in tags if tag not in yields]
+    unstored = [
+        tag for tag, added in yields.items() if added and not (output_dir / f"{tag}.csv").exists()
+    ]
+    if missing or unstored:
+        raise RuntimeError(
+            f"Queued scrapes did not store into {output_dir}: no ledger entry for "
+            f"{missing}, no CSV for {unstored}"
+        )
+    return yields
+
+
+def run_refresh(output_dir, account, state_path, limit, rate_per_minute):
+    """
+    Refreshes the counts of `limit` tweets stored in `output_dir` in DOM mode. The mock
+    shows each status with one more like, retweet and reply than its search did, so
+    every refreshed row must change; raises if any status was missed or left unchanged.
+    """
+    from def_engagement_refresh import refresh_engagement, select_refresh_candidates
+    from mock_x_server import NEWEST
+
+    candidates = select_refresh_candidates(
+        output_dir, max_age_days=365, limit=limit, now=NEWEST
+    )
+    metrics = refresh_engagement(
+        candidates,
+        output_dir,
+        rate_per_minute=rate_per_minute,
+        mode="dom",
+        account=account,
+        state_path=state_path,
+    )
+    print(
+        f"DOM refresh: {metrics['statuses_refreshed']}/{len(candidates)} statuses read, "
+        f"{metrics['statuses_missing']} missing, {metrics['rows_updated']} rows updated "
+        f"in {metrics['total_seconds']:.1f}s."
+    )
+    rows = sum(len(candidate["tags"]) for candidate in candidates)
+    if metrics["statuses_refreshed"] != len(candidates) or metrics["rows_updated"] != rows:
+        raise RuntimeError("The DOM refresh did not read and store every status's counts")
+
+
+def run_volume(volume, args):
+    """Runs process_year over `args.urls` queries from a mock serving `volume` tweets each."""
+    import pandas as pd
+
+    from def_process_year import process_year
+    from def_rate_limit import CircuitBreaker
+    from def_run_ledger import read_ledger
+    from def_session_pool import Account, SessionPool
+
+    server = start_server(
+        tweets=volume,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=60,
+    )
+    os.environ["X_BASE_URL"] = server.base_url
+    os.environ["SCRAPE_ENGINE"] = args.engine
+    os.environ["SCRAPE_PAGES_PER_BROWSER"] = str(args.pages)
+    urls = {
+        f"bench_{i}": f"{server.base_url}/search?q={quote(f'#bench{i}')}"
+        "&src=typed_query&f=top"
+        for i in range(args.urls)
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = Path(tmp)
+        # The mock's session cookies stay in the temporary folder, not .sessions/
+        account = Account(
+            "MOCK", "mock@example.com", "mock_user", "mock-password", session_dir=output_dir
+        )
+        # A lookup of its own, so process_year never touches the project's output/
+        pd.DataFrame(
+            {"tag": list(urls), "url": list(urls.values()), "env_suffix": "bench"}
+        ).to_csv(output_dir / "urls.csv", index=False)
+        state_path = output_dir / "rate_limit.sqlite"
+        pool = SessionPool(
+            [account], rate_per_minute=args.rate_per_minute, state_path=state_path
+        )
+        # Short cooldowns, so injected failures exercise the backoff without stalling
+        for session in pool.sessions:
+            session.breaker.close()
+            session.breaker = CircuitBreaker(
+                f"x:{account.name}", base_delay=1, max_delay=5, path=state_path
+            )
+        ledger_path = output_dir / "run_ledger.jsonl"
+
+        start = time.perf_counter()
+        try:
+            if args.queue:
+                yields = run_queued(output_dir, pool, list(urls))
+            else:
+                yields = process_year(
+                    "bench", output_dir=output_dir, pool=pool, ledger_path=ledger_path
+                )
+        finally:
+            pool.close()
+        elapsed = time.perf_counter() - start
+        entries = read_ledger(ledger_path)
+        if args.refresh:
+            run_refresh(output_dir, account, state_path, args.refresh, args.rate_per_minute)
+    server.shutdown()
+    server.server_close()
+
+    stored = sum(added or 0 for added in yields.values())
+    return {
+        "volume": volume,
+        "seconds": elapsed,
+        "seen": sum(e.get("tweets_seen") or 0 for e in entries),
+        "stored": stored,
+        "tweets_per_second": stored / elapsed if elapsed else 0.0,
+        "scrolls": sum(e.get("scroll_iterations") or 0 for e in entries),
+        "interstitials": sum(e.get("interstitials") or 0 for e in entries),
+        "failures": sum(added is None for added in yields.values()),
+        "server": dict(server.state.counters),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the scrape pipeline offline.")
+    parser.add_argument("--volumes", nargs="*", type=int, default=[100, 500, 2000])
+    parser.add_argument("--engine", choices=["selenium", "playwright"], default="selenium")
+    parser.add_argument("--urls", type=int, default=1, help="Queries per volume")
+    parser.add_argument("--pages", type=int, default=4, help="Playwright pages per browser")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, help="Mock API calls per minute")
+    parser.add_argument("--rate-per-minute", type=float, default=600)
+    parser.add_argument("--scroll-pause", type=float, default=0.5)
+    parser.add_argument("--max-idle", type=float, default=10)
+    parser.add_argument("--queue", action="store_true", help="Scrape through job queue")
+    parser.add_argument("--refresh", type=int, default=0, help="Statuses to DOM-refresh")
+    args = parser.parse_args()
+
+    # The mock renders instantly, so the production pauses would dominate the timings
+    os.environ["SCRAPE_SCROLL_PAUSE"] = str(args.scroll_pause)
+    os.environ["SCRAPE_MAX_IDLE"] = str(args.max_idle)
+    os.environ.setdefault("SCRAPE_HEADLESS", "1")
+    # The refresh draws on the account's bucket at the scrapers' configured rate
+    os.environ["SCRAPE_RATE_PER_MINUTE"] = str(args.rate_per_minute)
+
+    print(
+        f"{'volume':>8}{'seconds':>10}{'seen':>8}{'stored':>8}{'tweets/s':>10}"
+        f"{'scrolls':>9}{'blocks':>8}{'failed':>8}  server"
+    )
+    for volume in args.volumes:
+        row = run_volume(volume, args)
+        print(
+            f"{row['volume']:>8}{row['seconds']:>10.1f}{row['seen']:>8}{row['stored']:>8}"
+            f"{row['tweets_per_second']:>10.1f}{row['scrolls']:>9}"
+            f"{row['interstitials']:>8}{row['failures']:>8}  {row['server']}"
+        )
@@ -0,0 +1,50 @@
+import argparse
+import sys
+import tracemalloc
+
+from def_fixture_replay import synthetic_search_page
+from def_tweet_extraction import extract_tweets
+from def_tweet_record import TweetRecord, records_to_frame
+
+# Compares the memory held by one scraped batch stored the old way (a DataFrame of
+# Python strings with "Unknown" placeholders) and as TweetRecords / compact dtypes.
+# Usage: python bench_record_memory.py [--tweets 20000]
+
+
+def _mb(n_bytes):
+    return n_bytes / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraped-batch memory benchmark.")
+    parser.add_argument("--tweets", type=int, default=20000)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    page = synthetic_search_page(min(args.tweets, 2000))
+    template = extract_tweets(page)
+    # Rebuild the extraction dicts from fresh strings, as a long scroll loop would
+    scraped = []
+    for i in range(args.tweets):
+        record = {k: (str(v) + ".")[:-1] for k, v in template[i % len(template)].items()}
+        record["Tweet URL"] = record["Tweet URL"].rsplit("/", 1)[0] + f"/{10**18 + i}"
+        scraped.append(record)
+
+    legacy_df = pd.DataFrame(scraped)
+    legacy_df["tag"] = [("hashtag_2025" + ".")[:-1] for _ in scraped]
+    legacy_bytes = legacy_df.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    records = [TweetRecord.from_scraped(r, tag="hashtag_2025") for r in scraped]
+    records_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    typed_df = records_to_frame(records)
+    typed_bytes = typed_df.memory_usage(deep=True).sum()
+
+    print(f"Tweets: {args.tweets}")
+    print(f"Legacy DataFrame (object columns): {_mb(legacy_bytes):8.2f} MB")
+    print(f"TweetRecord list (tracemalloc):    {_mb(records_bytes):8.2f} MB")
+    print(f"Typed DataFrame (compact dtypes):  {_mb(typed_bytes):8.2f} MB")
+    print(f"DataFrame reduction: {100 * (1 - typed_bytes / legacy_bytes):.1f}%")
+    print(typed_df.dtypes.to_string(), file=sys.stderr)
@@ -0,0 +1,188 @@
+import argparse
+import csv
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Peak memory of the whole-file sentiment sweeper against the streaming mode
+# (sentiment_cron.stream_update_csv) on a synthetic tag CSV with every row unscored,
+# as after a big backfill or a merge of all tags. Each mode runs in a fresh process on
+# its own copy of the file, so peak RSS is comparable. Without --model-dir a keyword
+# classifier stands in for RoBERTa: the model's own memory does not depend on the file
+# size, so the CSV handling is what is being measured.
+# Usage: python bench_sentiment_stream.py [--rows 2000000] [--chunk-rows 50000]
+#        [--model-dir path/to/twitter-roberta-base-sentiment-latest]
+
+NOTEBOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+COLUMNS = [
+    "Tweet URL", "Created At", "Text", "Tweet ID", "Likes", "Retweets", "Replies",
+    "Hashtags", "Mentions", "URLs", "tag", "sentiment",
+]  # fmt: skip
+TEMPLATES = [
+    "Congratulations to {name} who completed her Level {level} apprenticeship with "
+    "City and Guilds! #cityandguilds #apprenticeships",
+    "Still waiting on my City & Guilds certificate after {weeks} weeks, really poor "
+    "service @cityandguilds",
+    "Our Level {level} {subject} learners sat their City and Guilds exams today. "
+    "Good luck everyone!",
+    "Proud to announce {name} has been shortlisted for the City & Guilds Lion "
+    "Awards {year} #LionAwards",
+    "Does anyone know when the City and Guilds {subject} results come out?",
+]
+NAMES = ["Jo", "Sam", "Priya", "Tom", "Aisha", "Liam", "Chen", "Grace"]
+SUBJECTS = ["plumbing", "hairdressing", "electrical", "catering", "carpentry"]
+
+
+class KeywordPipeline:
+    """Cheap stand-in for the transformers pipeline: one label per text."""
+
+    def __call__(self, texts):
+        labels = []
+        for text in texts:
+            lowered = text.lower()
+            if "poor" in lowered or "waiting" in lowered:
+                labels.append({"label": "negative"})
+            elif "congratulations" in lowered or "proud" in lowered:
+                labels.append({"label": "positive"})
+            else:
+                labels.append({"label": "neutral"})
+        return labels
+
+
+def write_synthetic_csv(path, rows, seed=0):
+    """Writes `rows` unscored tweets in the tag CSV layout."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            status_id = 1_700_000_000_000_000_000 + i
+            text = rng.choice(TEMPLATES).format(
+                name=rng.choice(NAMES),
+                level=rng.randint(1, 3),
+                weeks=rng.randint(2, 12),
+                subject=rng.choice(SUBJECTS),
+                year=rng.randint(2015, 2025),
+            )
+            created = start + timedelta(seconds=i * 17)
+            writer.writerow(
+                [
+                    f"https://x.com/user{i % 5000}/status/{status_id}",
+                    created.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                    text,
+                    status_id,
+                    rng.randint(0, 300),
+                    rng.randint(0, 50),
+                    rng.randint(0, 20),
+                    "#cityandguilds",
+                    "@cityandguilds",
+                    "",
+                    "hashtag_2025",
+                    "",
+                ]
+            )
+
+
+def run_child(mode, csv_path, chunk_rows, model_dir):
+    """Scores `csv_path` in this process and prints a JSON line of results."""
+    import pandas  # noqa: F401  (counted in the baseline, not the run)
+
+    import sentiment_cron
+    from def_profiling import peak_rss_mb
+
+    if model_dir:
+        from pathlib import Path
+
+        pipe = sentiment_cron.get_offline_pipeline(Path(model_dir))
+    else:
+        pipe = KeywordPipeline()
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "stream":
+        updated = sentiment_cron.stream_update_csv(csv_path, pipe, chunk_rows=chunk_rows)
+    else:
+        updated = sentiment_cron.sweeper_sentiment_analysis(csv_path, pipe)
+    elapsed = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "updated": int(updated or 0),
+                "seconds": elapsed,
+                "baseline_mb": baseline,
+                "peak_mb": peak_rss_mb(),
+            }
+        )
+    )
+
+
+def run_mode(mode, source_csv, workdir, chunk_rows, model_dir):
+    """Copies the synthetic file and scores it with `mode` in a fresh interpreter."""
+    csv_path = os.path.join(workdir, f"{mode}.csv")
+    shutil.copyfile(source_csv, csv_path)
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--csv", csv_path]
+    command += ["--chunk-rows", str(chunk_rows)]
+    if model_dir:
+        command += ["--model-dir", model_dir]
+    result = subprocess.run(command, cwd=NOTEBOOKS_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} run failed:\n{result.stderr[-2000:]}")
+    row = json.loads(result.stdout.strip().splitlines()[-1])
+    row["csv_path"] = csv_path
+    return row
+
+
+def label_counts(csv_path):
+    counts = {}
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            counts[row["sentiment"]] = counts.get(row["sentiment"], 0) + 1
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Whole-file vs streaming sentiment.")
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=50000)
+    parser.add_argument("--modes", nargs="*", choices=["full", "stream"],
+                        default=["full", "stream"])  # fmt: skip
+    parser.add_argument("--model-dir", help="Score with the real model instead")
+    parser.add_argument("--child", choices=["full", "stream"], help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.csv, args.chunk_rows, args.model_dir)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source_csv = os.path.join(workdir, "synthetic.csv")
+        start = time.perf_counter()
+        write_synthetic_csv(source_csv, args.rows)
+        size_mb = os.path.getsize(source_csv) / (1024 * 1024)
+        print(
+            f"Synthetic CSV: {args.rows} rows, {size_mb:.0f} MB "
+            f"(written in {time.perf_counter() - start:.0f}s)"
+        )
+
+        rows = [
+            run_mode(mode, source_csv, workdir, args.chunk_rows, args.model_dir)
+            for mode in args.modes
+        ]
+        print(f"{'mode':<8}{'updated':>10}{'seconds':>9}{'baseline MB':>13}{'peak MB':>9}")
+        for row in rows:
+            print(
+                f"{row['mode']:<8}{row['updated']:>10}{row['seconds']:>9.1f}"
+                f"{row['baseline_mb']:>13.0f}{row['peak_mb']:>9.0f}"
+            )
+        if len(rows) == 2:
+            same = label_counts(rows[0]["csv_path"]) == label_counts(rows[1]["csv_path"])
+            print(f"Label counts match: {same}")
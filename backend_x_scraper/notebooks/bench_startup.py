@@ -0,0 +1,109 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Startup benchmark for the cron entry points.
+#   1. `python -X importtime` for the scraper/sentiment modules: total import time and
+#      the slowest imports (cumulative), so heavy dependencies creeping back in show up.
+#   2. Wall-clock time of a no-op `sentiment_cron.py` tick (every row already scored),
+#      checked against a budget (default 1 second).
+# Usage: python bench_startup.py [--budget 1.0] [--repeat 3]
+
+NOTEBOOKS_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = ["def_url_scraper", "def_process_year", "sentiment_cron"]
+
+
+def import_times(module):
+    """
+    Imports `module` in a fresh interpreter with -X importtime and returns
+    (total_seconds, [(cumulative_seconds, name), ...] sorted slowest first).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=NOTEBOOKS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(last_line[0])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative) / 1e6, name[1:].rstrip()))
+    top_level = [cumulative for cumulative, name in rows if not name.startswith(" ")]
+    rows.sort(reverse=True)
+    return sum(top_level), rows
+
+
+def noop_sentiment_run(output_dir):
+    """Runs one sentiment_cron.py tick against `output_dir` and returns wall seconds."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "sentiment_cron.py", "--output-dir", output_dir],
+        cwd=NOTEBOOKS_DIR,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if "Nothing to do" not in result.stdout:
+        raise RuntimeError(
+            "sentiment_cron.py did not take the no-op path:\n" + result.stdout[-2000:]
+        )
+    return elapsed
+
+
+def write_scored_fixture(output_dir, files=40, rows=2000):
+    """Writes `files` per-tag CSVs whose rows all have sentiment already."""
+    for i in range(files):
+        with open(os.path.join(output_dir, f"tag_{i}.csv"), "w", encoding="utf-8") as f:
+            f.write("Tweet URL,Created At,Text,tag,sentiment\n")
+            for j in range(rows):
+                f.write(
+                    f"https://x.com/u/status/{i * rows + j},2025-01-01T00:00:00.000Z,"
+                    f'"Congratulations on completing your Level 2 with City & Guilds!",'
+                    f"tag_{i},positive\n"
+                )
+    with open(os.path.join(output_dir, "urls.csv"), "w", encoding="utf-8") as f:
+        f.write("tag,url,env_suffix\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark entry-point startup time.")
+    parser.add_argument("--budget", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    print("=" * 30 + " Import times (-X importtime) " + "=" * 30)
+    for module in MODULES:
+        try:
+            total, rows = import_times(module)
+        except RuntimeError as e:
+            print(f"{module}: could not import ({e})")
+            continue
+        print(f"{module}: {total:.3f}s total")
+        for cumulative, name in rows[: args.top]:
+            print(f"    {cumulative:8.3f}s  {name.strip()}")
+
+    print("=" * 30 + " No-op sentiment_cron tick " + "=" * 30)
+    with tempfile.TemporaryDirectory() as output_dir:
+        write_scored_fixture(output_dir)
+        timings = [noop_sentiment_run(output_dir) for _ in range(args.repeat)]
+    print(f"First tick (scans every file): {timings[0]:.3f}s")
+    if len(timings) > 1:
+        warm = min(timings[1:])
+        print(f"Later ticks (fingerprint cache hit): {warm:.3f}s")
+    else:
+        warm = timings[0]
+
+    status = "PASS" if warm < args.budget else "FAIL"
+    print(f"{status}: no-op tick {warm:.3f}s vs budget {args.budget:.3f}s")
+    sys.exit(0 if status == "PASS" else 1)
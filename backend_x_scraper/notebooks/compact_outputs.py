@@ -0,0 +1,97 @@
+import argparse
+import os
+from pathlib import Path
+
+import pandas as pd
+from pyprojroot import here
+
+from def_file_lock import FileLock
+from def_status_url import canonicalise_url, dedupe_key, parse_status_href
+
+# One-off clean-up of the per-tag CSVs written before status-ID deduplication:
+# rewrites every Tweet URL to its canonical https://x.com/<author>/status/<id> form,
+# fills "Unknown" Tweet IDs from the URL and keeps one row per status, preferring rows
+# that already have a sentiment score so nothing has to be re-scored.
+# Usage: python compact_outputs.py            (dry run, reports what would change)
+#        python compact_outputs.py --apply    (rewrites the files in place)
+
+
+def compact_frame(frame):
+    """Returns `frame` with canonical URLs and one row per status, in the original order."""
+    out = frame.copy()
+    out["Tweet URL"] = out["Tweet URL"].map(canonicalise_url)
+    if "Tweet ID" in out:
+        status_ids = out["Tweet URL"].map(lambda url: parse_status_href(url)[1])
+        unknown = out["Tweet ID"].isna() | (out["Tweet ID"].astype(str) == "Unknown")
+        fill = unknown & status_ids.notna()
+        out["Tweet ID"] = out["Tweet ID"].astype(object)
+        out.loc[fill, "Tweet ID"] = status_ids[fill].map(lambda s: str(int(s)))
+
+    keys = out["Tweet URL"].map(dedupe_key)
+    if "sentiment" in out:
+        # Scored rows sort first within each status, so they are the ones kept
+        unscored = out["sentiment"].isna() | (out["sentiment"].astype(str).str.strip() == "")
+        order = pd.DataFrame({"key": keys, "unscored": unscored}).sort_values(
+            "unscored", kind="stable"
+        )
+        keep = order.index[~order["key"].duplicated()]
+    else:
+        keep = out.index[~keys.duplicated()]
+    return out.loc[sorted(keep)]
+
+
+def compact_file(path, apply=False):
+    """Compacts one CSV; returns (rows before, rows after, URLs rewritten)."""
+    if apply:
+        with FileLock(path):
+            return _compact_file(path, apply)
+    return _compact_file(path, apply)
+
+
+def _compact_file(path, apply):
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    compacted = compact_frame(frame)
+    rewritten = int(
+        (frame["Tweet URL"].map(canonicalise_url) != frame["Tweet URL"]).sum()
+    )
+    if apply and (len(compacted) != len(frame) or rewritten):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        compacted.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    return len(frame), len(compacted), rewritten
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Canonicalise tweet URLs and drop duplicate statuses in the tag CSVs."
+    )
+    parser.add_argument("--output-dir", default=str(here("output")))
+    parser.add_argument(
+        "--apply", action="store_true", help="Rewrite the files (default: dry run)"
+    )
+    args = parser.parse_args()
+
+    total_before = total_after = 0
+    for path in sorted(Path(args.output_dir).glob("*.csv")):
+        if path.name == "urls.csv":
+            continue
+        try:
+            before, after, rewritten = compact_file(path, apply=args.apply)
+        except (KeyError, ValueError, OSError) as e:
+            print(f"Skipping {path.name}: {e}")
+            continue
+        total_before += before
+        total_after += after
+        if before != after or rewritten:
+            print(
+                f"{path.name}: {before} -> {after} rows "
+                f"({before - after} duplicates, {rewritten} URLs rewritten)"
+            )
+
+    action = "Compacted" if args.apply else "Would compact"
+    print(
+        f"{action} {total_before} rows to {total_after} "
+        f"({total_before - total_after} duplicate statuses)."
+    )
+    if not args.apply:
+        print("Dry run only; pass --apply to rewrite the files.")
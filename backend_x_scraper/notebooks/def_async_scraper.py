@@ -0,0 +1,519 @@
+import asyncio
+import json
+import os
+import time
+
+from def_rate_limit import (
+    ScrapeBlockedError,
+    account_breaker,
+    detect_interstitial,
+    shared_page_limiter,
+)
+from def_run_ledger import StageClock
+from def_search_url import is_chronological, latest_timeline, x_base_url
+from def_session_pool import (
+    AUTH_COOKIE,
+    main_account,
+    saved_session_cookies,
+    write_cookie_file,
+)
+from def_status_url import dedupe_key
+from def_timeline_json import SEARCH_TIMELINE_MARKER, parse_timeline_payload
+from def_tweet_extraction import extract_tweets
+from def_tweet_record import TweetRecord, records_to_frame
+from def_url_scraper import (
+    FLUSH_EVERY_TWEETS,
+    FLUSH_INTERVAL_SECONDS,
+    HIGH_WATER_OVERLAP,
+    KEEP_RENDERED_ARTICLES,
+    KNOWN_RUN_TO_STOP,
+    MAX_CONSECUTIVE_INTERSTITIALS,
+    MAX_IDLE_SECONDS,
+    MAX_INLINE_BACKOFF,
+    SCRAPE_MODES,
+    PRUNE_FUNCTION,
+    SCROLL_PAUSE_TIME,
+)
+
+# playwright is imported inside the functions below; it is only needed when this
+# engine is selected (SCRAPE_ENGINE=playwright or a direct call).
+
+# Pages scraped at once in one browser context by scrape_urls.
+DEFAULT_CONCURRENCY = 4
+
+# Requests the scraper never needs; aborting them keeps each page's memory small.
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Status link of the last rendered article; a scroll has loaded more once it changes.
+_LAST_STATUS_SCRIPT = """
+() => {
+    const times = document.querySelectorAll('article time');
+    const last = times[times.length - 1];
+    const link = last && last.closest('a');
+    return link ? link.getAttribute('href') : null;
+}
+"""
+
+def _to_playwright_cookie(cookie):
+    """Converts a cookie from Selenium's get_cookies() format to Playwright's."""
+    converted = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain", ".x.com"),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if "expiry" in cookie:
+        converted["expires"] = float(cookie["expiry"])
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        converted["sameSite"] = cookie["sameSite"]
+    return converted
+
+
+def _to_selenium_cookie(cookie):
+    """Converts a Playwright cookie to the format the session files are saved in."""
+    converted = {
+        key: cookie[key]
+        for key in ("name", "value", "domain", "path", "secure", "httpOnly", "sameSite")
+        if key in cookie
+    }
+    if cookie.get("expires", -1) > 0:
+        converted["expiry"] = int(cookie["expires"])
+    return converted
+
+
+class AsyncTimelineCollector:
+    """
+    Playwright counterpart of def_timeline_json.TimelineResponseCollector: keeps the
+    page's SearchTimeline JSON responses as they arrive, for the "network" mode.
+    """
+
+    def __init__(self, page, url_marker=SEARCH_TIMELINE_MARKER):
+        self.url_marker = url_marker
+        self.payloads = []
+        self.error_statuses = []
+        page.on("response", self._on_response)
+
+    async def _on_response(self, response):
+        if self.url_marker not in response.url:
+            return
+        if response.status >= 400:
+            self.error_statuses.append(response.status)
+            return
+        try:
+            self.payloads.append(json.loads(await response.text()))
+        except Exception as e:
+            print(f"DEBUG: Could not read timeline response: {e}")
+
+    def poll(self):
+        """Returns the payloads received since the last poll."""
+        payloads, self.payloads = self.payloads, []
+        return payloads
+
+    def take_interstitial(self):
+        """Returns "rate_limit" for HTTP 429 since the last call, "error" for other errors."""
+        statuses, self.error_statuses = self.error_statuses, []
+        if not statuses:
+            return None
+        return "rate_limit" if 429 in statuses else "error"
+
+
+async def login_context(context, account):
+    """
+    Logs a browser context in as `account`. Every page opened in the context then shares
+    the session. Saved session cookies (def_session_pool) are reused when still valid,
+    otherwise the login form is filled in and the fresh cookies saved for both engines.
+
+    Returns:
+        bool: True if the saved session was reused.
+    """
+    cookies = saved_session_cookies(account.cookie_path())
+    page = await context.new_page()
+    try:
+        if cookies:
+            await context.add_cookies([_to_playwright_cookie(c) for c in cookies])
+            await page.goto(f"{x_base_url()}/home")
+            if "/login" not in page.url and "/i/flow" not in page.url:
+                print(f"Reused saved session for account {account.name}.")
+                return True
+
+        await page.goto(f"{x_base_url()}/login")
+        await page.wait_for_selector('input[name="text"]', timeout=10_000)
+        await page.fill('input[name="text"]', account.email)
+        await page.keyboard.press("Enter")
+        try:
+            await page.wait_for_selector('input[name="password"]', timeout=5_000)
+        except Exception:
+            # Extra prompt asking for the username
+            await page.fill('input[name="text"]', account.username)
+            await page.keyboard.press("Enter")
+            await page.wait_for_selector('input[name="password"]', timeout=10_000)
+        await page.fill('input[name="password"]', account.password)
+        await page.keyboard.press("Enter")
+        try:
+            await page.wait_for_url("**/home", timeout=15_000)
+        except Exception:
+            print("Home page did not load after login, proceeding...")
+
+        saved = [_to_selenium_cookie(c) for c in await context.cookies()]
+        if any(c["name"] == AUTH_COOKIE for c in saved):
+            try:
+                write_cookie_file(saved, account.cookie_path())
+            except OSError as e:
+                print(f"Warning: could not save session cookies for {account.name}: {e}")
+        return False
+    finally:
+        await page.close()
+
+
+async def new_scraping_context(browser, account):
+    """Returns a logged-in context that skips images, media and fonts."""
+    context = await browser.new_context()
+
+    async def skip_heavy(route):
+        if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", skip_heavy)
+    await login_context(context, account)
+    return context
+
+
+async def scrape_page(
+    context,
+    target_url,
+    metrics=None,
+    parser="auto",
+    mode=None,
+    throttle=None,
+    breaker=None,
+    known_ids=None,
+    high_water=None,
+    checkpoint=None,
+    on_batch=None,
+    deadline=None,
+):
+    """
+    Scrapes one search in a new page of a logged-in context (see new_scraping_context).
+    The arguments and the returned DataFrame match def_url_scraper.url_scraper, except:
+
+    Args:
+        context: Playwright BrowserContext, shared by every page of the account.
+        throttle (coroutine function, optional): Awaited before each page load and
+            scroll; returns the seconds waited (see _shared_throttle).
+
+    Instead of a fixed pause, each scroll waits (up to SCROLL_PAUSE_TIME) for the last
+    rendered article to change. Harvested articles are pruned as in url_scraper; the
+    page is not recycled.
+    """
+    mode = mode or os.getenv("SCRAPE_MODE", "dom")
+    if mode not in SCRAPE_MODES:
+        raise ValueError(f"Unknown scrape mode '{mode}'. Expected one of {SCRAPE_MODES}.")
+    if metrics is None:
+        metrics = {}
+    clock = StageClock()
+
+    async def throttled():
+        if throttle is not None:
+            metrics["rate_limit_wait_seconds"] = metrics.get(
+                "rate_limit_wait_seconds", 0.0
+            ) + await throttle()
+
+    incremental = known_ids is not None or high_water is not None
+    known_ids = known_ids or set()
+    stop_before = high_water - HIGH_WATER_OVERLAP if high_water is not None else None
+    search_url = latest_timeline(target_url) if incremental else target_url
+    scroll_pause = float(os.getenv("SCRAPE_SCROLL_PAUSE", SCROLL_PAUSE_TIME))
+    max_idle = float(os.getenv("SCRAPE_MAX_IDLE", MAX_IDLE_SECONDS))
+
+    tweet_records = checkpoint.load_records() if checkpoint is not None else []
+    seen_statuses = {dedupe_key(r.url) for r in tweet_records}
+    if tweet_records:
+        search_url = checkpoint.resume_url(search_url)
+        metrics["resumed_records"] = len(tweet_records)
+
+    flushed = {"upto": 0, "at": time.time()}
+
+    def flush(force=False):
+        pending = tweet_records[flushed["upto"] :]
+        if on_batch is None or not pending:
+            return
+        if not force and (
+            len(pending) < FLUSH_EVERY_TWEETS
+            and time.time() - flushed["at"] < FLUSH_INTERVAL_SECONDS
+        ):
+            return
+        on_batch(records_to_frame(pending))
+        flushed["upto"] = len(tweet_records)
+        flushed["at"] = time.time()
+        metrics["flushes"] = metrics.get("flushes", 0) + 1
+
+    page = await context.new_page()
+    try:
+        collector = AsyncTimelineCollector(page) if mode == "network" else None
+        await throttled()
+        await page.goto(search_url)
+        try:
+            await page.wait_for_selector("article", timeout=10_000)
+        except Exception:
+            kind = detect_interstitial(await page.content())
+            if kind:
+                metrics["interstitials"] = metrics.get("interstitials", 0) + 1
+                if breaker is not None:
+                    breaker.record_failure(kind)
+                raise ScrapeBlockedError(f"{kind} interstitial on {search_url}")
+            raise
+        metrics["first_article_seconds"] = clock.lap()
+
+        idle_since = time.time()
+        consecutive_interstitials = 0
+        known_run = 0
+        stop_reason = None
+        while True:
+            last_status = await page.evaluate(_LAST_STATUS_SCRIPT)
+            await throttled()
+            await page.mouse.wheel(0, 500)
+            try:
+                await page.wait_for_function(
+                    f"(previous) => ({_LAST_STATUS_SCRIPT})() !== previous",
+                    arg=last_status,
+                    timeout=scroll_pause * 1000,
+                )
+            except Exception:
+                pass  # nothing new rendered within the pause
+            metrics["scroll_iterations"] = metrics.get("scroll_iterations", 0) + 1
+
+            parse_start = time.perf_counter()
+            if collector is not None:
+                records = []
+                for payload in collector.poll():
+                    records.extend(parse_timeline_payload(payload))
+                kind = collector.take_interstitial()
+            else:
+                page_source = await page.content()
+                # Parse off the event loop so the other pages keep scrolling
+                records = await asyncio.to_thread(extract_tweets, page_source, parser)
+                kind = detect_interstitial(page_source)
+
+            batch_start = len(tweet_records)
+            for record in records:
+                key = dedupe_key(record["Tweet URL"])
+                if key in seen_statuses:
+                    continue
+                seen_statuses.add(key)
+                tweet_record = TweetRecord.from_scraped(record)
+                tweet_records.append(tweet_record)
+                if not incremental:
+                    continue
+                if tweet_record.status_id in known_ids:
+                    known_run += 1
+                    metrics["tweets_known"] = metrics.get("tweets_known", 0) + 1
+                else:
+                    known_run = 0
+                if known_run >= KNOWN_RUN_TO_STOP:
+                    stop_reason = "known_run"
+                elif (
+                    stop_before is not None
+                    and tweet_record.created_at is not None
+                    and tweet_record.created_at < stop_before
+                ):
+                    stop_reason = "high_water"
+            metrics["parse_seconds"] = metrics.get("parse_seconds", 0.0) + (
+                time.perf_counter() - parse_start
+            )
+            new_tweet_count = len(tweet_records) - batch_start
+            if checkpoint is not None and new_tweet_count:
+                checkpoint.save(
+                    tweet_records[batch_start:],
+                    tweet_records,
+                    chronological=is_chronological(search_url),
+                )
+            flush()
+
+            if kind:
+                consecutive_interstitials += 1
+                metrics["interstitials"] = metrics.get("interstitials", 0) + 1
+                delay = breaker.record_failure(kind) if breaker is not None else 60
+                print(f"DEBUG: X returned a {kind} page; circuit open for {delay:.0f}s.")
+                if (
+                    consecutive_interstitials >= MAX_CONSECUTIVE_INTERSTITIALS
+                    or delay > MAX_INLINE_BACKOFF
+                ):
+                    raise ScrapeBlockedError(f"{kind} interstitial on {target_url}")
+                await asyncio.sleep(delay)
+                metrics["backoff_seconds"] = metrics.get("backoff_seconds", 0.0) + delay
+                idle_since += delay
+            else:
+                consecutive_interstitials = 0
+
+            if stop_reason:
+                break
+            if deadline is not None and time.time() >= deadline:
+                stop_reason = "deadline"
+                break
+            if new_tweet_count:
+                idle_since = time.time()
+            elif time.time() - idle_since >= max_idle:
+                stop_reason = "idle"
+                break
+
+            try:
+                await page.evaluate(PRUNE_FUNCTION, KEEP_RENDERED_ARTICLES)
+            except Exception as e:
+                print(f"DEBUG: Could not prune articles: {e}")
+
+        metrics["scroll_seconds"] = clock.lap()
+        metrics["tweets_seen"] = len(tweet_records)
+        metrics["stop_reason"] = stop_reason
+        print(f"Scraped {len(tweet_records)} tweets ({stop_reason}) from {target_url}")
+        flush(force=True)
+        return records_to_frame(tweet_records)
+    finally:
+        await page.close()
+        try:
+            flush(force=True)
+        except Exception as e:
+            print(f"Error flushing harvested tweets for {target_url}: {e}")
+        metrics["total_seconds"] = clock.total()
+
+
+def _shared_throttle(limiter):
+    """
+    Returns a coroutine function taking one token from `limiter` per call. The blocking
+    SQLite-backed bucket runs in a worker thread, one call at a time.
+    """
+    lock = asyncio.Lock()
+
+    async def throttle():
+        async with lock:
+            return await asyncio.to_thread(limiter.acquire)
+
+    return throttle
+
+
+async def scrape_urls_async(
+    target_urls,
+    concurrency=DEFAULT_CONCURRENCY,
+    account=None,
+    limiter=None,
+    breaker=None,
+    headless=True,
+    metrics=None,
+    url_kwargs=None,
+    **page_kwargs,
+):
+    """
+    Scrapes many searches as pages of one browser context, at most `concurrency` at a
+    time. Login happens once for the context; page loads and scrolls of all pages draw
+    from the account's shared token bucket.
+
+    Args:
+        target_urls (list[str]): Search URLs to scrape.
+        concurrency (int): Pages scrolled at once.
+        account (Account, optional): Account to scrape as (defaults to the main account).
+        limiter (TokenBucket, optional): Defaults to the account's shared bucket.
+        breaker (CircuitBreaker, optional): Defaults to the account's shared breaker.
+        headless (bool): Run Chromium without a window.
+        metrics (dict, optional): {url: run-ledger record} filled in per URL.
+        url_kwargs (dict, optional): {url: scrape_page arguments for that URL only}, such
+            as its checkpoint, known_ids or on_batch; a "metrics" entry is used as the
+            URL's run-ledger record.
+        **page_kwargs: Passed to scrape_page for every URL (parser, mode, deadline, ...).
+
+    Returns:
+        dict: {url: DataFrame of its tweets, or the exception its scrape raised}.
+    """
+    from playwright.async_api import async_playwright
+
+    account = account or main_account()
+    owned = []  # opened here, so closed here
+    if limiter is None:
+        limiter = shared_page_limiter(account=account.name)
+        owned.append(limiter)
+    if breaker is None:
+        breaker = account_breaker(account.name)
+        owned.append(breaker)
+    metrics = metrics if metrics is not None else {}
+    url_kwargs = {url: dict(kwargs) for url, kwargs in (url_kwargs or {}).items()}
+    for url, kwargs in url_kwargs.items():
+        if "metrics" in kwargs:
+            metrics[url] = kwargs.pop("metrics")
+    throttle = _shared_throttle(limiter)
+    semaphore = asyncio.Semaphore(concurrency)
+    clock = StageClock()
+
+    async def scrape_one(context, url):
+        async with semaphore:
+            url_metrics = metrics.setdefault(url, {})
+            url_metrics.update(driver_start_seconds=startup, login_seconds=login)
+            try:
+                return await scrape_page(
+                    context,
+                    url,
+                    metrics=url_metrics,
+                    throttle=throttle,
+                    breaker=breaker,
+                    **{**page_kwargs, **url_kwargs.get(url, {})},
+                )
+            except Exception as e:
+                print(f"Error scraping {url}: {e}")
+                return e
+
+    try:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch(headless=headless)
+            startup = clock.lap()
+            try:
+                await throttle()
+                context = await new_scraping_context(browser, account)
+                login = clock.lap()
+                results = await asyncio.gather(
+                    *(scrape_one(context, u) for u in target_urls)
+                )
+            finally:
+                await browser.close()
+        if not any(isinstance(r, Exception) for r in results) and results:
+            if not any(m.get("interstitials") for m in metrics.values()):
+                breaker.record_success()
+    finally:
+        for resource in owned:
+            resource.close()
+    return dict(zip(target_urls, results))
+
+
+def scrape_urls(target_urls, **kwargs):
+    """Synchronous wrapper around scrape_urls_async (see there for the arguments)."""
+    return asyncio.run(scrape_urls_async(target_urls, **kwargs))
+
+
+def url_scraper(
+    target_url,
+    metrics=None,
+    limiter=None,
+    breaker=None,
+    account=None,
+    capture_dir=None,
+    **page_kwargs,
+):
+    """
+    Drop-in replacement for def_url_scraper.url_scraper using Playwright: scrapes one
+    URL in its own browser and returns its DataFrame, raising the scrape's exception.
+    capture_dir is not supported and ignored. For many URLs use scrape_urls, which
+    shares one browser and login between them.
+    """
+    results = scrape_urls(
+        [target_url],
+        concurrency=1,
+        account=account,
+        limiter=limiter,
+        breaker=breaker,
+        metrics={target_url: metrics if metrics is not None else {}},
+        **page_kwargs,
+    )
+    result = results[target_url]
+    if isinstance(result, Exception):
+        raise result
+    return result
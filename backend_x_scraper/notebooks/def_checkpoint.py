@@ -0,0 +1,120 @@
+import csv
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from pyprojroot import here
+
+from def_search_url import is_chronological, narrow_until
+from def_tweet_record import TweetRecord, csv_ready, records_to_frame
+
+
+def default_checkpoint_dir():
+    """Returns the folder scrape checkpoints are kept in (output/checkpoints)."""
+    return Path(str(here("output"))) / "checkpoints"
+
+
+class ScrapeCheckpoint:
+    """
+    Progress of one search URL, kept on disk so a crashed or timed-out scrape can be
+    resumed instead of restarted. Two files per URL:
+
+    - <tag>-<hash>.json: target URL, oldest Created At harvested, record count and
+      whether the scrape ran on a chronological (Latest) timeline.
+    - <tag>-<hash>.csv: the records harvested so far, appended after every scroll.
+
+    A retry reloads the records. A chronological scrape continues below the oldest
+    harvested tweet (see resume_url); a Top-tab scrape starts its search again and
+    relies on the reloaded records to skip what it already has. The files are removed
+    once the tweets are stored.
+    """
+
+    def __init__(self, tag, target_url, directory=None):
+        self.tag = tag
+        self.target_url = target_url
+        directory = Path(directory) if directory else default_checkpoint_dir()
+        key = hashlib.sha1(target_url.encode("utf-8")).hexdigest()[:10]
+        self.json_path = directory / f"{tag}-{key}.json"
+        self.records_path = directory / f"{tag}-{key}.csv"
+
+    def state(self):
+        """Returns the saved progress dict, or None if there is no checkpoint."""
+        try:
+            return json.loads(self.json_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def oldest_created_at(self):
+        state = self.state()
+        return state.get("oldest_created_at") if state else None
+
+    def resume_url(self, search_url):
+        """
+        Returns the URL to continue `search_url` from: below the oldest tweet harvested
+        so far if both the saved scrape and `search_url` are chronological, otherwise
+        `search_url` itself (newer unharvested tweets may sit anywhere in a Top tab).
+        """
+        state = self.state() or {}
+        oldest = state.get("oldest_created_at")
+        if not (oldest and state.get("chronological") and is_chronological(search_url)):
+            return search_url
+        return narrow_until(search_url, datetime.fromisoformat(oldest))
+
+    def load_records(self):
+        """Returns the TweetRecords harvested by earlier attempts."""
+        if not self.records_path.is_file():
+            return []
+        with open(self.records_path, newline="", encoding="utf-8") as f:
+            return [TweetRecord.from_scraped(row) for row in csv.DictReader(f)]
+
+    def save(self, new_records, all_records, chronological=False):
+        """
+        Appends `new_records` to the partial records file and updates the progress file
+        from `all_records` (everything harvested for this URL so far). `chronological`
+        records whether they were harvested newest-first (see is_chronological).
+        """
+        self.json_path.parent.mkdir(parents=True, exist_ok=True)
+        if new_records:
+            write_header = not self.records_path.is_file()
+            frame = csv_ready(records_to_frame(new_records))
+            frame.to_csv(self.records_path, mode="a", header=write_header, index=False)
+
+        oldest = min((r.created_at for r in all_records if r.created_at), default=None)
+        state = {
+            "tag": self.tag,
+            "target_url": self.target_url,
+            "oldest_created_at": oldest.isoformat() if oldest else None,
+            "records": len(all_records),
+            "chronological": chronological,
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        tmp_path = self.json_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp_path, self.json_path)
+
+    def clear(self):
+        """Removes the checkpoint once its tweets have been stored."""
+        for path in (self.json_path, self.records_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def prune_checkpoints(directory=None, max_age_days=14):
+    """
+    Deletes checkpoints not updated for `max_age_days` (e.g. for cron URLs whose date
+    window has since moved on). Returns the number of files removed.
+    """
+    directory = Path(directory) if directory else default_checkpoint_dir()
+    if not directory.is_dir():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in directory.iterdir():
+        if path.suffix in (".json", ".csv") and path.stat().st_mtime < cutoff:
+            path.unlink()
+            removed += 1
+    return removed
@@ -0,0 +1,153 @@
+import html
+import json
+import re
+
+from def_search_url import latest_timeline, search_query, with_query
+from def_status_url import parse_status_href
+
+# Operators that bound a search's date window; they are shared by a compound query's
+# members and kept outside its OR group.
+_WINDOW_RE = re.compile(r"\b(?:since|until|since_time|until_time):\S+", re.IGNORECASE)
+_LEADING_MENTIONS_RE = re.compile(r"^\s*((?:@\w+\s*)+)")
+
+
+def search_term(url):
+    """
+    Returns the search term of a single-term search URL, without its date window:
+    "(%23cityandguilds) until%3A2025-10-18 since%3A2025-10-03" -> "#cityandguilds".
+    """
+    term = _WINDOW_RE.sub("", search_query(url)).strip()
+    while term.startswith("(") and term.endswith(")"):
+        term = term[1:-1].strip()
+    return term
+
+
+def compound_url(urls):
+    """
+    Combines single-term search URLs over the same date window into one OR search,
+    e.g. "(#cityandguilds OR @cityandguilds OR to:cityandguilds) until:... since:...".
+    The other URL parameters (src) are taken from the first URL. The search is always
+    on the Latest (f=live) timeline: the Top tab ranks and thins out the results of a
+    broad OR query, and only a chronological search can be resumed by time (see
+    def_search_url.is_chronological).
+    """
+    terms = [search_term(url) for url in urls]
+    window = " ".join(_WINDOW_RE.findall(search_query(urls[0])))
+    return latest_timeline(with_query(urls[0], f"({' OR '.join(terms)}) {window}".strip()))
+
+
+def encode_members(members):
+    """Serialises {tag: search term} for the lookup CSV's members column."""
+    return json.dumps(members)
+
+
+def decode_members(value):
+    """Returns the {tag: search term} of a compound lookup row, or None for a plain row."""
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return json.loads(value)
+
+
+def _handles(value):
+    if not isinstance(value, str):
+        return []
+    return [h.strip().lstrip("@").lower() for h in value.split(",") if h.strip()]
+
+
+def term_matcher(term):
+    """
+    Returns a predicate telling whether a scraped record (a dict or DataFrame row with
+    Tweet URL, Text, Hashtags and Mentions) matches one search term, so tweets from a
+    compound search can be attributed to the searches they would have come from.
+
+    Supported terms: #hashtag, @handle, from:handle, to:handle, "exact phrase" and
+    plain words. Matching is case-insensitive and, like X's own matching, approximate:
+    DOM records list the author and "Replying to" handles among their Mentions, network
+    records start a reply's Text with the handles it replies to.
+    """
+    lowered = term.lower()
+    if lowered.startswith("from:"):
+        handle = lowered[len("from:") :].lstrip("@")
+        return lambda record: _author(record) == handle
+    if lowered.startswith("to:"):
+        handle = lowered[len("to:") :].lstrip("@")
+        return lambda record: handle in _reply_handles(record)
+    if lowered.startswith("@"):
+        handle = lowered[1:]
+        mention_re = re.compile(rf"@{re.escape(handle)}\b", re.IGNORECASE)
+        return lambda record: bool(
+            mention_re.search(_text(record)) or handle in _reply_handles(record)
+        )
+    if lowered.startswith("#"):
+        hashtag = lowered[1:]
+        hashtag_re = re.compile(rf"#{re.escape(hashtag)}\b", re.IGNORECASE)
+        return lambda record: bool(
+            hashtag in [h.lstrip("#") for h in _handles(record.get("Hashtags"))]
+            or hashtag_re.search(_text(record))
+        )
+    if lowered.startswith('"') and lowered.endswith('"'):
+        words = lowered.strip('"').split()
+    else:
+        words = [lowered]
+    # Words need whitespace between them, symbols such as "&" or "+" may touch them. The
+    # outer edges are left open: DOM text runs link text into its neighbours
+    # ("withCity and Guilds!").
+    pattern = re.escape(words[0])
+    for previous, word in zip(words, words[1:]):
+        gap = r"\s+" if previous[-1].isalnum() and word[0].isalnum() else r"\s*"
+        pattern += gap + re.escape(word)
+    phrase_re = re.compile(pattern, re.IGNORECASE)
+    return lambda record: bool(phrase_re.search(_text(record)))
+
+
+def _text(record):
+    text = record.get("Text")
+    return html.unescape(text) if isinstance(text, str) else ""
+
+
+def _author(record):
+    author, _ = parse_status_href(record.get("Tweet URL"))
+    return author.lower() if author else None
+
+
+def _reply_handles(record):
+    """Returns the handles a tweet replies to (see term_matcher)."""
+    text = _text(record)
+    leading = _LEADING_MENTIONS_RE.match(text)
+    handles = set(_handles(leading.group(1).replace(" ", ",")) if leading else [])
+    # DOM mentions hold the author's handle and the "Replying to" handles, which are
+    # not part of the text; any handle listed more often than that is a reply target.
+    listed = _handles(record.get("Mentions"))
+    in_text = _handles(",".join(re.findall(r"@\w+", text)))
+    author = _author(record)
+    for handle in set(listed):
+        extra = listed.count(handle) - in_text.count(handle) - (handle == author)
+        if extra > 0:
+            handles.add(handle)
+    return handles
+
+
+def attribute_tweets(frame, members, unattributed_tag=None):
+    """
+    Splits the tweets of a compound search between its member tags.
+
+    Args:
+        frame (pd.DataFrame): Scraped tweets (see def_tweet_record.records_to_frame).
+        members (dict): {tag: search term} of the compound search, in priority order.
+        unattributed_tag (str, optional): Tag to store tweets matching no term under.
+
+    Returns:
+        tuple: ({tag: DataFrame of the tweets matching its term}, number of tweets that
+        matched no term). A tweet matching several terms is returned for each of them.
+        Unmatched tweets (X also matches quoted tweets and link cards, which are not
+        scraped) are returned under `unattributed_tag` if given, else left out, so they
+        never inflate a member's counts.
+    """
+    matchers = {tag: term_matcher(term) for tag, term in members.items()}
+    rows = frame.to_dict("records")
+    matched = {tag: [m(row) for row in rows] for tag, m in matchers.items()}
+    unmatched = [not any(hits) for hits in zip(*matched.values())] if rows else []
+    if unattributed_tag is not None:
+        matched[unattributed_tag] = unmatched
+    split = {tag: frame[hits] for tag, hits in matched.items() if any(hits)}
+    return split, sum(unmatched)
@@ -0,0 +1,163 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from pyprojroot import here
+
+# Resolved chromedriver location, shared by every url_scraper call in this process.
+_RESOLVED_DRIVER_PATH = None
+
+_VERSION_RE = re.compile(r"(\d+\.\d+\.\d+(?:\.\d+)?)")
+
+
+def default_cache_path():
+    """Returns the path of the chromedriver cache file (.driver_cache/chromedriver.json)."""
+    return Path(str(here(".driver_cache"))) / "chromedriver.json"
+
+
+def _run_version_command(command):
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = _VERSION_RE.search(result.stdout or "")
+    return match.group(1) if match else None
+
+
+def installed_chrome_version():
+    """
+    Returns the installed Google Chrome version (e.g. "135.0.7049.85"), or None if it
+    cannot be determined. Never touches the network.
+    """
+    if sys.platform.startswith("win"):
+        import winreg
+
+        for hive, key_path in [
+            (winreg.HKEY_CURRENT_USER, r"Software\Google\Chrome\BLBeacon"),
+            (winreg.HKEY_LOCAL_MACHINE, r"Software\Google\Chrome\BLBeacon"),
+            (
+                winreg.HKEY_LOCAL_MACHINE,
+                r"Software\WOW6432Node\Google\Chrome\BLBeacon",
+            ),
+        ]:
+            try:
+                with winreg.OpenKey(hive, key_path) as key:
+                    return str(winreg.QueryValueEx(key, "version")[0])
+            except OSError:
+                continue
+        return None
+
+    if sys.platform == "darwin":
+        candidates = [
+            ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"]
+        ]
+    else:
+        candidates = [
+            ["google-chrome", "--version"],
+            ["google-chrome-stable", "--version"],
+            ["chromium", "--version"],
+            ["chromium-browser", "--version"],
+        ]
+    for command in candidates:
+        version = _run_version_command(command)
+        if version:
+            return version
+    return None
+
+
+def _build_key(version):
+    """Chromedriver compatibility key: MAJOR.MINOR.BUILD of a Chrome version string."""
+    return ".".join(version.split(".")[:3]) if version else None
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_cache(cache_path, entry):
+    # One temp file per process, so two processes resolving at once never share one
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        os.replace(tmp_path, cache_path)  # atomic, so concurrent processes never see half a file
+    except OSError as e:
+        # The driver is resolved either way; without the cache the next run resolves again
+        print(f"Warning: could not write the chromedriver cache {cache_path} ({e}).")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def resolve_chromedriver(cache_path=None, force=False):
+    """
+    Returns the path to a chromedriver binary matching the installed Chrome.
+
+    Resolution order:
+      1. CHROMEDRIVER_PATH environment variable (pinned binary, never re-resolved).
+      2. The path already resolved by this process.
+      3. The on-disk cache, as long as the installed Chrome build is unchanged.
+      4. ChromeDriverManager().install() (may hit the network); the result is cached.
+    If step 4 fails (e.g. no network) but a cached driver exists, that driver is used.
+
+    Args:
+        cache_path (str or Path, optional): Cache file (default .driver_cache/chromedriver.json).
+        force (bool): Skip the caches and re-resolve with ChromeDriverManager.
+    """
+    global _RESOLVED_DRIVER_PATH
+
+    pinned = os.getenv("CHROMEDRIVER_PATH")
+    if pinned:
+        return pinned
+    if _RESOLVED_DRIVER_PATH and not force:
+        return _RESOLVED_DRIVER_PATH
+
+    cache_path = Path(cache_path) if cache_path else default_cache_path()
+    cached = _read_cache(cache_path)
+    cached_path = cached.get("driver_path")
+    cached_usable = bool(cached_path) and os.path.isfile(cached_path)
+    chrome_version = installed_chrome_version()
+
+    if cached_usable and not force:
+        # An undetectable Chrome version is treated as unchanged so offline runs keep working
+        if chrome_version is None or _build_key(chrome_version) == _build_key(
+            cached.get("chrome_version")
+        ):
+            _RESOLVED_DRIVER_PATH = cached_path
+            return cached_path
+        print(
+            f"Chrome version changed ({cached.get('chrome_version')} -> {chrome_version}); "
+            "re-resolving chromedriver."
+        )
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+
+        driver_path = ChromeDriverManager().install()
+    except Exception as e:
+        if cached_usable:
+            print(f"Warning: chromedriver resolution failed ({e}); using cached driver.")
+            _RESOLVED_DRIVER_PATH = cached_path
+            return cached_path
+        raise
+
+    _write_cache(
+        cache_path,
+        {
+            "driver_path": driver_path,
+            "driver_version": _run_version_command([driver_path, "--version"]),
+            "chrome_version": chrome_version,
+            "resolved_at": datetime.now().isoformat(timespec="seconds"),
+        },
+    )
+    _RESOLVED_DRIVER_PATH = driver_path
+    return driver_path
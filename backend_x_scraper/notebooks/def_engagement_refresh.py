@@ -0,0 +1,290 @@
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from def_file_lock import FileLock
+from def_rate_limit import (
+    TokenBucket,
+    account_breaker,
+    detect_interstitial,
+    shared_page_limiter,
+)
+from def_run_ledger import StageClock
+from def_search_url import x_base_url
+from def_status_url import canonical_status_url, parse_status_href
+from def_timeline_json import TimelineResponseCollector, parse_timeline_payload
+from def_tweet_extraction import extract_tweets
+from def_tweet_record import parse_count, parse_created_at
+
+# GraphQL operation that returns a single status (and its replies).
+TWEET_DETAIL_MARKER = "TweetDetail"
+
+# Columns the refresh updates in place; everything else in a row is left untouched.
+ENGAGEMENT_COLUMNS = ("Likes", "Retweets", "Replies")
+
+
+def select_refresh_candidates(
+    output_dir, max_age_days=14, limit=200, now=None, ignore_files=("urls.csv",)
+):
+    """
+    Picks the stored statuses whose engagement counts are worth refreshing: those
+    created in the last `max_age_days`, youngest first (their counts change most).
+    A status stored in several tag files is visited once and updated in all of them.
+
+    Returns:
+        list[dict]: Up to `limit` candidates with keys tags, status_id, url, created_at.
+    """
+    import pandas as pd
+
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=max_age_days)
+    candidates = {}
+    for filename in sorted(os.listdir(output_dir)):
+        if not filename.endswith(".csv") or filename in ignore_files:
+            continue
+        try:
+            frame = pd.read_csv(
+                os.path.join(output_dir, filename), usecols=["Tweet URL", "Created At"]
+            )
+        except (ValueError, OSError) as e:
+            print(f"Skipping {filename} while selecting refresh candidates: {e}")
+            continue
+        tag = filename[: -len(".csv")]
+        for url, created in zip(frame["Tweet URL"], frame["Created At"]):
+            created_at = parse_created_at(created)
+            author, status_id = parse_status_href(url)
+            if created_at is None or status_id is None or created_at < cutoff:
+                continue
+            candidate = candidates.setdefault(
+                status_id,
+                {
+                    "tags": [],
+                    "status_id": status_id,
+                    "url": canonical_status_url(author, status_id),
+                    "created_at": created_at,
+                },
+            )
+            if tag not in candidate["tags"]:
+                candidate["tags"].append(tag)
+    ordered = sorted(candidates.values(), key=lambda c: c["created_at"], reverse=True)
+    return ordered[:limit]
+
+
+def _status_page_url(candidate):
+    """Returns the page a candidate's counts are read from, on x_base_url()'s host."""
+    return candidate["url"].replace("https://x.com", x_base_url(), 1)
+
+
+def _find_status(records, status_id):
+    for record in records:
+        _, record_id = parse_status_href(record.get("Tweet URL"))
+        if record_id == status_id or str(record.get("Tweet ID")) == str(status_id):
+            return record
+    return None
+
+
+def read_status_engagement(driver, status_url, status_id, collector=None, parser="auto"):
+    """
+    Opens one status page in the current tab and returns its engagement counts as
+    {"Likes": int, "Retweets": int, "Replies": int} (missing counts are None),
+    {"interstitial": kind} if X served a rate-limit/error page instead, or None if the
+    status could not be found (deleted, protected, or not rendered) or none of its
+    counts could be read.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    driver.get(status_url)
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_all_elements_located((By.TAG_NAME, "article"))
+        )
+    except Exception:
+        kind = detect_interstitial(driver.page_source)
+        if kind:
+            return {"interstitial": kind}
+        return None
+
+    record = None
+    if collector is not None:
+        for payload in collector.poll():
+            record = record or _find_status(parse_timeline_payload(payload), status_id)
+    if record is None:
+        record = _find_status(extract_tweets(driver.page_source, parser=parser), status_id)
+    if record is None:
+        return None
+    counts = {column: parse_count(record.get(column)) for column in ENGAGEMENT_COLUMNS}
+    if all(value is None for value in counts.values()):
+        return None
+    return counts
+
+
+def apply_engagement_updates(output_dir, updates):
+    """
+    Writes refreshed counts into the per-tag CSVs in place. Only the engagement columns
+    of rows whose status was refreshed change; counts that came back None are kept, and
+    a file none of whose counts changed is not rewritten. Each file is rewritten under
+    its FileLock (def_file_lock), as the scrapers and scorers do.
+
+    Args:
+        output_dir (str or Path): Folder holding the per-tag CSVs.
+        updates (dict): {tag: {status_id: {"Likes": .., "Retweets": .., "Replies": ..}}}
+
+    Returns:
+        int: The number of rows whose counts changed.
+    """
+    import pandas as pd
+
+    updated_rows = 0
+    for tag, by_status in updates.items():
+        if not by_status:
+            continue
+        path = Path(output_dir) / f"{tag}.csv"
+        if not path.exists():
+            continue
+        with FileLock(path):
+            frame = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+            status_ids = frame["Tweet URL"].map(lambda url: parse_status_href(url)[1])
+            changed = 0
+            for position, status_id in enumerate(status_ids):
+                counts = by_status.get(status_id)
+                if not counts:
+                    continue
+                row_changed = False
+                for column, value in counts.items():
+                    location = frame.columns.get_loc(column)
+                    if value is not None and frame.iat[position, location] != str(value):
+                        frame.iat[position, location] = str(value)
+                        row_changed = True
+                changed += row_changed
+            if changed:
+                # Write to a temporary file first so a crash never truncates the tag file
+                tmp_path = path.with_suffix(".csv.tmp")
+                frame.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, path)
+                updated_rows += changed
+    return updated_rows
+
+
+def refresh_engagement(
+    candidates,
+    output_dir,
+    rate_per_minute=20,
+    batch_size=25,
+    mode=None,
+    parser="auto",
+    deadline=None,
+    metrics=None,
+    account=None,
+    state_path=None,
+):
+    """
+    Revisits `candidates` (see select_refresh_candidates) in one logged-in browser
+    session, one tab, reading each status page under the token bucket shared with the
+    scrapers (at their SCRAPE_RATE_PER_MINUTE, so every process agrees on its refill
+    rate) and, within that, at most `rate_per_minute` of its own. Counts are written
+    back after every `batch_size` statuses so progress survives a crash. Rate-limit/error
+    pages open the shared circuit breaker and end the refresh early.
+
+    Args:
+        candidates (list[dict]): Statuses to refresh, in priority order.
+        output_dir (str or Path): Folder holding the per-tag CSVs.
+        rate_per_minute (float): Maximum status page loads per minute.
+        batch_size (int): Statuses refreshed between writes to the CSVs.
+        mode (str, optional): "dom" or "network" (see def_url_scraper.SCRAPE_MODES);
+            falls back to REFRESH_MODE, then "network", which reads exact counts from
+            TweetDetail. DOM mode reads the rendered buttons, which X abbreviates
+            ("1.2K") and leaves empty for zero (a status whose counts cannot be read
+            is counted as missing).
+        parser (str): DOM extraction backend (see def_tweet_extraction).
+        deadline (float, optional): time.time() after which no new batch is started.
+        metrics (dict, optional): Filled with refreshed/missing/updated counts and timings.
+        account (Account, optional): Account to browse as (defaults to the main account).
+        state_path (str or Path, optional): Rate limit state shared with the scrapers
+            (default: output/rate_limit.sqlite).
+
+    Returns:
+        dict: The filled-in metrics.
+    """
+    from def_session_pool import login_session, main_account
+    from def_url_scraper import SCRAPE_MODES, start_driver
+
+    mode = mode or os.getenv("REFRESH_MODE", "network")
+    if mode not in SCRAPE_MODES:
+        raise ValueError(f"Unknown scrape mode '{mode}'. Expected one of {SCRAPE_MODES}.")
+    if metrics is None:
+        metrics = {}
+    metrics.update(
+        statuses_refreshed=0, statuses_missing=0, rows_updated=0, interstitials=0
+    )
+    if not candidates:
+        return metrics
+
+    account = account or main_account()
+    bucket = shared_page_limiter(path=state_path, account=account.name)
+    pace = TokenBucket(rate_per_minute / 60.0)
+    breaker = account_breaker(account.name, path=state_path)
+    clock = StageClock()
+
+    driver = start_driver(performance_log=(mode == "network"))
+    try:
+        login_session(driver, account)
+        metrics["login_seconds"] = clock.lap()
+        collector = (
+            TimelineResponseCollector(driver, TWEET_DETAIL_MARKER)
+            if mode == "network"
+            else None
+        )
+
+        blocked = False
+        for start in range(0, len(candidates), batch_size):
+            if deadline is not None and time.time() >= deadline:
+                print("Refresh deadline reached; stopping before the next batch.")
+                break
+            if breaker.remaining() > 0:
+                print(f"Circuit open for {breaker.remaining():.0f}s; stopping the refresh.")
+                break
+            updates = {}
+            for candidate in candidates[start : start + batch_size]:
+                pace.acquire()
+                bucket.acquire()
+                counts = read_status_engagement(
+                    driver,
+                    _status_page_url(candidate),
+                    candidate["status_id"],
+                    collector=collector,
+                    parser=parser,
+                )
+                if counts is None:
+                    metrics["statuses_missing"] += 1
+                    continue
+                if "interstitial" in counts:
+                    metrics["interstitials"] += 1
+                    kind = counts["interstitial"]
+                    delay = breaker.record_failure(kind)
+                    print(f"X returned a {kind} page; circuit open for {delay:.0f}s.")
+                    blocked = True
+                    break
+                metrics["statuses_refreshed"] += 1
+                for tag in candidate["tags"]:
+                    updates.setdefault(tag, {})[candidate["status_id"]] = counts
+            written = apply_engagement_updates(output_dir, updates)
+            metrics["rows_updated"] += written
+            print(
+                f"Refreshed batch {start // batch_size + 1}: "
+                f"{metrics['statuses_refreshed']} statuses so far, {written} rows updated."
+            )
+            if blocked:
+                break
+        if not blocked and metrics["statuses_refreshed"]:
+            breaker.record_success()
+        metrics["refresh_seconds"] = clock.lap()
+        metrics["rate_limit_wait_seconds"] = pace.waited_seconds + bucket.waited_seconds
+    finally:
+        driver.quit()
+        bucket.close()
+        breaker.close()
+        metrics["total_seconds"] = clock.total()
+    return metrics
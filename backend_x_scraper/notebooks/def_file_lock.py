@@ -0,0 +1,137 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from def_job_queue import worker_name
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS file_locks (
+    name    TEXT PRIMARY KEY,  -- file name within the folder
+    owner   TEXT NOT NULL,     -- host, PID and thread of the holder
+    expires REAL NOT NULL      -- wall-clock time, comparable across hosts
+);
+"""
+
+# How long a held lock survives without being renewed. The holder renews it from a
+# background thread, so this only decides how soon a crashed holder's lock is freed.
+LOCK_LEASE_SECONDS = 120
+
+
+def lock_db_path(folder):
+    """Returns the lock database for the files in `folder` (<folder>/file_locks.sqlite)."""
+    return Path(folder) / "file_locks.sqlite"
+
+
+class FileLock:
+    """
+    Exclusive lock on one output file, held while it is read, changed and written back.
+    Every writer of the tag CSVs (store_tweets, the sentiment scorers, the engagement
+    refresh, compact_outputs) takes it, so a scrape appending to a file cannot be lost
+    to a scorer rewriting it from an older read, whichever process or host runs them.
+
+    The lock is a leased row in a SQLite file next to the locked file, taken in a
+    BEGIN IMMEDIATE transaction as in def_job_queue, so it works wherever the folder
+    is shared. A background thread renews the lease while the lock is held; a holder
+    that dies stops renewing and its lock lapses after `lease_seconds`.
+
+    Args:
+        path (str or Path): The file to lock.
+        timeout (float, optional): Seconds to wait before raising TimeoutError
+            (default: wait as long as it takes).
+        lease_seconds (float): Lease length, renewed every third of it.
+        poll_interval (float): Seconds between attempts while another holder has it.
+    """
+
+    def __init__(self, path, timeout=None, lease_seconds=LOCK_LEASE_SECONDS, poll_interval=1.0):
+        path = Path(path)
+        self.name = path.name
+        self.db_path = lock_db_path(path.parent)
+        self.timeout = timeout
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{worker_name()}-{threading.get_ident()}"
+        self.conn = None
+        # The renewing thread shares the connection
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _write(self, statement, params=()):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(statement, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor
+
+    def _try_acquire(self):
+        now = time.time()
+        cursor = self._write(
+            "INSERT INTO file_locks (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, "
+            "expires = excluded.expires WHERE file_locks.expires < ?",
+            (self.name, self.owner, now + self.lease_seconds, now),
+        )
+        return cursor.rowcount > 0
+
+    def acquire(self):
+        os.makedirs(self.db_path.parent, exist_ok=True)
+        self.conn = sqlite3.connect(
+            str(self.db_path), timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self.conn.executescript(_SCHEMA)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        waited = False
+        while not self._try_acquire():
+            if deadline is not None and time.monotonic() >= deadline:
+                self.conn.close()
+                self.conn = None
+                raise TimeoutError(f"{self.name} is locked by another writer")
+            if not waited:
+                print(f"Waiting for another writer to finish with {self.name}...")
+                waited = True
+            time.sleep(self.poll_interval)
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._renew, daemon=True)
+        self.thread.start()
+        return self
+
+    def _renew(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                cursor = self._write(
+                    "UPDATE file_locks SET expires = ? WHERE name = ? AND owner = ?",
+                    (time.time() + self.lease_seconds, self.name, self.owner),
+                )
+            except sqlite3.Error as e:
+                print(f"Renewing the lock on {self.name} failed: {e}")
+                continue
+            if cursor.rowcount == 0:
+                print(f"Lost the lock on {self.name}; another writer has it.")
+                return
+
+    def release(self):
+        if self.conn is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        try:
+            self._write(
+                "DELETE FROM file_locks WHERE name = ? AND owner = ?",
+                (self.name, self.owner),
+            )
+        finally:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
@@ -0,0 +1,231 @@
+import gzip
+import http.server
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from pathlib import Path
+
+from def_status_url import dedupe_key
+
+# Fixture files start with a comment recording where the page was captured from.
+_SOURCE_COMMENT = "<!-- captured-from: {url} captured-at: {at} -->\n"
+
+
+def capture_page_source(page_source, capture_dir, source_url=""):
+    """
+    Saves one rendered page snapshot as an HTML fixture in `capture_dir`.
+
+    File names are "<query slug>_<unix ms>.html" so the snapshots of one scrape sort
+    in scroll order. Returns the path written (or None if writing failed).
+    """
+    capture_dir = Path(capture_dir)
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", source_url.split("q=")[-1])[:60].strip("_")
+    path = capture_dir / f"{slug or 'page'}_{int(time.time() * 1000)}.html"
+    try:
+        capture_dir.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_SOURCE_COMMENT.format(url=source_url, at=datetime.now().isoformat()))
+            f.write(page_source)
+    except OSError as e:
+        print(f"Warning: could not capture page source to {path}: {e}")
+        return None
+    return path
+
+
+def list_fixtures(source):
+    """
+    Returns the fixture files for `source`: the file itself, or every .html/.html.gz
+    file in a directory (sorted, i.e. in capture order).
+    """
+    source = Path(source)
+    if source.is_file():
+        return [source]
+    return sorted(
+        p for p in source.iterdir() if p.name.endswith((".html", ".html.gz"))
+    )
+
+
+def load_fixture(source):
+    """
+    Loads one fixture's HTML from a local file (optionally gzipped) or an http(s) URL
+    such as one served by FixtureServer.
+    """
+    source = str(source)
+    if source.startswith(("http://", "https://")):
+        with urllib.request.urlopen(source, timeout=30) as response:
+            return response.read().decode("utf-8", errors="replace")
+    if source.endswith(".gz"):
+        with gzip.open(source, "rt", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    with open(source, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def replay_fixtures(sources, parser="auto", extract_fn=None):
+    """
+    Runs the url_scraper extraction over a sequence of page snapshots, deduplicating
+    across snapshots exactly like the scroll loop does, without any browser.
+
+    Args:
+        sources (iterable): Fixture file paths or URLs, in scroll order.
+        parser (str): Parser backend passed to the extraction function.
+        extract_fn (callable, optional): Extraction function (default extract_tweets).
+
+    Returns:
+        list[dict]: The unique tweet records, in first-seen order.
+    """
+    if extract_fn is None:
+        from def_tweet_extraction import extract_tweets as extract_fn
+
+    seen_statuses = set()
+    records = []
+    for source in sources:
+        for record in extract_fn(load_fixture(source), parser=parser):
+            key = dedupe_key(record["Tweet URL"])
+            if key not in seen_statuses:
+                seen_statuses.add(key)
+                records.append(record)
+    return records
+
+
+class FixtureServer:
+    """
+    Serves a fixture directory over HTTP on localhost, as a stand-in for the live site.
+
+    Usage:
+        with FixtureServer("fixtures/") as server:
+            html = load_fixture(server.url_for("page_0001.html"))
+    """
+
+    def __init__(self, directory, port=0):
+        handler = partial(_QuietHandler, directory=str(directory))
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, name):
+        return f"{self.base_url}/{name}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+# -------------------------------------------------------------------------------
+# Synthetic pages, for benchmarks when no captured fixtures are available
+# -------------------------------------------------------------------------------
+_WORDS = (
+    "congratulations to our learners who completed their level 2 apprenticeship "
+    "with city and guilds today great work from the whole team skills training "
+    "assessment results plumbing electrical hairdressing catering construction"
+).split()
+
+
+def synthetic_tweet(rng):
+    """Returns the random parts of one synthetic tweet: its words and engagement counts."""
+    return {
+        "words": " ".join(rng.choice(_WORDS) for _ in range(rng.randint(8, 30))),
+        "replies": rng.randint(0, 20),
+        "retweets": rng.randint(0, 50),
+        "likes": rng.randint(0, 300),
+    }
+
+
+def synthetic_full_text(status_id, tweet):
+    """Returns a synthetic tweet's text as the timeline API's full_text has it."""
+    return (
+        f"{tweet['words']} #cityandguilds @cityandguilds "
+        f"https://t.co/{status_id % 100000:05d}"
+    )
+
+
+def synthetic_article(status_id, handle, created_at, rng, tweet=None):
+    """
+    Returns one <article> in the shape X renders for a search result, showing `tweet`
+    (see synthetic_tweet; drawn from `rng` if not given).
+    """
+    tweet = tweet or synthetic_tweet(rng)
+    words = tweet["words"]
+    photo = (
+        f'<a href="/{handle}/status/{status_id}/photo/1" role="link"><img src="x"></a>'
+        if status_id % 7 == 0
+        else ""
+    )
+    return (
+        '<article aria-labelledby="id" role="article" tabindex="0" data-testid="tweet">'
+        '<div data-testid="User-Name">'
+        f'<a href="/{handle}" role="link"><span>{handle.title()}</span></a>'
+        f'<a href="/{handle}" role="link"><span>@{handle}</span></a>'
+        f'<a href="/{handle}/status/{status_id}" role="link">'
+        f'<time datetime="{created_at}">{created_at[:10]}</time></a></div>'
+        f'<div lang="en" dir="auto" data-testid="tweetText"><span>{words} </span>'
+        '<a href="/hashtag/cityandguilds?src=hashtag_click">#cityandguilds</a> '
+        '<a href="/cityandguilds" role="link">@cityandguilds</a> '
+        f'<a href="https://t.co/{status_id % 100000:05d}">t.co/{status_id % 1000}</a>'
+        f"</div>{photo}"
+        '<div role="group">'
+        f'<button data-testid="reply"><span>{tweet["replies"]}</span></button>'
+        f'<button data-testid="retweet"><span>{tweet["retweets"]}</span></button>'
+        f'<button data-testid="like"><span>{tweet["likes"]}</span></button>'
+        "</div></article>"
+    )
+
+
+def synthetic_search_page(n_articles, first_id=1800000000000000000, seed=0):
+    """
+    Returns a full HTML page holding `n_articles` synthetic search results, newest
+    first, wrapped in enough layout markup to resemble a real page_source.
+    """
+    rng = random.Random(seed)
+    handles = ["cityandguilds", "apprentice_jo", "fe_news", "skills_uk", "salon_sam"]
+    newest = datetime(2025, 4, 23, tzinfo=timezone.utc)
+    articles = []
+    for i in range(n_articles):
+        created = newest - timedelta(minutes=37 * i)
+        articles.append(
+            synthetic_article(
+                first_id - i * 1000,
+                rng.choice(handles),
+                created.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                rng,
+            )
+        )
+    layout = "<div><div><nav>" + '<a href="/home">Home</a>' * 20 + "</nav></div></div>"
+    return (
+        "<!DOCTYPE html><html><head><title>Search / X</title></head><body>"
+        + layout
+        + '<main role="main"><section aria-labelledby="accessible-list">'
+        + "".join(f'<div data-testid="cellInnerDiv">{a}</div>' for a in articles)
+        + "</section></main></body></html>"
+    )
+
+
+def write_synthetic_fixtures(directory, sizes=(10, 50, 200), seed=0):
+    """Writes one synthetic page per article count in `sizes`; returns the paths."""
+    directory = Path(directory)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size in sizes:
+        path = directory / f"synthetic_{size:05d}.html"
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_search_page(size, seed=seed))
+        paths.append(path)
+    return paths
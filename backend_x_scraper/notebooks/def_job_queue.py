@@ -0,0 +1,253 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from pyprojroot import here
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT NOT NULL,     -- "scrape_url", "score_file", ...
+    job_key       TEXT UNIQUE,       -- enqueueing the same key twice adds one job
+    payload       TEXT NOT NULL,     -- JSON
+    priority      INTEGER NOT NULL DEFAULT 0,
+    status        TEXT NOT NULL,     -- pending, leased, done, failed
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL,
+    lease_owner   TEXT,
+    lease_expires REAL,              -- wall-clock time, comparable across hosts
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL,
+    result        TEXT,              -- JSON
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority, id);
+"""
+
+JOB_STATUSES = ("pending", "leased", "done", "failed")
+
+# How long a claimed job stays leased without a heartbeat before another worker may
+# take it over (the worker is then presumed dead).
+DEFAULT_LEASE_SECONDS = 600
+
+
+def default_queue_path():
+    """
+    Returns the job queue's database path: JOB_QUEUE_PATH if set (e.g. a folder shared
+    by every worker host), else output/job_queue.sqlite.
+    """
+    configured = os.getenv("JOB_QUEUE_PATH")
+    if configured:
+        return Path(configured)
+    return Path(str(here("output"))) / "job_queue.sqlite"
+
+
+def worker_name():
+    """Returns an identifier for this worker process (host and PID)."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseLostError(RuntimeError):
+    """Raised when a worker reports on a job whose lease has passed to another worker."""
+
+
+class JobQueue:
+    """
+    Lease-based work queue in a SQLite file, shared by worker processes on any number
+    of hosts. claim() hands a pending job to one worker with a lease of
+    `lease_seconds`; the worker extends it with heartbeat() while working and ends it
+    with complete() or fail(). A job whose lease expires (the worker crashed or lost
+    the share) is handed out again, up to its max_attempts.
+
+    Every update runs in a BEGIN IMMEDIATE transaction, as in def_rate_limit, so
+    concurrent workers serialise on the database lock. On a network share this relies
+    on the share's file locking (SMB does it; some NFS setups do not).
+
+    Args:
+        path (str or Path, optional): Database file (defaults to default_queue_path()).
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_queue_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(
+            str(self.path), timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self.conn.executescript(_SCHEMA)
+        # The worker's heartbeat thread shares the connection
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def _write(self, statement, params=()):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self.conn.execute(statement, params)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return cursor
+
+    def enqueue(self, kind, payload, key=None, priority=0, max_attempts=3, requeue=False):
+        """
+        Adds a job unless one with the same `key` exists. With requeue, a finished or
+        failed job with that key is reset to pending instead (e.g. re-scoring a file
+        that has new rows). Returns True if a job was added or reset.
+        """
+        now = time.time()
+        cursor = self._write(
+            "INSERT INTO jobs (kind, job_key, payload, priority, status, max_attempts, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, 'pending', ?, ?, ?) "
+            "ON CONFLICT(job_key) DO UPDATE SET status = 'pending', attempts = 0, "
+            "payload = excluded.payload, priority = excluded.priority, error = NULL, "
+            "updated_at = excluded.updated_at "
+            "WHERE ? AND jobs.status IN ('done', 'failed')",
+            (kind, key, json.dumps(payload), priority, max_attempts, now, now, requeue),
+        )
+        return cursor.rowcount > 0
+
+    def claim(self, worker, kinds=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        Leases the next job to `worker`: the highest-priority pending job, or a leased
+        one whose lease has expired. Returns the job as a dict (payload decoded), or
+        None if there is nothing to do. Jobs that have used up their attempts are
+        marked failed instead of being handed out again.
+        """
+        now = time.time()
+        kind_filter = ""
+        params = [now]
+        if kinds:
+            kind_filter = f" AND kind IN ({', '.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'failed', lease_owner = NULL, "
+                    "error = COALESCE(error, 'lease expired'), updated_at = ? "
+                    "WHERE status = 'leased' AND lease_expires < ? "
+                    "AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = self.conn.execute(
+                    "SELECT id, kind, payload, attempts FROM jobs "
+                    "WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+                    f"{kind_filter} ORDER BY priority DESC, id LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is not None:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'leased', attempts = attempts + 1, "
+                        "lease_owner = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                        (worker, now + lease_seconds, now, row[0]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job_id, kind, payload, attempts = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "payload": json.loads(payload),
+            "attempt": attempts + 1,
+        }
+
+    def _owned_update(self, job_id, worker, assignments, params):
+        cursor = self._write(
+            f"UPDATE jobs SET {assignments}, updated_at = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (*params, time.time(), job_id, worker),
+        )
+        if cursor.rowcount == 0:
+            raise LeaseLostError(f"Job {job_id} is no longer leased to {worker}")
+
+    def heartbeat(self, job_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extends the lease. Raises LeaseLostError if the job was handed to another worker."""
+        self._owned_update(
+            job_id, worker, "lease_expires = ?", (time.time() + lease_seconds,)
+        )
+
+    def complete(self, job_id, worker, result=None):
+        """Marks the job done and stores its (JSON-serialisable) result."""
+        self._owned_update(
+            job_id,
+            worker,
+            "status = 'done', lease_owner = NULL, result = ?, error = NULL",
+            (json.dumps(result),),
+        )
+
+    def fail(self, job_id, worker, error):
+        """Records a failed attempt; the job is retried until it runs out of attempts."""
+        self._owned_update(
+            job_id,
+            worker,
+            "status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, error = ?",
+            (str(error)[:2000],),
+        )
+
+    def progress(self):
+        """Returns {kind: {status: count}} over every job in the queue."""
+        counts = {}
+        rows = self.conn.execute(
+            "SELECT kind, status, COUNT(*) FROM jobs GROUP BY kind, status"
+        ).fetchall()
+        for kind, status, count in rows:
+            counts.setdefault(kind, dict.fromkeys(JOB_STATUSES, 0))[status] = count
+        return counts
+
+    def active_leases(self):
+        """Returns (job id, kind, worker, seconds left) for every leased job."""
+        now = time.time()
+        return [
+            (job_id, kind, owner, expires - now)
+            for job_id, kind, owner, expires in self.conn.execute(
+                "SELECT id, kind, lease_owner, lease_expires FROM jobs "
+                "WHERE status = 'leased' ORDER BY lease_expires"
+            )
+        ]
+
+
+class Heartbeat:
+    """
+    Keeps one job's lease alive from a background thread while the worker runs it.
+    Use as a context manager; `lost` is set if the lease was taken over.
+    """
+
+    def __init__(self, queue, job_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.lease_seconds / 3):
+            try:
+                self.queue.heartbeat(self.job_id, self.worker, self.lease_seconds)
+            except LeaseLostError:
+                print(f"Lost the lease on job {self.job_id}; another worker has it.")
+                self.lost = True
+                return
+            except sqlite3.Error as e:
+                print(f"Heartbeat for job {self.job_id} failed: {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stopped.set()
+        self.thread.join()
+        return False
@@ -0,0 +1,95 @@
+import csv
+import json
+import os
+
+# Text values that safe_sentiment_analysis treats as empty (they are never scored).
+INVALID_TEXTS = {"", "unknown", "NULL", "NA"}
+
+# Sentiment values that mean "not scored yet".
+MISSING_SENTIMENT = {"", "unknown", "NA", "NaN", "nan", "NULL"}
+
+
+def csv_has_pending_sentiment(csv_path):
+    """
+    Streams `csv_path` with the stdlib csv module and returns True as soon as it finds a
+    row with valid text and missing sentiment. Needs no pandas, so it is cheap to call
+    before deciding whether the sentiment model has to be loaded at all.
+    """
+    csv.field_size_limit(min(2**31 - 1, 1 << 30))
+    with open(csv_path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "Text" not in header:
+            return False
+        text_idx = header.index("Text")
+        if "sentiment" not in header:
+            # No sentiment column yet: pending if any row has usable text
+            for row in reader:
+                if len(row) > text_idx and row[text_idx].strip() not in INVALID_TEXTS:
+                    return True
+            return False
+        sentiment_idx = header.index("sentiment")
+        for row in reader:
+            if len(row) <= max(text_idx, sentiment_idx):
+                continue
+            if (
+                row[sentiment_idx].strip() in MISSING_SENTIMENT
+                and row[text_idx].strip() not in INVALID_TEXTS
+            ):
+                return True
+    return False
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def find_pending_files(output_dir, ignore_files, state_path=None):
+    """
+    Returns the sorted list of CSV files in `output_dir` that still have rows waiting
+    for sentiment.
+
+    Files found to be fully scored are remembered in `state_path` (a small JSON file of
+    size/mtime fingerprints) so that unchanged files are skipped with a single stat()
+    on the next run instead of being re-read.
+
+    Args:
+        output_dir (str): Folder holding the per-tag CSV files.
+        ignore_files (set): File names that are never scored (e.g. urls.csv).
+        state_path (str, optional): Where to keep the fingerprints (default:
+            output_dir/.sentiment_state.json).
+    """
+    state_path = state_path or os.path.join(output_dir, ".sentiment_state.json")
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            clean_files = json.load(f)
+    except (OSError, ValueError):
+        clean_files = {}
+
+    pending = []
+    new_clean_files = {}
+    for filename in sorted(os.listdir(output_dir)):
+        if not filename.endswith(".csv") or filename in ignore_files:
+            continue
+        csv_path = os.path.join(output_dir, filename)
+        fingerprint = _fingerprint(csv_path)
+        if clean_files.get(filename) == fingerprint:
+            new_clean_files[filename] = fingerprint
+            continue
+        try:
+            has_pending = csv_has_pending_sentiment(csv_path)
+        except (OSError, csv.Error) as e:
+            print(f"[WARNING] Could not scan {filename} for pending work: {e}")
+            has_pending = True  # let the full pipeline deal with it
+        if has_pending:
+            pending.append(filename)
+        else:
+            new_clean_files[filename] = fingerprint
+
+    try:
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(new_clean_files, f)
+    except OSError as e:
+        print(f"[WARNING] Could not save pending-work state to {state_path}: {e}")
+    return pending
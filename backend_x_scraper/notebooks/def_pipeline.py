@@ -0,0 +1,244 @@
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """
+    One step of the pipeline (see pipeline.py).
+
+    Args:
+        name (str): Stage name, used in the state file and on the command line.
+        run (callable): Does the work; takes no arguments. An exception fails the stage.
+        inputs (callable, optional): Returns the files the stage reads (globs allowed).
+            Evaluated when the stage is about to run, after its dependencies.
+        outputs (callable, optional): Returns the files the stage writes; the stage
+            reruns if any of them is missing.
+        params (callable, optional): Returns a JSON-serialisable value that is part of
+            the stage's key besides its inputs (e.g. the search date window).
+        deps (tuple): Names of the stages that must finish first.
+        max_age (float, optional): Rerun after this many seconds even if nothing changed,
+            for stages whose real input is outside the tree (the X search results).
+    """
+
+    def __init__(
+        self, name, run, inputs=None, outputs=None, params=None, deps=(), max_age=None
+    ):
+        self.name = name
+        self.run = run
+        self.inputs = inputs or (lambda: [])
+        self.outputs = outputs or (lambda: [])
+        self.params = params or (lambda: None)
+        self.deps = tuple(deps)
+        self.max_age = max_age
+
+
+def expand_paths(patterns):
+    """Returns the sorted files matched by `patterns` (globs or plain paths)."""
+    paths = set()
+    for pattern in patterns:
+        pattern = str(pattern)
+        if glob.has_magic(pattern):
+            paths.update(p for p in glob.glob(pattern) if os.path.isfile(p))
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+class ContentHasher:
+    """
+    SHA-256 of file contents, cached by (size, mtime) like def_pending_work's
+    fingerprints: an unchanged file costs one stat(), so checking a tree of large CSVs
+    on a quiet tick is almost free. A file that is touched but not changed is re-read
+    once and still hashes the same. Missing files hash to None.
+    """
+
+    def __init__(self, cache=None):
+        self.cache = {} if cache is None else cache
+
+    def hash_file(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = [stat.st_size, stat.st_mtime_ns]
+        cached = self.cache.get(path)
+        if cached and cached[:2] == key:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.cache[path] = key + [digest.hexdigest()]
+        return self.cache[path][2]
+
+    def fingerprint(self, patterns):
+        """Returns {path: content hash} over the files matched by `patterns`."""
+        return {path: self.hash_file(path) for path in expand_paths(patterns)}
+
+
+def load_state(state_path):
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"stages": {}, "hashes": {}}
+
+
+def save_state(state_path, state):
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def _stage_key(stage, hasher):
+    return {
+        "inputs": hasher.fingerprint(stage.inputs()),
+        "params": stage.params(),
+    }
+
+
+def stale_reason(stage, record, hasher, now=None):
+    """Returns why `stage` has to run (a short string), or None if it is up to date."""
+    if record is None:
+        return "never run"
+    now = time.time() if now is None else now
+    key = _stage_key(stage, hasher)
+    if key["params"] != record.get("params"):
+        return "parameters changed"
+    if key["inputs"] != record.get("inputs"):
+        changed = set(key["inputs"].items()) ^ set(record.get("inputs", {}).items())
+        names = sorted({os.path.basename(path) for path, _ in changed})
+        return f"inputs changed ({', '.join(names[:3])}{', ...' if len(names) > 3 else ''})"
+    if any(hasher.hash_file(path) is None for path in expand_paths(stage.outputs())):
+        return "outputs missing"
+    if stage.max_age is not None and now - record.get("finished_at", 0) >= stage.max_age:
+        return f"older than {stage.max_age:.0f}s"
+    return None
+
+
+def run_pipeline(stages, state_path, workers=4, force=(), only=None, dry_run=False):
+    """
+    Runs `stages` in dependency order, skipping the ones that are up to date and running
+    independent ones at the same time in up to `workers` threads.
+
+    A stage is up to date when the content hashes of its inputs and its params match
+    those recorded after its last successful run, its outputs exist and it is younger
+    than its max_age. A failed stage is not recorded (it runs again next time) and the
+    stages that depend on it are not run.
+
+    Fingerprints are recorded once the whole run is over, so files that a later stage
+    rewrites in place (sentiment scores added to the CSVs the scrape wrote) do not make
+    the earlier stages stale again on the next run.
+
+    Args:
+        stages (list of Stage): The pipeline; dependencies must be in the list.
+        state_path (str): JSON file with the recorded stage keys and the hash cache.
+        workers (int): Stages run at once at most.
+        force (iterable): Names of stages to run even if they are up to date.
+        only (iterable, optional): Run just these stages (dependencies are not added).
+        dry_run (bool): Report what would run without running anything.
+
+    Returns:
+        list of dict: One {"stage", "status", "reason", "seconds"} per stage, in
+        completion order; status is "ran", "skipped", "failed", "blocked" or "stale"
+        (the latter for a dry run).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown {missing}")
+    selected = set(only) if only else set(by_name)
+    force = set(force)
+
+    state = load_state(state_path)
+    records = state.setdefault("stages", {})
+    hasher = ContentHasher(state.setdefault("hashes", {}))
+
+    def execute(stage):
+        if stage.name not in selected:
+            return "skipped", "not selected", 0.0
+        reason = "forced" if stage.name in force else None
+        if dry_run and reason is None:
+            stale_deps = [dep for dep in stage.deps if status[dep] == "stale"]
+            reason = f"after {', '.join(stale_deps)}" if stale_deps else None
+        reason = reason or stale_reason(stage, records.get(stage.name), hasher)
+        if reason is None:
+            return "skipped", "up to date", 0.0
+        if dry_run:
+            return "stale", reason, 0.0
+        print(f"[pipeline] {stage.name}: running ({reason})")
+        start = time.perf_counter()
+        stage.run()
+        return "ran", reason, time.perf_counter() - start
+
+    results = []
+    status = {}
+    reasons = {}
+    pending = list(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for stage in list(pending):
+                dep_status = [status.get(dep) for dep in stage.deps]
+                if any(s in ("failed", "blocked") for s in dep_status):
+                    pending.remove(stage)
+                    status[stage.name] = "blocked"
+                    failed = [d for d in stage.deps if status[d] in ("failed", "blocked")]
+                    results.append(
+                        {
+                            "stage": stage.name,
+                            "status": "blocked",
+                            "reason": f"{', '.join(failed)} did not finish",
+                            "seconds": 0.0,
+                        }
+                    )
+                elif all(s is not None for s in dep_status):
+                    pending.remove(stage)
+                    running[pool.submit(execute, stage)] = stage
+            if not running:
+                if pending:
+                    names = [stage.name for stage in pending]
+                    raise ValueError(f"Dependency cycle among stages {names}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    outcome, reason, seconds = future.result()
+                except Exception as e:
+                    outcome, reason, seconds = "failed", f"{type(e).__name__}: {e}", 0.0
+                    print(f"[pipeline] {stage.name}: failed: {reason}")
+                status[stage.name] = outcome
+                reasons[stage.name] = reason
+                results.append(
+                    {"stage": stage.name, "status": outcome, "reason": reason, "seconds": seconds}
+                )
+
+    if not dry_run:
+        now = time.time()
+        for stage in stages:
+            if status[stage.name] == "ran":
+                records[stage.name] = {**_stage_key(stage, hasher), "finished_at": now}
+            elif reasons.get(stage.name) == "up to date":
+                # Keep the record in step with in-place rewrites by later stages
+                records[stage.name].update(_stage_key(stage, hasher))
+        for path in [p for p in hasher.cache if not os.path.exists(p)]:
+            del hasher.cache[path]
+        save_state(state_path, state)
+    return results
+
+
+def format_results(results):
+    """Returns a small table of run_pipeline's results."""
+    lines = [f"{'stage':<10}{'status':<9}{'seconds':>9}  reason"]
+    for row in results:
+        lines.append(
+            f"{row['stage']:<10}{row['status']:<9}{row['seconds']:>9.1f}  {row['reason']}"
+        )
+    return "\n".join(lines)
@@ -1,4 +1,9 @@
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 import pandas as pd
 from pathlib import Path
 from pyprojroot import here
@@ -8,22 +13,106 @@ sys.path.append(str(here("notebooks")))
 
 # Import the helper function for scraping
 from def_url_scraper import url_scraper
+from def_checkpoint import ScrapeCheckpoint, prune_checkpoints
+from def_compound_query import attribute_tweets, decode_members
+from def_file_lock import FileLock
+from def_status_index import open_status_index
+from def_status_url import drop_duplicate_statuses
+from def_session_pool import SessionPool
+from def_tweet_record import (
+    csv_ready,
+    parse_created_at,
+    read_tweets_csv,
+    status_id_from_url,
+)
+from def_run_ledger import (
+    append_ledger_entry,
+    file_size,
+    new_run_id,
+    new_url_metrics,
+)
 
 
-def process_year(year):
+# Longest time process_year waits for an account to come out of its circuit-breaker
+# cooldown; if every account is throttled for longer, the URL is skipped and reported
+# as a failed pass.
+MAX_BREAKER_WAIT = 600
+
+# Longest a single URL may scroll before the tweets harvested so far are committed and
+# the URL is released. A long Latest-timeline backfill continues from its checkpoint
+# next pass; a Top-tab search starts again from the top (see ScrapeCheckpoint).
+URL_DEADLINE_SECONDS = 45 * 60
+
+
+def process_year(
+    year,
+    tags=None,
+    global_dedupe=True,
+    workers=None,
+    incremental=False,
+    output_dir=None,
+    pool=None,
+    ledger_path=None,
+):
     """
     Scrapes tweets for each URL in the lookup CSV that match the specified year and writes each scraped
     DataFrame to the output folder with the filename based on the 'tag' column (e.g., hashtags_2015.csv).
 
-    If the output file already exists, new tweets are appended and deduplicated using the 'Tweet URL' column.
+    If the output file already exists, new tweets are appended and deduplicated on the status ID in
+    'Tweet URL' (see def_status_url), so variant links to one tweet are stored once.
+    Per-URL timings and yields are appended to the run ledger (output/run_ledger.jsonl).
+
+    Each URL's progress is checkpointed in output/checkpoints (see def_checkpoint). If a
+    scrape fails part-way, the next run reloads what it harvested; a Latest-timeline
+    search resumes below the oldest tweet it reached instead of starting again from the
+    top, and a Top-tab search reloads and skips the tweets it already has.
+
+    Tweets are stored in batches while a URL is still being scrolled (url_scraper's
+    on_batch), including the last batch of a scrape that fails, and each URL stops after
+    URL_DEADLINE_SECONDS. Worker threads take turns to store through a lock.
+
+    A lookup row with a members column (see scrape_cron's compound mode) is one OR search
+    standing in for several tags: its tweets are attributed to the member tags by testing
+    them against each member's search term (see def_compound_query) and stored in the
+    members' files, and its yield is the total added across them. Tweets matching no
+    member's term are kept apart in compound_unattributed_<year>.csv.
+
+    With global_dedupe, every status is stored (and later scored) once across all tags: the
+    status index (output/status_index.sqlite) records which tags returned it, and tweets
+    already stored under another tag are not written to this tag's file again.
+
+    URLs are spread over the accounts in the session pool (see def_session_pool): each
+    goes to the least-loaded account whose circuit breaker is closed, and up to `workers`
+    accounts scrape at once, each within its own rate budget. If every account stays
+    throttled for MAX_BREAKER_WAIT seconds, the URL is skipped. With
+    SCRAPE_ENGINE=playwright a session takes up to pages_per_browser() URLs at once and
+    scrolls them as pages of one browser.
 
     Args:
         year (str or int): The year (or env_suffix) to filter the lookup CSV.
+        tags (list, optional): Only scrape URLs whose tag is in this list (default: all tags).
+        global_dedupe (bool): Deduplicate across tags with the global status index.
+        workers (int, optional): Concurrent browser sessions (default: one per account).
+        incremental (bool): Scrape each tag's Latest timeline and stop at the tweets already
+            stored for it (see stored_high_water and url_scraper's known_ids), instead of
+            scrolling the whole window.
+        output_dir (str or Path, optional): Folder holding urls.csv, the tag CSVs, the
+            status index and the checkpoints (default: the project's output/).
+        pool (SessionPool, optional): Sessions to scrape with (default: one per account
+            in .env, closed at the end; a pool passed in is left open).
+        ledger_path (str or Path, optional): Run ledger (default: run_ledger.jsonl in
+            output_dir).
+
+    Returns:
+        dict: {tag: number of new tweets added}, with None for tags whose scrape failed.
+            Compound rows are reported under their own tag.
     """
     # -------------------------------------------------------------------------------
     # Load the lookup CSV file that contains the URLs
     # -------------------------------------------------------------------------------
-    lookup_csv_path = Path(str(here("output"))) / "urls.csv"
+    output_dir = Path(output_dir) if output_dir else Path(str(here("output")))
+    ledger_path = ledger_path or output_dir / "run_ledger.jsonl"
+    lookup_csv_path = output_dir / "urls.csv"
     print("Lookup CSV path:", lookup_csv_path)
 
     if not lookup_csv_path.is_file():
@@ -38,11 +127,13 @@ def process_year(year):
     # Filter for rows with env_suffix equal to the provided year
     # -------------------------------------------------------------------------------
     urls_year = urls[urls["env_suffix"].astype(str) == str(year)]
+    if tags is not None:
+        urls_year = urls_year[urls_year["tag"].isin(tags)]
     print(f"Found {len(urls_year)} URLs for year {year}.")
 
     if urls_year.empty:
         print(f"No URLs found for env_suffix '{year}'.")
-        return
+        return {}
 
     # Shuffle the rows in urls_year
     urls_year = urls_year.sample(frac=1).reset_index(drop=True)
@@ -50,54 +141,311 @@ def process_year(year):
     print(urls_year.head())
 
     # Ensure the output directory exists
-    output_dir = Path(str(here("output")))
     if not output_dir.exists():
         output_dir.mkdir(parents=True)
 
     # -------------------------------------------------------------------------------
     # Loop through each URL for the specified year, scrape tweets, and write each result separately.
     # -------------------------------------------------------------------------------
-    for idx, row in urls_year.iterrows():
-        tag = row["tag"]
-        target_url = row["url"]
-        print(f"Scraping URL for {tag}: {target_url}")
+    status_index = (
+        open_status_index(output_dir, path=output_dir / "status_index.sqlite")
+        if global_dedupe
+        else None
+    )
+    checkpoint_dir = output_dir / "checkpoints"
+    prune_checkpoints(checkpoint_dir)
+    owns_pool = pool is None
+    pool = pool or SessionPool.from_env()
+    workers = max(1, min(workers or len(pool), len(pool)))
+    print(f"Scraping with {len(pool)} account(s), {workers} at a time.")
 
-        try:
-            tweets_df = url_scraper(target_url)
-            # Diagnose if no tweets were scraped from this URL:
-            if tweets_df.empty:
-                print(f"Warning: No tweets scraped from URL for tag {tag}.")
+    yields = {}
+    run_id = new_run_id()
+    in_flight = {}  # future -> (tag, target_url, metrics, checkpoint)
+    store_lock = threading.Lock()  # CSV writes and the status index, one batch at a time
+
+    def batch_store(tag, metrics, members=None):
+        """Returns the on_batch callback that stores `tag`'s tweets as they arrive."""
+
+        def store_batch(tweets_df):
+            store_start = time.perf_counter()
+            if members:
+                split, unattributed = attribute_tweets(
+                    tweets_df, members, unattributed_tag(year)
+                )
+                metrics["tweets_unattributed"] += unattributed
             else:
-                print(f"Scraped {len(tweets_df)} tweets from URL for tag {tag}.")
+                split = {tag: tweets_df}
+            added = grown = 0
+            with store_lock:
+                for store_tag, frame in split.items():
+                    stored = store_tweets(frame.copy(), store_tag, output_dir, status_index)
+                    added += stored[0]
+                    grown += stored[1]
+            metrics["tweets_new"] = (metrics["tweets_new"] or 0) + added
+            metrics["bytes_grown"] += grown
+            metrics["store_seconds"] = (metrics["store_seconds"] or 0.0) + (
+                time.perf_counter() - store_start
+            )
+
+        return store_batch
+
+    def record(entry, error=None):
+        """Records the outcome of one URL's scrape and writes its ledger entry."""
+        tag, target_url, metrics, checkpoint = entry
+        if error is None:
+            # A URL cut off by its deadline keeps its checkpoint to continue from next time
+            if metrics["stop_reason"] != "deadline":
+                checkpoint.clear()
+            yields[tag] = metrics["tweets_new"] or 0
+        else:
+            print(f"Error scraping {target_url} ({tag}): {error}")
+            # Batches stored before the failure still count as progress for the scheduler
+            yields[tag] = metrics["tweets_new"] or None
+            metrics["failure_reason"] = f"{type(error).__name__}: {error}"
+        append_ledger_entry(metrics, ledger_path)
 
-            # Add the tag column to the tweets DataFrame (if not already present)
-            tweets_df["tag"] = tag
+    def finish(future):
+        """Records the outcome of every URL of one finished session."""
+        entries = in_flight.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [e] * len(entries)
+        for entry, result in zip(entries, results):
+            record(entry, result if isinstance(result, Exception) else None)
+
+    # The Playwright engine scrapes a session's URLs as pages of one browser, so each
+    # session takes several rows at once; Selenium scrapes one URL per session.
+    engine = os.getenv("SCRAPE_ENGINE", "selenium")
+    batch_size = pages_per_browser() if engine == "playwright" else 1
+    rows = [row for _, row in urls_year.iterrows()]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for batch_start in range(0, len(rows), batch_size):
+            batch = [
+                (row["tag"], row["url"], decode_members(row.get("members")))
+                for row in rows[batch_start : batch_start + batch_size]
+            ]
 
-            # Build the output file path using the tag. Example: hashtags_2015.csv
-            output_file = output_dir / f"{tag}.csv"
+            # Store whatever has finished while we waited for a free session
+            for future in [f for f in in_flight if f.done()]:
+                finish(future)
 
-            if output_file.exists():
-                # If the file exists, load the existing tweets and append new ones.
-                existing_df = pd.read_csv(output_file)
-                existing_count = len(existing_df)
+            wait_start = time.time()
+            session = pool.acquire(max_wait=MAX_BREAKER_WAIT)
+            if session is None:
+                cooldown = pool.shortest_cooldown()
+                for tag, target_url, _ in batch:
+                    print(
+                        f"All accounts are cooling down (next in {cooldown:.0f}s); "
+                        f"skipping {tag} this pass."
+                    )
+                    yields[tag] = None
+                    metrics = new_url_metrics(run_id, tag, target_url)
+                    metrics["failure_reason"] = "circuit_open"
+                    append_ledger_entry(metrics, ledger_path)
+                continue
+
+            tasks, entries = [], []
+            for tag, target_url, members in batch:
+                metrics = new_url_metrics(run_id, tag, target_url)
+                metrics["backoff_seconds"] = time.time() - wait_start
+                metrics["account"] = session.account.name
+                print(f"Scraping URL for {tag} as {session.account.name}: {target_url}")
+
+                known_ids, high_water = (
+                    combined_high_water(output_dir, list(members or [tag]), status_index)
+                    if incremental
+                    else (None, None)
+                )
+                checkpoint = ScrapeCheckpoint(tag, target_url, checkpoint_dir)
+                tasks.append(
+                    (
+                        target_url,
+                        dict(
+                            metrics=metrics,
+                            known_ids=known_ids,
+                            high_water=high_water,
+                            checkpoint=checkpoint,
+                            on_batch=batch_store(tag, metrics, members),
+                            deadline=time.time() + URL_DEADLINE_SECONDS,
+                        ),
+                    )
+                )
+                entries.append((tag, target_url, metrics, checkpoint))
+            future = executor.submit(_scrape_with_session, pool, session, tasks, engine)
+            in_flight[future] = entries
+
+        for future in as_completed(list(in_flight)):
+            finish(future)
+
+    if status_index is not None:
+        status_index.close()
+    if owns_pool:
+        pool.close()
+    return yields
+
+
+def unattributed_tag(year):
+    """The tag compound searches store tweets matching none of their members under."""
+    return f"compound_unattributed_{year}"
+
+
+def pages_per_browser():
+    """
+    Returns how many URLs the Playwright engine scrapes at once in one browser:
+    SCRAPE_PAGES_PER_BROWSER if set, else def_async_scraper.DEFAULT_CONCURRENCY.
+    """
+    from def_async_scraper import DEFAULT_CONCURRENCY
+
+    return max(1, int(os.getenv("SCRAPE_PAGES_PER_BROWSER", DEFAULT_CONCURRENCY)))
+
+
+def _scrape_with_session(pool, session, tasks, engine="selenium"):
+    """
+    Scrapes `tasks` ([(url, url_scraper keyword arguments)]) as `session`'s account and
+    hands the session back afterwards. Returns one DataFrame, or the exception its
+    scrape raised, per task.
+
+    With engine="playwright" the URLs are pages of one browser and one login
+    (def_async_scraper.scrape_urls), all scrolled at once; otherwise url_scraper
+    scrapes them one after another.
+    """
+    try:
+        if engine == "playwright":
+            from def_async_scraper import scrape_urls
+
+            urls = [url for url, _ in tasks]
+            results = scrape_urls(
+                urls,
+                concurrency=len(urls),
+                account=session.account,
+                limiter=session.limiter,
+                breaker=session.breaker,
+                url_kwargs=dict(tasks),
+            )
+            return [results[url] for url in urls]
+        results = []
+        for url, kwargs in tasks:
+            try:
+                results.append(
+                    url_scraper(
+                        url,
+                        limiter=session.limiter,
+                        breaker=session.breaker,
+                        account=session.account,
+                        **kwargs,
+                    )
+                )
+            except Exception as e:
+                results.append(e)
+        return results
+    finally:
+        pool.release(session)
+
+
+def stored_high_water(output_dir, tag, status_index=None):
+    """
+    Returns (known status IDs, newest stored Created At) for `tag`: the IDs in its CSV
+    plus, with a status index, every status its searches returned that is stored under
+    another tag. The timestamp is None if nothing is stored yet.
+    """
+    known_ids = set()
+    if status_index is not None:
+        known_ids = status_index.status_ids_for_tag(tag)
+    newest = None
+    output_file = Path(output_dir) / f"{tag}.csv"
+    if output_file.exists():
+        stored = pd.read_csv(output_file, usecols=["Tweet URL", "Created At"])
+        known_ids.update(
+            s for s in map(status_id_from_url, stored["Tweet URL"]) if s is not None
+        )
+        created = [c for c in map(parse_created_at, stored["Created At"]) if c]
+        newest = max(created, default=None)
+    return known_ids, newest
+
+
+def combined_high_water(output_dir, tags, status_index=None):
+    """
+    Returns stored_high_water for a search covering several tags: every status known
+    to any of them, and the oldest of their newest timestamps, so the incremental stop
+    waits until the tag that is furthest behind has caught up (None if any is empty).
+    """
+    known_ids, newest = set(), []
+    for tag in tags:
+        tag_known, tag_newest = stored_high_water(output_dir, tag, status_index)
+        known_ids |= tag_known
+        newest.append(tag_newest)
+    return known_ids, None if None in newest else min(newest)
+
+
+def store_tweets(tweets_df, tag, output_dir, status_index=None):
+    """
+    Appends one scrape's tweets to output/<tag>.csv, deduplicated on the status ID and,
+    with a status index, against the tweets already stored under other tags.
+
+    Returns:
+        tuple: (number of new tweets added, bytes the file grew by). The whole file is
+            rewritten, so this is the net growth, not the bytes actually written.
+    """
+    # Diagnose if no tweets were scraped from this URL:
+    if tweets_df.empty:
+        print(f"Warning: No tweets scraped from URL for tag {tag}.")
+    else:
+        print(f"Scraped {len(tweets_df)} tweets from URL for tag {tag}.")
+
+    # Add the tag column and format typed columns the way the CSVs store them
+    tweets_df["tag"] = tag
+    tweets_df = csv_ready(tweets_df)
+
+    # Build the output file path using the tag. Example: hashtags_2015.csv
+    output_file = Path(output_dir) / f"{tag}.csv"
+
+    status_ids = None
+    if status_index is not None and not tweets_df.empty:
+        status_ids = [int(s) if pd.notna(s) else None for s in tweets_df["Tweet ID"]]
+    registration = (
+        status_index.registration(tag, status_ids) if status_ids else nullcontext({})
+    )
+
+    # Hold the file's lock from the read to the write, so a scorer or another
+    # worker rewriting it meanwhile cannot drop these rows (or have its own dropped).
+    # The status index registration is committed only once the write has succeeded.
+    with FileLock(output_file), registration as homes:
+        # Keep only the tweets whose home is this tag; the rest are already stored
+        # under another tag and are just recorded as memberships of this one.
+        if status_ids:
+            is_home = [homes.get(s, tag) == tag for s in status_ids]
+            stored_elsewhere = len(is_home) - sum(is_home)
+            if stored_elsewhere:
                 print(
-                    f"Existing tweets loaded from {output_file} (total: {existing_count})."
+                    f"{stored_elsewhere} tweets for {tag} are already stored under "
+                    "another tag; recorded as memberships only."
                 )
-                # Concatenate and drop duplicates based on 'Tweet URL'
-                combined_df = pd.concat([existing_df, tweets_df], ignore_index=True)
-                combined_df.drop_duplicates(subset="Tweet URL", inplace=True)
-                new_total = len(combined_df)
-                extra_added = new_total - existing_count
-                print(f"After deduplication, total tweets for {tag}: {new_total}.")
-                print(f"Extra tweets added for {tag}: {extra_added}.")
-                tweets_df = combined_df
-            else:
-                print(f"No existing file for {tag}. Creating new file.")
-                print(f"Tweets for {tag}: {len(tweets_df)} added.")
+            tweets_df = tweets_df[is_home]
 
-            # Write the (updated) DataFrame to the CSV file.
-            tweets_df.to_csv(output_file, index=False)
-            print(f"Tweets for tag {tag} written to {output_file}")
-        except Exception as e:
-            print(f"Error scraping {target_url} ({tag}): {e}")
-            continue
+        if output_file.exists():
+            # If the file exists, load the existing tweets and append new ones.
+            existing_df = read_tweets_csv(output_file)
+            existing_count = len(existing_df)
+            print(f"Existing tweets loaded from {output_file} (total: {existing_count}).")
+            # Concatenate and drop duplicates based on the status ID
+            combined_df = drop_duplicate_statuses(
+                pd.concat([existing_df, tweets_df], ignore_index=True)
+            )
+            new_total = len(combined_df)
+            added = new_total - existing_count
+            print(f"After deduplication, total tweets for {tag}: {new_total}.")
+            print(f"Extra tweets added for {tag}: {added}.")
+            tweets_df = combined_df
+        else:
+            print(f"No existing file for {tag}. Creating new file.")
+            print(f"Tweets for {tag}: {len(tweets_df)} added.")
+            added = len(tweets_df)
+
+        # Write the (updated) DataFrame to the CSV file.
+        size_before = file_size(output_file)
+        tweets_df.to_csv(output_file, index=False)
+        print(f"Tweets for tag {tag} written to {output_file}")
+    return added, file_size(output_file) - size_before
@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of this process in MB, or None if it cannot be
+    determined (uses `resource` on Linux/macOS and psutil, if installed, on Windows).
+    """
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        peak = getattr(info, "peak_wset", None) or info.rss
+        return peak / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class StageProfiler:
+    """
+    Opt-in stage timer for the sentiment pipeline.
+
+    Wrap work in `with profiler.stage("model_load"):` to accumulate wall-clock seconds
+    and call counts per stage, and use `profiler.count("texts", n)` for throughput
+    counters. When constructed with enabled=False every method is a cheap no-op, so
+    the nightly job can pass a profiler around unconditionally.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.info = {}
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        stage_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - stage_start)
+
+    def add_time(self, name, seconds):
+        """Adds `seconds` to stage `name` (for work timed outside a `stage` block)."""
+        if not self.enabled:
+            return
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+
+    def count(self, name, value=1):
+        """Increments throughput counter `name` by `value`."""
+        if not self.enabled:
+            return
+        self.counters[name] = self.counters.get(name, 0) + int(value)
+
+    def set_info(self, **kwargs):
+        """Attaches descriptive fields (device, model path, ...) to the summary."""
+        if self.enabled:
+            self.info.update(kwargs)
+
+    def summary(self):
+        """Returns the machine-readable run summary as a dict."""
+        total_seconds = time.perf_counter() - self.start
+        forward_seconds = self.stages.get("forward", {}).get("seconds", 0.0)
+        texts = self.counters.get("texts", 0)
+        tokens = self.counters.get("tokens", 0)
+        return {
+            "run_started": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": round(total_seconds, 3),
+            "stages": {
+                name: {"seconds": round(v["seconds"], 3), "calls": v["calls"]}
+                for name, v in self.stages.items()
+            },
+            "counters": dict(self.counters),
+            "texts_per_sec": round(texts / forward_seconds, 2)
+            if forward_seconds
+            else None,
+            "tokens_per_sec": round(tokens / forward_seconds, 2)
+            if forward_seconds
+            else None,
+            "peak_rss_mb": round(peak_rss_mb() or 0, 1) or None,
+            **self.info,
+        }
+
+    def write(self, path):
+        """Prints the summary and appends it as one JSON line to `path`."""
+        if not self.enabled:
+            return
+        summary = self.summary()
+        print("[PROFILE] " + json.dumps(summary))
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary) + "\n")
+        except OSError as e:
+            print(f"[WARNING] Could not write profile summary to {path}: {e}")
+
@@ -0,0 +1,263 @@
+import os
+import random
+import sqlite3
+import time
+from pathlib import Path
+from pyprojroot import here
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS token_buckets (
+    name    TEXT PRIMARY KEY,
+    tokens  REAL NOT NULL,
+    updated REAL NOT NULL  -- wall-clock time, comparable across processes
+);
+CREATE TABLE IF NOT EXISTS circuit_breakers (
+    name        TEXT PRIMARY KEY,
+    failures    INTEGER NOT NULL,
+    open_until  REAL NOT NULL,
+    last_reason TEXT
+);
+"""
+
+# Text of the pages X shows instead of results when it throttles or fails a request.
+INTERSTITIAL_MARKERS = {
+    "rate_limit": (
+        "Rate limit exceeded",
+        "You are over the daily limit",
+        "Sorry, you are rate limited",
+    ),
+    "error": (
+        "Something went wrong. Try reloading.",
+        "Something went wrong, but don",
+    ),
+}
+
+
+class ScrapeBlockedError(RuntimeError):
+    """Raised when X keeps answering with rate-limit or error pages."""
+
+
+def default_state_path():
+    """Returns the path of the state shared by all scraping processes (output/rate_limit.sqlite)."""
+    return Path(str(here("output"))) / "rate_limit.sqlite"
+
+
+def _connect(path):
+    path = Path(path) if path else default_state_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Autocommit mode; each update runs in an explicit BEGIN IMMEDIATE transaction so
+    # concurrent workers serialise on the file lock. A session's limiter and breaker are
+    # handed between process_year's scheduler and worker threads, never used by both at once.
+    conn = sqlite3.connect(
+        str(path), timeout=60, isolation_level=None, check_same_thread=False
+    )
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def detect_interstitial(page_text):
+    """Returns "rate_limit" or "error" if `page_text` shows one of X's interstitials, else None."""
+    if not page_text:
+        return None
+    for kind, markers in INTERSTITIAL_MARKERS.items():
+        if any(marker in page_text for marker in markers):
+            return kind
+    return None
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: allows bursts of up to `capacity` requests, refilled at
+    `rate` tokens per second. acquire() blocks until a token is available.
+
+    Args:
+        rate (float): Tokens added per second (e.g. 20 / 60 for 20 page loads a minute).
+        capacity (float): Maximum burst size.
+        clock (callable): Monotonic time source (injectable for benchmarks).
+        sleep (callable): Sleep function used while waiting for tokens.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = capacity
+        self.updated = clock()
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Takes `tokens` if available right now; returns whether it did."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def acquire(self, tokens=1):
+        """Blocks until `tokens` are available, then takes them. Returns seconds waited."""
+        waited = 0.0
+        while not self.try_acquire(tokens):
+            delay = (tokens - self.tokens) / self.rate
+            self.sleep(delay)
+            waited += delay
+        self.waited_seconds += waited
+        return waited
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    TokenBucket whose tokens live in the shared SQLite state file, so every scraping
+    process (scrape_cron, scrape_init, refresh_cron, ...) draws from one budget.
+
+    Args:
+        name (str): Bucket name; processes using the same name share tokens.
+        rate (float): Tokens added per second.
+        capacity (float): Maximum burst size.
+        path (str or Path, optional): State file (defaults to output/rate_limit.sqlite).
+    """
+
+    def __init__(self, name, rate, capacity=1, path=None, sleep=time.sleep):
+        super().__init__(rate, capacity=capacity, clock=time.time, sleep=sleep)
+        self.name = name
+        self.conn = _connect(path)
+
+    def try_acquire(self, tokens=1):
+        now = self.clock()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute(
+                "SELECT tokens, updated FROM token_buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+            stored, updated = row if row else (self.capacity, now)
+            self.tokens = min(self.capacity, stored + max(0.0, now - updated) * self.rate)
+            acquired = self.tokens >= tokens
+            if acquired:
+                self.tokens -= tokens
+            self.conn.execute(
+                "INSERT OR REPLACE INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?)",
+                (self.name, self.tokens, now),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return acquired
+
+    def close(self):
+        self.conn.close()
+
+
+class CircuitBreaker:
+    """
+    Cross-process circuit breaker for one site/account. Every interstitial recorded with
+    record_failure() opens the circuit for an exponentially growing, jittered cooldown
+    (base_delay * 2^(failures-1), capped at max_delay, times 1 +/- jitter). A successful
+    scrape closes it again. The cooldown is kept in the shared state file, so a worker
+    starting up while another has just been throttled waits too.
+
+    Args:
+        name (str): Breaker name (e.g. "x" or an account name).
+        base_delay (float): Cooldown in seconds after the first failure.
+        max_delay (float): Upper bound on the cooldown.
+        jitter (float): Relative jitter applied to each cooldown.
+        path (str or Path, optional): State file (defaults to output/rate_limit.sqlite).
+    """
+
+    def __init__(
+        self,
+        name="x",
+        base_delay=60,
+        max_delay=1800,
+        jitter=0.5,
+        path=None,
+        rng=None,
+        sleep=time.sleep,
+    ):
+        self.name = name
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+        self.conn = _connect(path)
+
+    def close(self):
+        self.conn.close()
+
+    def _state(self):
+        row = self.conn.execute(
+            "SELECT failures, open_until, last_reason FROM circuit_breakers WHERE name = ?",
+            (self.name,),
+        ).fetchone()
+        return row if row else (0, 0.0, None)
+
+    def _store(self, failures, open_until, reason):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO circuit_breakers (name, failures, open_until, last_reason) "
+            "VALUES (?, ?, ?, ?)",
+            (self.name, failures, open_until, reason),
+        )
+
+    def record_failure(self, reason):
+        """Opens the circuit after an interstitial; returns the cooldown in seconds."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            failures, open_until, _ = self._state()
+            failures += 1
+            delay = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+            delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+            open_until = max(open_until, now + delay)
+            self._store(failures, open_until, reason)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return open_until - now
+
+    def record_success(self):
+        """Closes the circuit and resets the failure count."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._store(0, 0.0, None)
+        self.conn.execute("COMMIT")
+
+    def remaining(self):
+        """Returns the seconds left before the circuit closes (0 if it is closed)."""
+        return max(0.0, self._state()[1] - time.time())
+
+    def wait_until_closed(self, max_wait=None):
+        """
+        Sleeps until the circuit closes. Returns the seconds waited, or None without
+        waiting if the cooldown is longer than `max_wait`.
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            return 0.0
+        if max_wait is not None and remaining > max_wait:
+            return None
+        self.sleep(remaining)
+        return remaining
+
+
+def shared_page_limiter(rate_per_minute=None, path=None, account="MAIN"):
+    """
+    Returns the token bucket every scraping process draws `account`'s page loads and
+    scrolls from. The rate defaults to SCRAPE_RATE_PER_MINUTE (30 requests a minute).
+    """
+    rate_per_minute = rate_per_minute or float(os.getenv("SCRAPE_RATE_PER_MINUTE", "30"))
+    return SharedTokenBucket(
+        f"x_pages:{account}", rate_per_minute / 60.0, capacity=3, path=path
+    )
+
+
+def account_breaker(account="MAIN", path=None):
+    """Returns the circuit breaker shared by every process scraping as `account`."""
+    return CircuitBreaker(name=f"x:{account}", path=path)
@@ -0,0 +1,213 @@
+import json
+import math
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from pyprojroot import here
+
+# Per-stage timings (seconds) that the report summarises.
+LEDGER_STAGES = [
+    "driver_start_seconds",
+    "login_seconds",
+    "first_article_seconds",
+    "scroll_seconds",
+    "parse_seconds",
+    "store_seconds",
+    "rate_limit_wait_seconds",
+    "backoff_seconds",
+    "recycle_seconds",
+    "total_seconds",
+]
+
+# Per-URL counters that the report summarises alongside the stage timings.
+LEDGER_COUNTERS = [
+    "scroll_iterations",
+    "tweets_seen",
+    "tweets_new",
+    "tweets_known",
+    "tweets_unattributed",
+    "resumed_records",
+    "flushes",
+    "bytes_grown",
+    "interstitials",
+    "driver_recycles",
+    "peak_heap_mb",
+]
+
+
+def default_ledger_path():
+    """Returns the path of the scrape run ledger (output/run_ledger.jsonl)."""
+    return Path(str(here("output"))) / "run_ledger.jsonl"
+
+
+def new_run_id():
+    """Returns an identifier shared by every ledger entry written in one process_year run."""
+    return f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def new_url_metrics(run_id, tag, url):
+    """
+    Returns an empty metrics record for one scraped URL. url_scraper fills in the
+    browser-side fields and process_year the storage-side ones.
+    """
+    return {
+        "run_id": run_id,
+        "tag": tag,
+        "url": url,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "driver_start_seconds": None,
+        "login_seconds": None,
+        "first_article_seconds": None,
+        "scroll_seconds": None,
+        "parse_seconds": 0.0,
+        "store_seconds": None,
+        "rate_limit_wait_seconds": 0.0,
+        "backoff_seconds": 0.0,
+        "recycle_seconds": 0.0,
+        "total_seconds": None,
+        "scroll_iterations": 0,
+        "tweets_seen": 0,
+        "tweets_new": None,
+        "tweets_known": 0,
+        "tweets_unattributed": 0,
+        "resumed_records": 0,
+        "flushes": 0,
+        "bytes_grown": 0,
+        "interstitials": 0,
+        "driver_recycles": 0,
+        "peak_heap_mb": None,
+        "stop_reason": None,
+        "failure_reason": None,
+    }
+
+
+def append_ledger_entry(entry, ledger_path=None):
+    """
+    Appends one metrics record as a JSON line to the run ledger. Failures to write are
+    printed and swallowed so instrumentation can never break a scrape.
+    """
+    ledger_path = Path(ledger_path) if ledger_path else default_ledger_path()
+    try:
+        ledger_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(ledger_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, default=str) + "\n")
+    except OSError as e:
+        print(f"Warning: could not write run ledger entry to {ledger_path}: {e}")
+
+
+def read_ledger(ledger_path=None, since=None):
+    """
+    Reads the run ledger into a list of dicts, skipping malformed lines.
+
+    Args:
+        ledger_path (str or Path, optional): Ledger file (defaults to output/run_ledger.jsonl).
+        since (str, optional): Only keep entries whose started_at is >= this ISO date/time.
+    """
+    ledger_path = Path(ledger_path) if ledger_path else default_ledger_path()
+    entries = []
+    if not ledger_path.is_file():
+        return entries
+    with open(ledger_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if since and str(entry.get("started_at", "")) < since:
+                continue
+            entries.append(entry)
+    return entries
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None if the list is empty)."""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+def summarise_ledger(entries):
+    """
+    Summarises ledger entries into p50/p95/total per stage and counter, plus a
+    count of failures by reason.
+
+    Returns:
+        dict: {"urls": int, "failures": {reason: count}, "fields": {name: {...}}}
+    """
+    summary = {"urls": len(entries), "failures": {}, "fields": {}}
+    for entry in entries:
+        reason = entry.get("failure_reason")
+        if reason:
+            # Keep the exception type / first line so similar failures group together
+            key = str(reason).splitlines()[0][:80]
+            summary["failures"][key] = summary["failures"].get(key, 0) + 1
+
+    for field in LEDGER_STAGES + LEDGER_COUNTERS:
+        values = [
+            entry[field]
+            for entry in entries
+            if isinstance(entry.get(field), (int, float))
+        ]
+        summary["fields"][field] = {
+            "n": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "total": sum(values) if values else None,
+        }
+    return summary
+
+
+def format_summary(summary):
+    """Formats the output of summarise_ledger as a printable table."""
+    lines = [f"URLs scraped: {summary['urls']}"]
+    lines.append(f"{'field':<24}{'n':>6}{'p50':>12}{'p95':>12}{'total':>14}")
+
+    def fmt(value):
+        return "-" if value is None else f"{value:.2f}"
+
+    for field, stats in summary["fields"].items():
+        lines.append(
+            f"{field:<24}{stats['n']:>6}{fmt(stats['p50']):>12}"
+            f"{fmt(stats['p95']):>12}{fmt(stats['total']):>14}"
+        )
+    if summary["failures"]:
+        lines.append("Failures:")
+        for reason, count in sorted(
+            summary["failures"].items(), key=lambda item: -item[1]
+        ):
+            lines.append(f"  {count:>4} x {reason}")
+    return "\n".join(lines)
+
+
+class StageClock:
+    """Small helper that records the time elapsed since construction or the last mark."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+
+    def lap(self):
+        """Returns seconds since the previous lap (or construction) and resets the lap."""
+        now = time.perf_counter()
+        elapsed = now - self.last
+        self.last = now
+        return elapsed
+
+    def total(self):
+        """Returns seconds since construction."""
+        return time.perf_counter() - self.start
+
+
+def file_size(path):
+    """Returns the size of `path` in bytes, or 0 if it does not exist."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
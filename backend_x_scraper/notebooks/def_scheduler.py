@@ -0,0 +1,154 @@
+import time
+
+
+class YieldScheduler:
+    """
+    Decides which tags are due for another scrape pass based on how many new tweets
+    their previous passes produced.
+
+    Tags that keep yielding new tweets are revisited every `base_interval` seconds.
+    Each zero-yield pass doubles (by `backoff`) the wait before the tag is tried again,
+    up to `max_interval`. A tag is considered converged once it has returned nothing
+    new for `converge_after` passes in a row; when every tag has converged the cron
+    loop can stop early instead of burning browser time on empty scrapes.
+
+    Args:
+        tags (iterable): The tags (e.g. "hashtag_2025") to schedule.
+        base_interval (float): Seconds between passes for a productive tag.
+        max_interval (float): Upper bound on the backed-off interval.
+        backoff (float): Multiplier applied to the interval after a zero-yield pass.
+        converge_after (int): Consecutive zero-yield passes before a tag is converged.
+    """
+
+    def __init__(
+        self,
+        tags,
+        base_interval=600,
+        max_interval=3 * 3600,
+        backoff=2.0,
+        converge_after=3,
+    ):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.converge_after = converge_after
+
+        now = time.time()
+        self.state = {
+            tag: {
+                "interval": base_interval,
+                "next_due": now,  # every tag gets an immediate first pass
+                "zero_streak": 0,
+                "passes": 0,
+                "total_new": 0,
+            }
+            for tag in tags
+        }
+
+    def record(self, tag, new_tweets, now=None):
+        """
+        Records the outcome of a pass for `tag` and schedules its next one.
+
+        Args:
+            tag (str): The tag that was scraped.
+            new_tweets (int or None): Tweets added after deduplication, or None if the
+                pass failed. Failed passes back off but do not count towards convergence.
+            now (float, optional): Timestamp of the pass (defaults to time.time()).
+        """
+        if tag not in self.state:
+            return
+        now = time.time() if now is None else now
+        tag_state = self.state[tag]
+        tag_state["passes"] += 1
+
+        if new_tweets:
+            tag_state["total_new"] += new_tweets
+            tag_state["zero_streak"] = 0
+            tag_state["interval"] = self.base_interval
+        else:
+            if new_tweets is not None:
+                tag_state["zero_streak"] += 1
+            tag_state["interval"] = min(
+                tag_state["interval"] * self.backoff, self.max_interval
+            )
+
+        tag_state["next_due"] = now + tag_state["interval"]
+
+    def is_converged(self, tag):
+        """Returns True once `tag` has hit `converge_after` zero-yield passes in a row."""
+        return self.state[tag]["zero_streak"] >= self.converge_after
+
+    def converged(self):
+        """Returns True when every scheduled tag has converged."""
+        return all(self.is_converged(tag) for tag in self.state)
+
+    def due_tags(self, now=None):
+        """Returns the unconverged tags whose next pass is due, most productive first."""
+        now = time.time() if now is None else now
+        due = [
+            tag
+            for tag, tag_state in self.state.items()
+            if not self.is_converged(tag) and tag_state["next_due"] <= now
+        ]
+        return sorted(due, key=lambda tag: -self.state[tag]["total_new"])
+
+    def seconds_until_next(self, now=None):
+        """Returns seconds until the next unconverged tag is due (0 if one is due now)."""
+        now = time.time() if now is None else now
+        pending = [
+            tag_state["next_due"]
+            for tag, tag_state in self.state.items()
+            if not self.is_converged(tag)
+        ]
+        if not pending:
+            return None
+        return max(0.0, min(pending) - now)
+
+    def summary(self):
+        """Returns a printable one-line-per-tag summary of the scheduler state."""
+        lines = []
+        for tag, tag_state in self.state.items():
+            status = "converged" if self.is_converged(tag) else "active"
+            lines.append(
+                f"{tag}: {status}, passes={tag_state['passes']}, "
+                f"new={tag_state['total_new']}, interval={tag_state['interval']:.0f}s"
+            )
+        return "\n".join(lines)
+
+
+def run_scheduled(year, scheduler, deadline, process_fn):
+    """
+    Runs scrape passes for the tags that `scheduler` marks as due until `deadline`
+    is reached or every tag has converged.
+
+    Args:
+        year (str or int): The env_suffix passed through to `process_fn`.
+        scheduler (YieldScheduler): Scheduler holding the per-tag state.
+        deadline (float): Unix timestamp after which no new pass is started.
+        process_fn (callable): Called as process_fn(year, tags=[...]) and expected to
+            return a dict of {tag: new tweets added (or None on failure)}.
+    """
+    while time.time() < deadline:
+        if scheduler.converged():
+            print("All tags converged (no new tweets). Ending scrape loop early.")
+            break
+
+        due = scheduler.due_tags()
+        if due:
+            print(f"\nRunning process_year for env_suffix {year} on tags: {due}")
+            try:
+                yields = process_fn(year, tags=due) or {}
+            except Exception as e:
+                print(f"Error in process_year: {e}")
+                yields = {}
+            for tag in due:
+                scheduler.record(tag, yields.get(tag))
+            print(scheduler.summary())
+            continue
+
+        wait = scheduler.seconds_until_next()
+        if wait is None:
+            break
+        wait = min(wait, max(0.0, deadline - time.time()))
+        print(f"Sleeping for {wait:.0f} seconds until the next tag is due...")
+        time.sleep(wait)
@@ -0,0 +1,62 @@
+import os
+import re
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, quote, urlencode, urlsplit, urlunsplit
+
+# X search operators that bound the upper end of a search's time window.
+_UNTIL_RE = re.compile(r"\s*\buntil(?:_time)?:\S+", re.IGNORECASE)
+
+
+def x_base_url():
+    """
+    Returns the root of the X site the scrapers log in to ("https://x.com"), which
+    X_BASE_URL overrides (e.g. with mock_x_server's address for offline load tests).
+    """
+    return os.getenv("X_BASE_URL", "https://x.com").rstrip("/")
+
+
+def search_query(url):
+    """Returns the decoded q= search string of an x.com/search URL ("" if absent)."""
+    return parse_qs(urlsplit(url).query).get("q", [""])[0]
+
+
+def _replace_params(url, **params):
+    parts = urlsplit(url)
+    query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+    query.update(params)
+    # %20 rather than + for spaces, matching the URLs construct_url builds
+    encoded = urlencode(query, quote_via=lambda s, *args: quote(str(s), safe=""))
+    return urlunsplit(parts._replace(query=encoded))
+
+
+def with_query(url, query):
+    """Returns `url` with its q= search string replaced by `query`."""
+    return _replace_params(url, q=query)
+
+
+def latest_timeline(url):
+    """Returns `url` switched to the Latest (f=live) timeline, which is newest-first."""
+    return _replace_params(url, f="live")
+
+
+def is_chronological(url):
+    """
+    True if `url` is on the Latest (f=live) timeline. Only there are results
+    newest-first, so a search can be resumed below the oldest tweet harvested; the Top
+    tab is ordered by relevance and still holds newer tweets further down.
+    """
+    return parse_qs(urlsplit(url).query).get("f", [""])[0] == "live"
+
+
+def narrow_until(url, oldest):
+    """
+    Returns `url` with its search window ending at `oldest` (a datetime or epoch
+    seconds), replacing any until:/until_time: operator. X's until_time: bound is
+    exclusive, so the tweet at `oldest` itself is not returned again.
+    """
+    if isinstance(oldest, datetime):
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        oldest = oldest.timestamp()
+    query = _UNTIL_RE.sub("", search_query(url)).strip()
+    return with_query(url, f"{query} until_time:{int(oldest)}".strip())
@@ -0,0 +1,251 @@
+import csv
+import hashlib
+import os
+import pickle
+import random
+import zlib
+from pathlib import Path
+
+from def_pending_work import INVALID_TEXTS
+
+# Labels of the RoBERTa model (twitter-roberta-base-sentiment-latest); rows carrying any
+# other value ("unknown", blanks) are not used for training.
+LABELS = ("negative", "neutral", "positive")
+
+# Cheap predictions at or above this probability are kept; the rest go to the model.
+DEFAULT_THRESHOLD = float(os.getenv("SENTIMENT_CASCADE_THRESHOLD", 0.9))
+
+# Hashes of the texts the cheap model labelled itself, one per line, kept next to the
+# tag CSVs. Those labels are not the transformer's, so training leaves them out.
+CASCADE_LABELS_FILE = "sentiment_cascade_labels.txt"
+
+
+def default_cascade_path():
+    """
+    Returns the cheap model's path: SENTIMENT_CASCADE_MODEL if set, else
+    output/sentiment_cascade.pkl.
+    """
+    configured = os.getenv("SENTIMENT_CASCADE_MODEL")
+    if configured:
+        return Path(configured)
+    from pyprojroot import here
+
+    return Path(str(here("output"))) / "sentiment_cascade.pkl"
+
+
+def text_hash(text):
+    """Returns the key a text is recorded under in CASCADE_LABELS_FILE."""
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def cascade_labelled_hashes(output_dir):
+    """Returns the text hashes in `output_dir`'s CASCADE_LABELS_FILE (empty if none)."""
+    path = os.path.join(output_dir, CASCADE_LABELS_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def load_labelled_texts(output_dir, ignore_files=("urls.csv",)):
+    """
+    Returns (texts, labels) from every scored tag CSV in `output_dir`, one entry per
+    distinct text (the same tweet is often stored under several tags). Streams the
+    files with the csv module, so memory grows with the distinct texts only. Texts the
+    cascade labelled itself (see CASCADE_LABELS_FILE) are left out, so the cheap model
+    only ever learns from the transformer.
+    """
+    csv.field_size_limit(min(2**31 - 1, 1 << 30))
+    cheap_labelled = cascade_labelled_hashes(output_dir)
+    labelled = {}
+    for filename in sorted(os.listdir(output_dir)):
+        if not filename.endswith(".csv") or filename in ignore_files:
+            continue
+        path = os.path.join(output_dir, filename)
+        with open(path, newline="", encoding="utf-8", errors="replace") as f:
+            reader = csv.DictReader(f)
+            if not reader.fieldnames or not {"Text", "sentiment"} <= set(reader.fieldnames):
+                continue
+            for row in reader:
+                text = (row["Text"] or "").strip()
+                label = (row["sentiment"] or "").strip()
+                if label not in LABELS or text in INVALID_TEXTS:
+                    continue
+                if cheap_labelled and text_hash(text) in cheap_labelled:
+                    continue
+                labelled.setdefault(text, label)
+    return list(labelled), list(labelled.values())
+
+
+def holdout_split(texts, labels, fraction=0.2):
+    """
+    Splits into (train texts, train labels, test texts, test labels), putting a text in
+    the test set by a hash of its content so the split is the same on every run.
+    """
+    train_texts, train_labels, test_texts, test_labels = [], [], [], []
+    cutoff = int(fraction * 2**32)
+    for text, label in zip(texts, labels):
+        if zlib.crc32(text.encode("utf-8")) < cutoff:
+            test_texts.append(text)
+            test_labels.append(label)
+        else:
+            train_texts.append(text)
+            train_labels.append(label)
+    return train_texts, train_labels, test_texts, test_labels
+
+
+class CheapSentimentModel:
+    """
+    Logistic regression on hashed word unigrams and bigrams, trained on the labels the
+    transformer has already written to our CSVs. Hashing needs no vocabulary, so the
+    pickled model is just the weights. scikit-learn is imported on first use, so it is
+    only needed where the cascade is trained or enabled.
+
+    Args:
+        n_features (int): Hash buckets.
+        C (float): Inverse regularisation strength of the logistic regression.
+    """
+
+    def __init__(self, n_features=2**20, C=16.0):
+        self.n_features = n_features
+        self.C = C
+        self.classifier = None
+
+    def _vectorizer(self):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        return HashingVectorizer(
+            n_features=self.n_features, ngram_range=(1, 2), alternate_sign=False
+        )
+
+    def fit(self, texts, labels):
+        from sklearn.linear_model import LogisticRegression
+
+        features = self._vectorizer().transform(texts)
+        self.classifier = LogisticRegression(max_iter=2000, C=self.C)
+        self.classifier.fit(features, labels)
+        return self
+
+    def predict(self, texts):
+        """Returns (labels, confidences): the likeliest label and its probability."""
+        probabilities = self.classifier.predict_proba(self._vectorizer().transform(texts))
+        best = probabilities.argmax(axis=1)
+        return (
+            [str(self.classifier.classes_[i]) for i in best],
+            probabilities.max(axis=1).tolist(),
+        )
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def threshold_report(model, texts, labels, thresholds):
+    """
+    Scores held-out `texts` whose transformer `labels` are known and returns one row per
+    threshold: the share the cheap model would handle (transformer calls avoided), its
+    agreement with the transformer on those, and the cascade's overall agreement
+    (cheap labels where confident, the transformer's elsewhere).
+    """
+    predicted, confidence = model.predict(texts)
+    rows = []
+    for threshold in thresholds:
+        handled = [c >= threshold for c in confidence]
+        n_handled = sum(handled)
+        agreed = sum(
+            h and p == t for h, p, t in zip(handled, predicted, labels)
+        )
+        rows.append(
+            {
+                "threshold": threshold,
+                "avoided": n_handled / len(texts) if texts else 0.0,
+                "agreement": agreed / n_handled if n_handled else 1.0,
+                "overall": (agreed + len(texts) - n_handled) / len(texts) if texts else 1.0,
+            }
+        )
+    return rows
+
+
+class CascadePipeline:
+    """
+    Drop-in replacement for the transformers pipeline in safe_sentiment_analysis:
+    texts the cheap model labels with at least `threshold` confidence keep its label,
+    and only the rest are sent to `pipe`.
+
+    `audit_rate` of the confidently labelled texts are sent to `pipe` as well, to
+    measure live agreement; the transformer's label is used for those. stats and
+    report() give the share of transformer calls avoided and the audited agreement.
+
+    With `labels_path`, the hash of every text kept with the cheap label is appended to
+    it (see CASCADE_LABELS_FILE) before the label is returned, so training can tell the
+    cascade's labels from the transformer's.
+    """
+
+    def __init__(
+        self,
+        cheap_model,
+        pipe,
+        threshold=DEFAULT_THRESHOLD,
+        audit_rate=0.0,
+        seed=0,
+        labels_path=None,
+    ):
+        self.cheap_model = cheap_model
+        self.pipe = pipe
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.labels_path = labels_path
+        self.rng = random.Random(seed)
+        self.stats = {"texts": 0, "transformer": 0, "audited": 0, "audit_agreed": 0}
+
+    @property
+    def tokenizer(self):
+        return self.pipe.tokenizer
+
+    def __call__(self, texts):
+        texts = list(texts)
+        if not texts:
+            return []
+        labels, confidence = self.cheap_model.predict(texts)
+        results = [{"label": label, "score": score} for label, score in zip(labels, confidence)]
+        confident = [score >= self.threshold for score in confidence]
+        audited = [c and self.rng.random() < self.audit_rate for c in confident]
+        to_transformer = [i for i, c in enumerate(confident) if not c or audited[i]]
+        if to_transformer:
+            for i, result in zip(to_transformer, self.pipe([texts[i] for i in to_transformer])):
+                if audited[i]:
+                    self.stats["audited"] += 1
+                    self.stats["audit_agreed"] += result["label"] == labels[i]
+                results[i] = result
+        if self.labels_path is not None:
+            kept = [t for t, c, a in zip(texts, confident, audited) if c and not a]
+            if kept:
+                with open(self.labels_path, "a", encoding="utf-8") as f:
+                    f.writelines(f"{text_hash(t)}\n" for t in kept)
+        self.stats["texts"] += len(texts)
+        self.stats["transformer"] += len(to_transformer)
+        return results
+
+    def report(self):
+        texts = self.stats["texts"]
+        avoided = texts - self.stats["transformer"]
+        line = (
+            f"Cascade (threshold {self.threshold}): {avoided}/{texts} texts labelled "
+            f"without the transformer ({100 * avoided / texts if texts else 0:.1f}% of calls avoided)"
+        )
+        if self.stats["audited"]:
+            agreement = self.stats["audit_agreed"] / self.stats["audited"]
+            line += (
+                f"; audited agreement {100 * agreement:.1f}% "
+                f"over {self.stats['audited']} texts"
+            )
+        return line
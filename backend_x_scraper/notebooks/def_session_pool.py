@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from pyprojroot import here
+
+from def_rate_limit import account_breaker, shared_page_limiter
+from def_search_url import x_base_url
+
+# Cookie that is only present once a browser session is logged in to X.
+AUTH_COOKIE = "auth_token"
+
+
+@dataclass
+class Account:
+    """One set of X credentials from .env."""
+
+    name: str
+    email: str
+    username: str
+    password: str
+    session_dir: Optional[Path] = None  # defaults to the project's .sessions/
+
+    def cookie_path(self):
+        """Returns where this account's session cookies are kept (.sessions/<name>.json)."""
+        session_dir = self.session_dir or Path(str(here(".sessions")))
+        return Path(session_dir) / f"{self.name.lower()}.json"
+
+
+def load_accounts():
+    """
+    Reads the scraping accounts from the environment (after loading .env).
+
+    The main account uses EMAIL_MAIN / USERNAME_MAIN / PASSWORD as before. Further
+    accounts are listed in SCRAPE_ACCOUNTS (e.g. "MAIN,ALT1,ALT2") and read from
+    EMAIL_<NAME> / USERNAME_<NAME> / PASSWORD_<NAME>. Accounts with missing credentials
+    are skipped with a warning.
+
+    Raises:
+        ValueError: If no account has complete credentials.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    names = [n.strip().upper() for n in os.getenv("SCRAPE_ACCOUNTS", "MAIN").split(",")]
+    accounts = []
+    for name in dict.fromkeys(n for n in names if n):
+        email = os.getenv(f"EMAIL_{name}")
+        username = os.getenv(f"USERNAME_{name}")
+        password = os.getenv(f"PASSWORD_{name}") or (
+            os.getenv("PASSWORD") if name == "MAIN" else None
+        )
+        if not email or not username or not password:
+            print(f"Warning: credentials for account {name} are incomplete; skipping it.")
+            continue
+        accounts.append(Account(name, email, username, password))
+    if not accounts:
+        raise ValueError("Twitter credentials are not set. Check your .env file!")
+    return accounts
+
+
+def main_account():
+    """
+    Returns the main account (EMAIL_MAIN / USERNAME_MAIN / PASSWORD), or the first
+    account in SCRAPE_ACCOUNTS if MAIN is not one of them.
+    """
+    accounts = load_accounts()
+    for account in accounts:
+        if account.name == "MAIN":
+            return account
+    return accounts[0]
+
+
+def save_cookies(driver, path):
+    """Writes the driver's cookies to `path` (atomically)."""
+    write_cookie_file(driver.get_cookies(), path)
+
+
+def write_cookie_file(cookies, path):
+    """Writes cookies in Selenium's get_cookies() format to `path` (atomically)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(cookies), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def saved_session_cookies(path):
+    """
+    Returns the cookies saved at `path` (in Selenium's get_cookies() format) if they
+    still include an unexpired auth cookie, else None.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return None
+    try:
+        cookies = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    now = time.time()
+    if not any(
+        c.get("name") == AUTH_COOKIE and c.get("expiry", now + 1) > now for c in cookies
+    ):
+        return None
+    return cookies
+
+
+def restore_cookies(driver, path):
+    """
+    Loads saved cookies into the driver and reports whether they still hold a logged-in
+    session. Returns False if there are no saved cookies or they have expired.
+    """
+    cookies = saved_session_cookies(path)
+    if cookies is None:
+        return False
+
+    # Cookies can only be set for the domain currently loaded
+    driver.get(f"{x_base_url()}/")
+    for cookie in cookies:
+        cookie.pop("sameSite", None)
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            continue
+    driver.get(f"{x_base_url()}/home")
+    return "/login" not in driver.current_url and "/i/flow" not in driver.current_url
+
+
+def login_session(driver, account):
+    """
+    Logs `driver` in as `account`, reusing its saved cookies when they are still valid
+    and logging in with the password (then saving fresh cookies) otherwise.
+
+    Returns:
+        bool: True if the saved session was reused.
+    """
+    from def_url_scraper import login_to_x
+
+    if restore_cookies(driver, account.cookie_path()):
+        print(f"Reused saved session for account {account.name}.")
+        return True
+    login_to_x(driver, account.email, account.username, account.password)
+    try:
+        save_cookies(driver, account.cookie_path())
+    except OSError as e:
+        print(f"Warning: could not save session cookies for {account.name}: {e}")
+    return False
+
+
+class ScrapeSession:
+    """An account together with its own rate budget and circuit breaker."""
+
+    def __init__(self, account, rate_per_minute=None, state_path=None):
+        self.account = account
+        self.limiter = shared_page_limiter(
+            rate_per_minute, path=state_path, account=account.name
+        )
+        self.breaker = account_breaker(account.name, path=state_path)
+        self.state_path = state_path
+        self.in_flight = 0
+        self.assigned = 0
+
+    def close(self):
+        self.limiter.close()
+        self.breaker.close()
+
+
+class SessionPool:
+    """
+    Hands out scraping sessions, one per account. acquire() picks the least-loaded
+    healthy session: idle, circuit breaker closed, and fewest scrapes assigned so far
+    in this run. Sessions are exclusive until release().
+    """
+
+    def __init__(self, accounts, rate_per_minute=None, state_path=None):
+        self.sessions = [
+            ScrapeSession(a, rate_per_minute=rate_per_minute, state_path=state_path)
+            for a in accounts
+        ]
+        self.lock = threading.Lock()
+        self.released = threading.Condition(self.lock)
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        return cls(load_accounts(), **kwargs)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+    def acquire(self, max_wait=None, poll_interval=5):
+        """
+        Returns the least-loaded healthy idle session, waiting up to `max_wait` seconds
+        (forever if None) for one to become available. Returns None on timeout.
+        """
+        deadline = None if max_wait is None else time.time() + max_wait
+        with self.released:
+            while True:
+                idle = [s for s in self.sessions if s.in_flight == 0]
+                healthy = [s for s in idle if s.breaker.remaining() <= 0]
+                if healthy:
+                    session = min(healthy, key=lambda s: s.assigned)
+                    session.in_flight += 1
+                    session.assigned += 1
+                    return session
+                # Wait until the soonest cooldown ends or a busy session is released
+                cooldowns = [s.breaker.remaining() for s in idle]
+                all_idle = len(idle) == len(self.sessions)
+                wait = min(cooldowns + [poll_interval])
+                if deadline is not None:
+                    left = deadline - time.time()
+                    if left <= 0 or (all_idle and min(cooldowns) > left):
+                        return None
+                    wait = min(wait, left)
+                self.released.wait(wait)
+
+    def release(self, session):
+        with self.released:
+            session.in_flight -= 1
+            self.released.notify_all()
+
+    def shortest_cooldown(self):
+        """
+        Returns the seconds until the first open breaker closes (0 if any is closed).
+        A busy session's breaker belongs to the worker thread using it, so each cooldown
+        is read through a breaker opened (and closed) by the calling thread.
+        """
+        cooldowns = []
+        for session in self.sessions:
+            breaker = account_breaker(session.account.name, path=session.state_path)
+            try:
+                cooldowns.append(breaker.remaining())
+            finally:
+                breaker.close()
+        return min(cooldowns)
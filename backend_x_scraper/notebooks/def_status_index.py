@@ -0,0 +1,170 @@
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from pyprojroot import here
+
+from def_tweet_record import status_id_from_url
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS statuses (
+    status_id  INTEGER PRIMARY KEY,
+    home_tag   TEXT NOT NULL,  -- the one tag file the tweet is stored (and scored) in
+    first_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS status_tags (
+    status_id INTEGER NOT NULL,
+    tag       TEXT NOT NULL,
+    PRIMARY KEY (status_id, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_status_tags_tag ON status_tags (tag);
+"""
+
+
+def default_index_path():
+    """Returns the path of the global status index (output/status_index.sqlite)."""
+    return Path(str(here("output"))) / "status_index.sqlite"
+
+
+class StatusIndex:
+    """
+    Global, cross-tag index of every status we have stored, keyed by status ID.
+
+    Each status has one home tag (the per-tag CSV it is written to, and therefore
+    scored in) plus a many-to-many set of tags whose searches returned it. When the
+    same tweet comes back from mention_2025, phrase_2025 and hashtag_2025 it is stored
+    once and the other tags are only recorded as memberships.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_index_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # process_year's workers store batches through one index, serialised by a lock
+        self.conn = sqlite3.connect(str(self.path), timeout=60, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def is_empty(self):
+        with closing(self.conn.execute("SELECT 1 FROM statuses LIMIT 1")) as cur:
+            return cur.fetchone() is None
+
+    def register(self, tag, status_ids):
+        """
+        Records that `tag`'s search returned `status_ids` and returns the home tag of
+        each one. IDs never seen before get `tag` as their home.
+
+        Returns:
+            dict: {status_id: home_tag}
+        """
+        with self.registration(tag, status_ids) as homes:
+            return homes
+
+    @contextmanager
+    def registration(self, tag, status_ids):
+        """
+        register() as a context manager: yields the home tags, and commits the new rows
+        when the block exits normally or rolls them back if it raises. Wrap the write
+        that stores the tweets in it, so a status is never homed in a tag whose file
+        write failed. The index stays write-locked for the block, so keep it short.
+        """
+        status_ids = [int(s) for s in dict.fromkeys(status_ids) if s is not None]
+        if not status_ids:
+            yield {}
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+        with self.conn:  # one transaction
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO statuses (status_id, home_tag, first_seen) VALUES (?, ?, ?)",
+                [(s, tag, now) for s in status_ids],
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO status_tags (status_id, tag) VALUES (?, ?)",
+                [(s, tag) for s in status_ids],
+            )
+            yield self.home_tags(status_ids)
+
+    def home_tags(self, status_ids):
+        """Returns {status_id: home_tag} for the given IDs that are in the index."""
+        homes = {}
+        status_ids = list(status_ids)
+        # Chunk to stay under SQLite's bound-parameter limit
+        for start in range(0, len(status_ids), 500):
+            chunk = status_ids[start : start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with closing(
+                self.conn.execute(
+                    f"SELECT status_id, home_tag FROM statuses WHERE status_id IN ({placeholders})",
+                    chunk,
+                )
+            ) as cur:
+                homes.update(cur.fetchall())
+        return homes
+
+    def tags_for(self, status_id):
+        """Returns the sorted list of tags whose searches returned `status_id`."""
+        with closing(
+            self.conn.execute(
+                "SELECT tag FROM status_tags WHERE status_id = ? ORDER BY tag",
+                (int(status_id),),
+            )
+        ) as cur:
+            return [row[0] for row in cur.fetchall()]
+
+    def status_ids_for_tag(self, tag):
+        """Returns the set of status IDs that `tag`'s searches have returned."""
+        with closing(
+            self.conn.execute("SELECT status_id FROM status_tags WHERE tag = ?", (tag,))
+        ) as cur:
+            return {row[0] for row in cur.fetchall()}
+
+    def memberships_frame(self):
+        """Returns the status/tag relation as a DataFrame (status_id, tag, home_tag)."""
+        import pandas as pd
+
+        return pd.read_sql_query(
+            "SELECT t.status_id, t.tag, s.home_tag FROM status_tags t "
+            "JOIN statuses s USING (status_id) ORDER BY t.status_id, t.tag",
+            self.conn,
+        )
+
+    def bootstrap_from_outputs(self, output_dir, ignore_files=("urls.csv",)):
+        """
+        Seeds the index from the existing per-tag CSVs. Files are read in sorted order
+        and a status found in several files gets the first one as its home tag.
+        Returns the number of statuses indexed.
+        """
+        import pandas as pd
+
+        for filename in sorted(os.listdir(output_dir)):
+            if not filename.endswith(".csv") or filename in ignore_files:
+                continue
+            try:
+                urls = pd.read_csv(
+                    os.path.join(output_dir, filename), usecols=["Tweet URL"]
+                )["Tweet URL"]
+            except (ValueError, OSError) as e:
+                print(f"Skipping {filename} while bootstrapping status index: {e}")
+                continue
+            tag = filename[: -len(".csv")]
+            self.register(tag, [status_id_from_url(u) for u in urls])
+        with closing(self.conn.execute("SELECT COUNT(*) FROM statuses")) as cur:
+            return cur.fetchone()[0]
+
+
+def open_status_index(output_dir, path=None):
+    """Opens the status index, bootstrapping it from `output_dir` on first use."""
+    index = StatusIndex(path)
+    if index.is_empty():
+        print("Status index is empty; bootstrapping from existing tag files...")
+        count = index.bootstrap_from_outputs(output_dir)
+        print(f"Status index bootstrapped with {count} statuses.")
+    return index
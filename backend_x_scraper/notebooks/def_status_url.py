@@ -0,0 +1,54 @@
+import re
+
+# Matches "/<handle>/status/<id>" with optional scheme/host and any trailing path
+# ("/photo/1", "/analytics", "/retweets", ...) or query string.
+_STATUS_PATH_RE = re.compile(
+    r"^(?:https?://(?:www\.|mobile\.)?(?:x|twitter)\.com)?"
+    r"/(?P<author>[A-Za-z0-9_]+|i/web|i)/status(?:es)?/(?P<id>\d+)",
+    re.IGNORECASE,
+)
+
+
+def parse_status_href(href):
+    """
+    Splits a status link into (author, status_id).
+
+    Handles relative and absolute x.com/twitter.com links, trailing sub-pages such as
+    /photo/1 or /analytics, and /i/web/status/<id> links (author None).
+    Returns (None, None) if `href` is not a status link.
+    """
+    match = _STATUS_PATH_RE.match(str(href or "").strip())
+    if not match:
+        return None, None
+    author = match.group("author")
+    if author.lower() in ("i", "i/web"):
+        author = None
+    return (author.lower() if author else None), int(match.group("id"))
+
+
+def canonical_status_url(author, status_id):
+    """Returns https://x.com/<lower-case author>/status/<id> (or /i/status/<id>)."""
+    return f"https://x.com/{(author or 'i').lower()}/status/{int(status_id)}"
+
+
+def canonicalise_url(url):
+    """Returns the canonical form of a status URL, or `url` unchanged if it isn't one."""
+    author, status_id = parse_status_href(url)
+    if status_id is None:
+        return url
+    return canonical_status_url(author, status_id)
+
+
+def dedupe_key(url):
+    """Key to deduplicate rows on: the numeric status ID, or the raw URL as a fallback."""
+    _, status_id = parse_status_href(url)
+    return status_id if status_id is not None else url
+
+
+def drop_duplicate_statuses(frame, url_column="Tweet URL"):
+    """
+    Drops DataFrame rows that repeat an earlier row's status (the first row wins), so
+    /photo/1, /analytics and differently-cased links to one tweet count once.
+    """
+    keys = frame[url_column].map(dedupe_key)
+    return frame[~keys.duplicated()]
@@ -0,0 +1,172 @@
+import base64
+import json
+from datetime import datetime
+
+# GraphQL operation whose responses hold the search results we scrape.
+SEARCH_TIMELINE_MARKER = "SearchTimeline"
+
+
+def _twitter_time_to_iso(created_at):
+    """Converts X's "Wed Oct 10 20:19:24 +0000 2018" timestamps to the DOM's ISO format."""
+    try:
+        parsed = datetime.strptime(created_at, "%a %b %d %H:%M:%S %z %Y")
+    except (TypeError, ValueError):
+        return "Unknown"
+    return parsed.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _iter_tweet_results(node):
+    """Yields every tweet_results.result dict found anywhere in a timeline payload."""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "tweet_results" and isinstance(value, dict):
+                if isinstance(value.get("result"), dict):
+                    yield value["result"]
+            else:
+                yield from _iter_tweet_results(value)
+    elif isinstance(node, list):
+        for item in node:
+            yield from _iter_tweet_results(item)
+
+
+def _screen_name(result):
+    user = result.get("core", {}).get("user_results", {}).get("result", {})
+    return (
+        user.get("core", {}).get("screen_name")
+        or user.get("legacy", {}).get("screen_name")
+        or "i"  # x.com/i/status/<id> resolves without knowing the author
+    )
+
+
+def tweet_result_to_record(result):
+    """
+    Converts one tweet_results.result object into the record shape url_scraper writes,
+    with the exact status ID, full timestamp, integer engagement counts and full text.
+    Returns None for tombstones and other non-tweet results.
+    """
+    if result.get("__typename") == "TweetWithVisibilityResults":
+        result = result.get("tweet", {})
+    legacy = result.get("legacy")
+    if not legacy or not legacy.get("id_str"):
+        return None
+
+    status_id = legacy["id_str"]
+    note = (
+        result.get("note_tweet", {})
+        .get("note_tweet_results", {})
+        .get("result", {})
+        .get("text")
+    )
+    entities = legacy.get("entities", {})
+    return {
+        "Tweet URL": f"https://x.com/{_screen_name(result)}/status/{status_id}",
+        "Created At": _twitter_time_to_iso(legacy.get("created_at")),
+        "Text": note or legacy.get("full_text", "Unknown"),
+        "Tweet ID": status_id,
+        "Likes": legacy.get("favorite_count", "Unknown"),
+        "Retweets": legacy.get("retweet_count", "Unknown"),
+        "Replies": legacy.get("reply_count", "Unknown"),
+        "Hashtags": ", ".join(f"#{h['text']}" for h in entities.get("hashtags", [])),
+        "Mentions": ", ".join(
+            f"@{m['screen_name']}" for m in entities.get("user_mentions", [])
+        ),
+        "URLs": ", ".join(
+            u.get("expanded_url") or u.get("url", "") for u in entities.get("urls", [])
+        ),
+    }
+
+
+def parse_timeline_payload(payload):
+    """
+    Extracts tweet records from one SearchTimeline (or similar timeline) JSON payload.
+
+    Args:
+        payload (dict or str): The decoded response body, or its raw JSON text.
+
+    Returns:
+        list[dict]: Records in timeline order (duplicates within the payload removed).
+    """
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    records = []
+    seen_ids = set()
+    for result in _iter_tweet_results(payload):
+        record = tweet_result_to_record(result)
+        if record and record["Tweet ID"] not in seen_ids:
+            seen_ids.add(record["Tweet ID"])
+            records.append(record)
+    return records
+
+
+class TimelineResponseCollector:
+    """
+    Pulls the page's own timeline JSON responses out of Chrome's DevTools performance
+    log, so tweets can be read without parsing the rendered DOM.
+
+    The driver must be started with the "goog:loggingPrefs" {"performance": "ALL"}
+    capability (see enable_performance_logging). Call poll() after each scroll.
+    """
+
+    def __init__(self, driver, url_marker=SEARCH_TIMELINE_MARKER):
+        self.driver = driver
+        self.url_marker = url_marker
+        self.pending = set()  # request IDs whose bodies have not been fetched yet
+        self.finished = set()  # request IDs Chrome reports as fully loaded
+        self.error_statuses = []  # HTTP statuses >= 400 seen on timeline requests
+
+    def poll(self):
+        """Returns the decoded JSON payloads of timeline responses completed since the last poll."""
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                response = params.get("response", {})
+                if self.url_marker in response.get("url", ""):
+                    if response.get("status", 200) >= 400:
+                        self.error_statuses.append(response["status"])
+                    else:
+                        self.pending.add(params["requestId"])
+            elif method == "Network.loadingFinished":
+                self.finished.add(params.get("requestId"))
+
+        payloads = []
+        for request_id in sorted(self.pending & self.finished):
+            self.pending.discard(request_id)
+            self.finished.discard(request_id)
+            try:
+                body = self.driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}
+                )
+            except Exception as e:
+                print(f"DEBUG: Could not read timeline response {request_id}: {e}")
+                continue
+            text = body.get("body", "")
+            if body.get("base64Encoded"):
+                text = base64.b64decode(text).decode("utf-8", errors="replace")
+            try:
+                payloads.append(json.loads(text))
+            except ValueError:
+                continue
+        # Request IDs that never matched our marker are dropped so the set stays small
+        self.finished &= self.pending
+        return payloads
+
+    def take_interstitial(self):
+        """
+        Returns "rate_limit" if a timeline request got HTTP 429 since the last call,
+        "error" for other 4xx/5xx responses, else None.
+        """
+        statuses, self.error_statuses = self.error_statuses, []
+        if not statuses:
+            return None
+        return "rate_limit" if 429 in statuses else "error"
+
+
+def enable_performance_logging(options):
+    """Turns on the DevTools performance log needed by TimelineResponseCollector."""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
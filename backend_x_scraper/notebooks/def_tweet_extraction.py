@@ -0,0 +1,297 @@
+import importlib.util
+
+from def_status_url import canonical_status_url, parse_status_href
+
+# Parsers that walk each article's anchors once instead of via BeautifulSoup.
+FAST_PARSERS = ("selectolax", "lxml-fast")
+
+# BeautifulSoup parser backends.
+BS4_PARSERS = ("html.parser", "lxml", "html5lib")
+
+
+def best_available_parser():
+    """Returns the fastest installed parser: selectolax, then lxml, then html.parser."""
+    if importlib.util.find_spec("selectolax"):
+        return "selectolax"
+    if importlib.util.find_spec("lxml"):
+        return "lxml-fast"
+    return "html.parser"
+
+
+def extract_tweets(page_source, parser="auto"):
+    """
+    Extracts tweet records from the HTML of a rendered X search/profile page.
+
+    This is the parsing half of url_scraper, kept free of any browser code so it can be
+    run against captured page snapshots (see def_fixture_replay).
+
+    Args:
+        page_source (str): The page HTML (e.g. driver.page_source).
+        parser (str): "auto" (fastest installed), one of FAST_PARSERS, or a
+            BeautifulSoup backend from BS4_PARSERS.
+
+    Returns:
+        list[dict]: One record per <article> that links to a status, with the same keys
+        as the columns url_scraper writes.
+    """
+    if parser == "auto":
+        parser = best_available_parser()
+    if parser == "selectolax":
+        return _extract_selectolax(page_source)
+    if parser == "lxml-fast":
+        return _extract_lxml(page_source)
+    return _extract_bs4(page_source, parser)
+
+
+def _permalink(time_href, first_status_href, tweet_id):
+    """
+    Returns (canonical URL, Tweet ID) for an article.
+
+    The tweet's own permalink is the anchor wrapping its <time>; the first /status/
+    anchor is only a fallback, because it can be a /photo/1 or /analytics link or
+    belong to a quoted tweet. Tweet ID falls back to the status ID in the permalink.
+    """
+    author, status_id = parse_status_href(time_href)
+    if status_id is None:
+        author, status_id = parse_status_href(first_status_href)
+    if status_id is None:
+        return f"https://x.com{first_status_href}", tweet_id
+    if tweet_id in (None, "", "Unknown"):
+        tweet_id = str(status_id)
+    return canonical_status_url(author, status_id), tweet_id
+
+
+def _make_record(tweet_url, created_at, text, tweet_id, likes, retweets, replies, anchors):
+    """
+    Builds the output record from the pieces of one article. `anchors` is a list of
+    (href, text) pairs in document order, classified here in a single pass.
+    """
+    hashtags, mentions, urls = [], [], []
+    for href, anchor_text in anchors:
+        if "#" in anchor_text:
+            hashtags.append(anchor_text.strip())
+        if "@" in anchor_text:
+            mentions.append(anchor_text.strip())
+        if "http" in href:
+            urls.append(href)
+    return {
+        "Tweet URL": tweet_url,
+        "Created At": created_at,
+        "Text": text,
+        "Tweet ID": tweet_id,
+        "Likes": likes,
+        "Retweets": retweets,
+        "Replies": replies,
+        "Hashtags": ", ".join(hashtags),
+        "Mentions": ", ".join(mentions),
+        "URLs": ", ".join(urls),
+    }
+
+
+def _extract_selectolax(page_source):
+    try:
+        from selectolax.lexbor import LexborHTMLParser as HTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+
+    records = []
+    for tweet in HTMLParser(page_source).css("article"):
+        try:
+            anchors = []
+            status_href = None
+            for anchor in tweet.css("a"):
+                href = anchor.attributes.get("href") or ""
+                if status_href is None and "/status/" in href:
+                    status_href = href
+                anchors.append((href, anchor.text(deep=True)))
+            if status_href is None:
+                continue
+
+            def testid_text(testid):
+                # X renders the counts as buttons, so match the test ID on any element
+                node = tweet.css_first(f'[data-testid="{testid}"]')
+                return node.text(deep=True, separator="", strip=True) if node else "Unknown"
+
+            date_tag = tweet.css_first("time")
+            text_tag = tweet.css_first("div[lang]")
+            time_link = date_tag.parent if date_tag else None
+            tweet_url, tweet_id = _permalink(
+                time_link.attributes.get("href")
+                if time_link and time_link.tag == "a"
+                else None,
+                status_href,
+                tweet.attributes.get("data-tweet-id") or "Unknown",
+            )
+            records.append(
+                _make_record(
+                    tweet_url,
+                    (date_tag.attributes.get("datetime") if date_tag else None)
+                    or "Unknown",
+                    text_tag.text(deep=True, separator="", strip=True)
+                    if text_tag
+                    else "Unknown",
+                    tweet_id,
+                    testid_text("like"),
+                    testid_text("retweet"),
+                    testid_text("reply"),
+                    anchors,
+                )
+            )
+        except Exception as e:
+            print(f"Error extracting tweet: {e}")
+            continue
+    return records
+
+
+def _extract_lxml(page_source):
+    import lxml.html
+
+    def stripped_text(element):
+        return "".join(part.strip() for part in element.itertext())
+
+    records = []
+    if not page_source.strip():
+        return records
+    document = lxml.html.fromstring(page_source)
+    for tweet in document.iter("article"):
+        try:
+            anchors = []
+            status_href = None
+            date_tag = None
+            text_tag = None
+            metrics = {}
+            # One walk over the article collects every element we need
+            for element in tweet.iter():
+                tag = element.tag
+                if tag == "a":
+                    href = element.get("href") or ""
+                    if status_href is None and "/status/" in href:
+                        status_href = href
+                    anchors.append((href, element.text_content()))
+                elif tag == "time" and date_tag is None:
+                    date_tag = element
+                else:
+                    if tag == "div" and text_tag is None and element.get("lang") is not None:
+                        text_tag = element
+                    # X renders the counts as buttons, so any element may carry the ID
+                    testid = element.get("data-testid")
+                    if testid in ("like", "retweet", "reply") and testid not in metrics:
+                        metrics[testid] = stripped_text(element)
+            if status_href is None:
+                continue
+            time_link = date_tag.getparent() if date_tag is not None else None
+            tweet_url, tweet_id = _permalink(
+                time_link.get("href")
+                if time_link is not None and time_link.tag == "a"
+                else None,
+                status_href,
+                tweet.get("data-tweet-id") or "Unknown",
+            )
+            records.append(
+                _make_record(
+                    tweet_url,
+                    (date_tag.get("datetime") if date_tag is not None else None)
+                    or "Unknown",
+                    stripped_text(text_tag) if text_tag is not None else "Unknown",
+                    tweet_id,
+                    metrics.get("like", "Unknown"),
+                    metrics.get("retweet", "Unknown"),
+                    metrics.get("reply", "Unknown"),
+                    anchors,
+                )
+            )
+        except Exception as e:
+            print(f"Error extracting tweet: {e}")
+            continue
+    return records
+
+
+def _extract_bs4(page_source, parser):
+    """Original BeautifulSoup extraction, kept as the reference implementation."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(page_source, parser)
+    tweets = soup.find_all("article")
+
+    records = []
+    for tweet in tweets:
+        try:
+            # Extract the first <a> tag containing '/status/'
+            tweet_link_tag = tweet.find(
+                "a", href=lambda href: href and "/status/" in href
+            )
+            if not tweet_link_tag:
+                continue
+
+            # Extract tweet creation time
+            date_tag = tweet.find("time")
+            created_at = date_tag["datetime"] if date_tag else "Unknown"
+
+            # Prefer the permalink wrapping <time>; also gives the Tweet ID
+            time_link = date_tag.parent if date_tag else None
+            tweet_url, tweet_id = _permalink(
+                time_link.get("href") if time_link and time_link.name == "a" else None,
+                tweet_link_tag["href"],
+                tweet.get("data-tweet-id", "Unknown"),
+            )
+
+            # Extract engagement metrics (buttons on X, so matched on any element)
+            likes_tag = tweet.find(attrs={"data-testid": "like"})
+            likes = likes_tag.get_text(strip=True) if likes_tag else "Unknown"
+
+            retweets_tag = tweet.find(attrs={"data-testid": "retweet"})
+            retweets = retweets_tag.get_text(strip=True) if retweets_tag else "Unknown"
+
+            replies_tag = tweet.find(attrs={"data-testid": "reply"})
+            replies = replies_tag.get_text(strip=True) if replies_tag else "Unknown"
+
+            # Extract hashtags and mentions
+            hashtags = [
+                tag.get_text(strip=True)
+                for tag in tweet.find_all("a")
+                if "#" in tag.get_text()
+            ]
+            mentions = [
+                tag.get_text(strip=True)
+                for tag in tweet.find_all("a")
+                if "@" in tag.get_text()
+            ]
+
+            # Extract URLs in tweet
+            urls = [
+                tag.get("href", "Unknown")
+                for tag in tweet.find_all("a")
+                if "http" in tag.get("href", "")
+            ]
+
+            # Extract tweet text
+            tweet_text = (
+                tweet.find("div", {"lang": True}).get_text(strip=True)
+                if tweet.find("div", {"lang": True})
+                else "Unknown"
+            )
+
+            records.append(
+                {
+                    "Tweet URL": tweet_url,
+                    "Created At": created_at,
+                    "Text": tweet_text,
+                    "Tweet ID": tweet_id,
+                    "Likes": likes,
+                    "Retweets": retweets,
+                    "Replies": replies,
+                    "Hashtags": ", ".join(hashtags),
+                    "Mentions": ", ".join(mentions),
+                    "URLs": ", ".join(urls),
+                }
+            )
+        except Exception as e:
+            print(f"Error extracting tweet: {e}")
+            continue
+
+    return records
+
+
+def count_articles(page_source):
+    """Cheap count of <article> elements in a page (used by the benchmarks)."""
+    return page_source.count("<article")
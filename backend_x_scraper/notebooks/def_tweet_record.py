@@ -0,0 +1,184 @@
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Optional, Tuple
+
+from def_status_url import canonicalise_url
+
+# Column order of the per-tag CSV files (sentiment is added later by sentiment_cron).
+CSV_COLUMNS = [
+    "Tweet URL",
+    "Created At",
+    "Text",
+    "Tweet ID",
+    "Likes",
+    "Retweets",
+    "Replies",
+    "Hashtags",
+    "Mentions",
+    "URLs",
+    "tag",
+]
+
+# Timestamp format X renders in <time datetime="..."> and our CSVs have always used.
+CSV_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+_STATUS_RE = re.compile(r"/status/(\d+)")
+_COUNT_RE = re.compile(r"^([\d.,]+)\s*([KkMmBb]?)$")
+_SCALE = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+def parse_count(value):
+    """
+    Converts an engagement count to int: 12 -> 12, "1,234" -> 1234, "1.2K" -> 1200,
+    "3M" -> 3000000. Empty, "Unknown" and unparseable values become None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return None if value != value else round(value)  # NaN check
+    match = _COUNT_RE.match(str(value).strip())
+    if not match:
+        return None
+    number, suffix = match.groups()
+    try:
+        if suffix:
+            # Decimal, so "1.15K" is 1150 rather than float's 1149.999...
+            return int(Decimal(number.replace(",", "")) * _SCALE[suffix.upper()])
+        return int(number.replace(",", ""))
+    except (ValueError, InvalidOperation):
+        return None
+
+
+def status_id_from_url(url):
+    """Returns the numeric status ID in a tweet URL as an int, or None."""
+    match = _STATUS_RE.search(str(url or ""))
+    return int(match.group(1)) if match else None
+
+
+def parse_created_at(value):
+    """Parses an ISO timestamp ("2024-10-28T13:06:08.000Z") to an aware UTC datetime."""
+    if not value or value == "Unknown":
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def intern_list(value):
+    """Splits a comma-joined string (or list) into a tuple of interned strings."""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(sys.intern(item.strip()) for item in value if item and item.strip())
+
+
+@dataclass(slots=True)
+class TweetRecord:
+    """
+    One scraped tweet, stored compactly: integer status ID and metrics, a datetime
+    instead of a timestamp string, and interned tuples for the hashtags, mentions and
+    tag, which repeat across thousands of tweets in the cron loop.
+    """
+
+    url: str
+    status_id: Optional[int]
+    created_at: Optional[datetime]
+    text: Optional[str]
+    likes: Optional[int]
+    retweets: Optional[int]
+    replies: Optional[int]
+    hashtags: Tuple[str, ...] = ()
+    mentions: Tuple[str, ...] = ()
+    urls: Tuple[str, ...] = ()
+    tag: Optional[str] = None
+
+    @classmethod
+    def from_scraped(cls, record, tag=None):
+        """Builds a TweetRecord from an extraction dict (DOM or network mode)."""
+        text = record.get("Text")
+        tweet_id = record.get("Tweet ID")
+        status_id = (
+            int(tweet_id)
+            if str(tweet_id or "").isdigit()
+            else status_id_from_url(record.get("Tweet URL"))
+        )
+        return cls(
+            url=canonicalise_url(record["Tweet URL"]),
+            status_id=status_id,
+            created_at=parse_created_at(record.get("Created At")),
+            text=None if text in (None, "Unknown") else text,
+            likes=parse_count(record.get("Likes")),
+            retweets=parse_count(record.get("Retweets")),
+            replies=parse_count(record.get("Replies")),
+            hashtags=intern_list(record.get("Hashtags")),
+            mentions=intern_list(record.get("Mentions")),
+            urls=tuple(u.strip() for u in (record.get("URLs") or "").split(",") if u.strip()),
+            tag=sys.intern(tag) if tag else None,
+        )
+
+
+def records_to_frame(records, tag=None):
+    """
+    Converts TweetRecords into a DataFrame with the CSV's column names and compact
+    dtypes: nullable Int64 IDs/metrics, a UTC datetime column, and categoricals for
+    the repeated Hashtags/Mentions/tag strings.
+
+    Args:
+        records (list[TweetRecord]): The records to convert.
+        tag (str, optional): Overrides each record's tag.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(
+        {
+            "Tweet URL": [r.url for r in records],
+            "Created At": pd.to_datetime(
+                [r.created_at for r in records], utc=True, errors="coerce"
+            ),
+            "Text": [r.text for r in records],
+            "Tweet ID": pd.array([r.status_id for r in records], dtype="Int64"),
+            "Likes": pd.array([r.likes for r in records], dtype="Int64"),
+            "Retweets": pd.array([r.retweets for r in records], dtype="Int64"),
+            "Replies": pd.array([r.replies for r in records], dtype="Int64"),
+            "Hashtags": pd.Categorical([", ".join(r.hashtags) for r in records]),
+            "Mentions": pd.Categorical([", ".join(r.mentions) for r in records]),
+            "URLs": [", ".join(r.urls) for r in records],
+            "tag": pd.Categorical([tag or r.tag for r in records]),
+        },
+        columns=CSV_COLUMNS,
+    )
+    return frame
+
+
+def csv_ready(frame):
+    """
+    Returns a copy of a records_to_frame DataFrame formatted the way the CSVs have
+    always been written (ISO "...000Z" timestamps), so typed and legacy rows can be
+    concatenated and written together.
+    """
+    import pandas as pd
+
+    out = frame.copy()
+    if pd.api.types.is_datetime64_any_dtype(out["Created At"]):
+        out["Created At"] = out["Created At"].dt.strftime(CSV_TIME_FORMAT)
+    for column in ("Hashtags", "Mentions", "tag"):
+        if column in out and isinstance(out[column].dtype, pd.CategoricalDtype):
+            out[column] = out[column].astype(object)
+    return out
+
+
+def read_tweets_csv(path):
+    """Reads a per-tag CSV with categorical tag/sentiment columns."""
+    import pandas as pd
+
+    return pd.read_csv(path, dtype={"tag": "category", "sentiment": "category"})
@@ -1,215 +1,539 @@
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from dotenv import load_dotenv
 import time
 import os
-import pandas as pd
-
-
-def url_scraper(target_url):
+from datetime import timedelta
+from def_driver_cache import resolve_chromedriver
+from def_fixture_replay import capture_page_source
+from def_rate_limit import (
+    ScrapeBlockedError,
+    account_breaker,
+    detect_interstitial,
+    shared_page_limiter,
+)
+from def_run_ledger import StageClock
+from def_search_url import is_chronological, latest_timeline, narrow_until, x_base_url
+from def_session_pool import login_session, main_account
+from def_status_url import dedupe_key
+from def_timeline_json import (
+    TimelineResponseCollector,
+    enable_performance_logging,
+    parse_timeline_payload,
+)
+from def_tweet_extraction import count_articles, extract_tweets
+from def_tweet_record import TweetRecord, records_to_frame
+
+# selenium, bs4 and pandas are imported inside the functions below so that
+# importing this module (e.g. from process_year or the schedulers) stays cheap.
+
+# Extraction modes: "dom" parses the rendered <article> markup, "network" reads the
+# page's own SearchTimeline JSON responses from the DevTools performance log.
+SCRAPE_MODES = ("dom", "network")
+
+# A scrape is abandoned (and the circuit left open for the other workers) after this
+# many interstitials in a row, or when the breaker's cooldown exceeds MAX_INLINE_BACKOFF.
+MAX_CONSECUTIVE_INTERSTITIALS = 3
+MAX_INLINE_BACKOFF = 300
+
+# Memory guard: long searches keep every loaded article in the tab, so harvested
+# articles are emptied out of the DOM (keeping the last KEEP_RENDERED_ARTICLES), and the
+# browser is recycled once the page's JS heap passes MAX_HEAP_MB or, on the Latest
+# timeline, after RECYCLE_AFTER_SCROLLS scrolls (override with SCRAPE_RECYCLE_SCROLLS /
+# SCRAPE_MAX_HEAP_MB).
+KEEP_RENDERED_ARTICLES = 20
+RECYCLE_AFTER_SCROLLS = 300
+MAX_HEAP_MB = 1024
+
+# Incremental mode: the Latest timeline is newest-first, so scrolling stops after this
+# many already-stored tweets in a row, or on reaching tweets older than the tag's
+# newest stored tweet minus HIGH_WATER_OVERLAP (which allows for late-indexed tweets).
+KNOWN_RUN_TO_STOP = 20
+HIGH_WATER_OVERLAP = timedelta(hours=6)
+
+# Seconds to wait after each scroll, and without new tweets before a search counts as
+# exhausted (override with SCRAPE_SCROLL_PAUSE / SCRAPE_MAX_IDLE, e.g. against
+# mock_x_server, which renders instantly).
+SCROLL_PAUSE_TIME = 10
+MAX_IDLE_SECONDS = 120
+
+# With an on_batch callback, harvested tweets are handed over whenever this many are
+# pending or this many seconds have passed since the last hand-over.
+FLUSH_EVERY_TWEETS = 100
+FLUSH_INTERVAL_SECONDS = 120
+
+# Empties harvested cells that have scrolled above the viewport, keeping the last `keep`
+# articles. The cells stay in place with their height pinned: React's virtualised
+# timeline still owns them, and removing them breaks its later renders and the scroll
+# anchoring. Shared with def_async_scraper (Playwright calls it with `keep`).
+PRUNE_FUNCTION = """
+(keep) => {
+    const cells = Array.from(document.querySelectorAll('article')).map(
+        a => a.closest('[data-testid="cellInnerDiv"]') || a);
+    let pruned = 0;
+    for (const cell of cells.slice(0, Math.max(0, cells.length - keep))) {
+        if (cell.getBoundingClientRect().bottom < 0) {
+            cell.style.height = cell.offsetHeight + 'px';
+            cell.replaceChildren();
+            pruned++;
+        }
+    }
+    return pruned;
+}
+"""
+
+
+def start_driver(performance_log=False):
     """
-    Scrapes tweets from a specified Twitter URL.
+    Starts Chrome with the cached chromedriver (headless if SCRAPE_HEADLESS=1).
 
     Args:
-        target_url (str): The URL of the Twitter profile or search results page.
-
-    Returns:
-        pd.DataFrame: A DataFrame containing extracted tweet data.
+        performance_log (bool): Enable the DevTools performance log (needed for
+            the "network" extraction mode).
     """
-    # Load environment variables from your .env file
-    load_dotenv()
-    EMAIL = os.getenv("EMAIL_MAIN")
-    USERNAME = os.getenv("USERNAME_MAIN")
-    PASSWORD = os.getenv("PASSWORD")
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
 
-    if not EMAIL or not USERNAME or not PASSWORD:
-        raise ValueError("Twitter credentials are not set. Check your .env file!")
+    options = webdriver.ChromeOptions()
+    if os.getenv("SCRAPE_HEADLESS", "0") == "1":
+        options.add_argument("--headless=new")
+    if performance_log:
+        enable_performance_logging(options)
+    service = Service(resolve_chromedriver())
+    return webdriver.Chrome(service=service, options=options)
 
-    # Setup Chrome WebDriver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service)
 
+def prune_harvested_articles(driver, keep=KEEP_RENDERED_ARTICLES):
+    """
+    Empties already-harvested articles that have scrolled out of view (see
+    PRUNE_FUNCTION), keeping the last `keep`. Returns the number pruned (0 if the
+    script fails).
+    """
     try:
-        # Open Twitter Login Page
-        driver.get("https://x.com/login")
+        script = f"return ({PRUNE_FUNCTION})(arguments[0]);"
+        return int(driver.execute_script(script, keep) or 0)
+    except Exception as e:
+        print(f"DEBUG: Could not prune articles: {e}")
+        return 0
 
-        # Wait for the email/username field
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "text"))
+
+def browser_heap_mb(driver):
+    """Returns the page's used JS heap in MB (Chrome's performance.memory), or None."""
+    try:
+        used = driver.execute_script(
+            "return performance.memory ? performance.memory.usedJSHeapSize : null;"
         )
+    except Exception:
+        return None
+    return used / 1e6 if used else None
 
-        # Enter Email (first login step)
-        username_input = driver.find_element(By.NAME, "text")
-        username_input.send_keys(EMAIL)
-        username_input.send_keys(Keys.RETURN)
 
-        # Handle an extra login prompt (if present)
-        try:
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_element_located((By.NAME, "text"))
-            )
-            second_input = driver.find_element(By.NAME, "text")
-            second_input.send_keys(USERNAME)
-            second_input.send_keys(Keys.RETURN)
-        except Exception:
-            print("No second login prompt detected, proceeding...")
+def login_to_x(driver, email, username, password):
+    """Logs `driver` into X with the given credentials."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    # Open Twitter Login Page
+    driver.get(f"{x_base_url()}/login")
 
-        # Wait for Password field
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.NAME, "password"))
+    # Wait for the email/username field
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "text")))
+
+    # Enter Email (first login step)
+    username_input = driver.find_element(By.NAME, "text")
+    username_input.send_keys(email)
+    username_input.send_keys(Keys.RETURN)
+
+    # Handle an extra login prompt (if present)
+    try:
+        WebDriverWait(driver, 5).until(
+            EC.presence_of_element_located((By.NAME, "text"))
         )
+        second_input = driver.find_element(By.NAME, "text")
+        second_input.send_keys(username)
+        second_input.send_keys(Keys.RETURN)
+    except Exception:
+        print("No second login prompt detected, proceeding...")
+
+    # Wait for Password field
+    WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.NAME, "password"))
+    )
+
+    # Enter Password
+    password_input = driver.find_element(By.NAME, "password")
+    password_input.send_keys(password)
+    password_input.send_keys(Keys.RETURN)
+
+    # Wait for homepage to load
+    time.sleep(5)
+
+
+def url_scraper(
+    target_url,
+    metrics=None,
+    capture_dir=None,
+    parser="auto",
+    mode=None,
+    limiter=None,
+    breaker=None,
+    account=None,
+    known_ids=None,
+    high_water=None,
+    checkpoint=None,
+    on_batch=None,
+    deadline=None,
+):
+    """
+    Scrapes tweets from a specified Twitter URL.
+
+    The browser is kept within bounded memory on long searches: harvested articles are
+    pruned from the DOM, and the browser is restarted after RECYCLE_AFTER_SCROLLS scrolls
+    or MAX_HEAP_MB of JS heap. A chronological (f=live) search resumes with until_time:
+    set to the oldest tweet harvested so far. A Top-tab search is ordered by relevance,
+    so it is only recycled for the heap limit, and then reloads from the top and skips
+    the tweets it already has.
+
+    Args:
+        target_url (str): The URL of the Twitter profile or search results page.
+        metrics (dict, optional): Run-ledger record (see def_run_ledger.new_url_metrics)
+            that is filled in with login, first-article, scroll and parse timings.
+        capture_dir (str, optional): If set (or SCRAPE_CAPTURE_DIR is set), every scroll's
+            page_source is saved there as an HTML fixture for offline replay.
+        parser (str): Extraction backend (see def_tweet_extraction); "auto" picks the
+            fastest installed one (selectolax, then lxml, then html.parser).
+        mode (str, optional): "dom" (default) or "network" (see SCRAPE_MODES); falls back
+            to the SCRAPE_MODE environment variable. Network mode fills Tweet ID and
+            integer Likes/Retweets/Replies from X's own JSON responses.
+        limiter (TokenBucket, optional): Rate limiter for page loads and scrolls;
+            defaults to the account's bucket shared by all workers (see def_rate_limit).
+        breaker (CircuitBreaker, optional): Circuit breaker opened by rate-limit and
+            error interstitials; defaults to the account's shared breaker.
+        account (Account, optional): Account to scrape as (see def_session_pool);
+            defaults to the main account. Saved session cookies are reused if valid.
+        known_ids (set, optional): Status IDs already stored for this tag. Passing them
+            (or `high_water`) turns on incremental mode: the search runs on the Latest
+            (f=live) timeline and stops after KNOWN_RUN_TO_STOP known tweets in a row.
+        high_water (datetime, optional): Newest Created At already stored for this tag;
+            incremental scrolling also stops once tweets are older than this (less
+            HIGH_WATER_OVERLAP).
+        checkpoint (ScrapeCheckpoint, optional): Progress store (see def_checkpoint).
+            Records are saved to it after every scroll; if it already holds records
+            from a failed attempt, they are reloaded and a chronological search resumes
+            below the oldest of them instead of starting from the top (see
+            ScrapeCheckpoint.resume_url).
+        on_batch (callable, optional): Called with a DataFrame of newly harvested tweets
+            every FLUSH_EVERY_TWEETS tweets or FLUSH_INTERVAL_SECONDS seconds, and once
+            more when the scrape ends, even if it ends with an exception. Every tweet is
+            passed to it once (tweets reloaded from a checkpoint are passed again), so
+            callers can store results as they arrive instead of only on a clean return.
+        deadline (float, optional): time.time() after which scrolling stops and the
+            tweets harvested so far are returned.
+
+    Raises:
+        ScrapeBlockedError: If X keeps serving rate-limit/error pages.
 
-        # Enter Password
-        password_input = driver.find_element(By.NAME, "password")
-        password_input.send_keys(PASSWORD)
-        password_input.send_keys(Keys.RETURN)
+    Returns:
+        pd.DataFrame: The extracted tweets with compact dtypes (see
+        def_tweet_record.records_to_frame).
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+
+    account = account or main_account()
+
+    mode = mode or os.getenv("SCRAPE_MODE", "dom")
+    if mode not in SCRAPE_MODES:
+        raise ValueError(f"Unknown scrape mode '{mode}'. Expected one of {SCRAPE_MODES}.")
+
+    if metrics is None:
+        metrics = {}
+    capture_dir = capture_dir or os.getenv("SCRAPE_CAPTURE_DIR")
+    clock = StageClock()
+
+    def throttle():
+        metrics["rate_limit_wait_seconds"] = metrics.get(
+            "rate_limit_wait_seconds", 0.0
+        ) + limiter.acquire()
+
+    def blocked(kind, consecutive):
+        """Records an interstitial; backs off in place or raises ScrapeBlockedError."""
+        metrics["interstitials"] = metrics.get("interstitials", 0) + 1
+        delay = breaker.record_failure(kind)
+        print(f"DEBUG: X returned a {kind} page; circuit open for {delay:.0f}s.")
+        if consecutive >= MAX_CONSECUTIVE_INTERSTITIALS or delay > MAX_INLINE_BACKOFF:
+            raise ScrapeBlockedError(f"{kind} interstitial on {target_url}")
+        time.sleep(delay)
+        metrics["backoff_seconds"] = metrics.get("backoff_seconds", 0.0) + delay
+        return delay
+
+    recycle_after = int(os.getenv("SCRAPE_RECYCLE_SCROLLS", RECYCLE_AFTER_SCROLLS))
+    max_heap_mb = float(os.getenv("SCRAPE_MAX_HEAP_MB", MAX_HEAP_MB))
+    browser = {"driver": None}
+    incremental = known_ids is not None or high_water is not None
+    known_ids = known_ids or set()
+    stop_before = high_water - HIGH_WATER_OVERLAP if high_water is not None else None
+    search_url = latest_timeline(target_url) if incremental else target_url
+
+    # Collect compact typed records; the DataFrame is built once at the end
+    tweet_records = checkpoint.load_records() if checkpoint is not None else []
+    seen_statuses = {dedupe_key(r.url) for r in tweet_records}
+    if tweet_records:
+        search_url = checkpoint.resume_url(search_url)
+        metrics["resumed_records"] = len(tweet_records)
+        print(
+            f"DEBUG: Resuming from checkpoint with {len(tweet_records)} tweets "
+            f"on {search_url}."
+        )
 
-        # Wait for homepage to load
-        time.sleep(5)
+    # Only a newest-first timeline can be resumed below the oldest harvested tweet
+    chronological = is_chronological(search_url)
+    flushed = {"upto": 0, "at": time.time()}
+
+    def flush(force=False):
+        """Hands tweets harvested since the last flush to on_batch."""
+        pending = tweet_records[flushed["upto"] :]
+        if on_batch is None or not pending:
+            return
+        if not force and (
+            len(pending) < FLUSH_EVERY_TWEETS
+            and time.time() - flushed["at"] < FLUSH_INTERVAL_SECONDS
+        ):
+            return
+        on_batch(records_to_frame(pending))
+        flushed["upto"] = len(tweet_records)
+        flushed["at"] = time.time()
+        metrics["flushes"] = metrics.get("flushes", 0) + 1
+
+    def open_search(url, first=False):
+        """Starts a logged-in browser on `url`; returns (driver, collector)."""
+        driver = browser["driver"] = start_driver(performance_log=(mode == "network"))
+        if first:
+            metrics["driver_start_seconds"] = clock.lap()
+        throttle()
+        login_session(driver, account)
+        if first:
+            metrics["login_seconds"] = clock.lap()
+
+        collector = TimelineResponseCollector(driver) if mode == "network" else None
 
         # Navigate to the target Twitter URL
-        driver.get(target_url)
+        throttle()
+        driver.get(url)
 
         # Wait until tweets are loaded (by waiting for article elements)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_all_elements_located((By.TAG_NAME, "article"))
-        )
+        try:
+            WebDriverWait(driver, 10).until(
+                EC.presence_of_all_elements_located((By.TAG_NAME, "article"))
+            )
+        except Exception:
+            # No results page at all: throttled, or an error page instead of tweets
+            kind = detect_interstitial(driver.page_source)
+            if kind:
+                metrics["interstitials"] = metrics.get("interstitials", 0) + 1
+                breaker.record_failure(kind)
+                raise ScrapeBlockedError(f"{kind} interstitial on {url}")
+            raise
+        if first:
+            metrics["first_article_seconds"] = clock.lap()
+        return driver, collector
+
+    # The limiter and breaker default to the account's shared ones; those opened here
+    # are closed here as well, as refresh_engagement does
+    owned = []
+    if limiter is None:
+        limiter = shared_page_limiter(account=account.name)
+        owned.append(limiter)
+    if breaker is None:
+        breaker = account_breaker(account.name)
+        owned.append(breaker)
 
-        # Initialize an empty DataFrame to store tweet data
-        tweet_df = pd.DataFrame(columns=["Tweet URL", "Created At", "Text"])
+    try:
+        # Setup Chrome WebDriver, log in and open the search
+        driver, collector = open_search(search_url, first=True)
 
         # Setup scrolling parameters
-        SCROLL_PAUSE_TIME = 10
-        prev_tweets_count = 0
-        max_wait_time = 120  # Adjust as needed
+        scroll_pause = float(os.getenv("SCRAPE_SCROLL_PAUSE", SCROLL_PAUSE_TIME))
+        prev_tweets_count = len(tweet_records)
+        max_wait_time = float(os.getenv("SCRAPE_MAX_IDLE", MAX_IDLE_SECONDS))
         start_time = time.time()
+        consecutive_interstitials = 0
+        scrolls_this_driver = 0
+        known_run = 0
+        stop_reason = None
+        last_recycle_mark = None
 
         # Scroll until no new tweets load within the allotted time
         while True:
+            throttle()
             driver.execute_script("window.scrollBy(0, 500);")
-            time.sleep(SCROLL_PAUSE_TIME)
+            time.sleep(scroll_pause)
 
             # DEBUG: Print current scroll action
             print("DEBUG: Scrolled 500 pixels.")
 
-            # Extract tweets using BeautifulSoup
-            soup = BeautifulSoup(driver.page_source, "html.parser")
-            tweets = soup.find_all("article")
-
-            # DEBUG: Print number of tweet articles found on the page
-            print(f"DEBUG: Found {len(tweets)} tweet articles.")
-
-            new_tweet_data = []
-            for tweet in tweets:
-                try:
-                    # Extract the first <a> tag containing '/status/'
-                    tweet_link_tag = tweet.find(
-                        "a", href=lambda href: href and "/status/" in href
-                    )
-                    tweet_url = (
-                        f"https://x.com{tweet_link_tag['href']}"
-                        if tweet_link_tag
-                        else None
-                    )
-
-                    # Extract tweet creation time
-                    date_tag = tweet.find("time")
-                    created_at = date_tag["datetime"] if date_tag else "Unknown"
-
-                    # Extract Tweet ID (if available)
-                    tweet_id = tweet.get("data-tweet-id", "Unknown")
-
-                    # Extract engagement metrics
-                    likes_tag = tweet.find("div", {"data-testid": "like"})
-                    likes = likes_tag.get_text(strip=True) if likes_tag else "Unknown"
-
-                    retweets_tag = tweet.find("div", {"data-testid": "retweet"})
-                    retweets = (
-                        retweets_tag.get_text(strip=True) if retweets_tag else "Unknown"
-                    )
-
-                    replies_tag = tweet.find("div", {"data-testid": "reply"})
-                    replies = (
-                        replies_tag.get_text(strip=True) if replies_tag else "Unknown"
-                    )
-
-                    # Extract hashtags and mentions
-                    hashtags = [
-                        tag.get_text(strip=True)
-                        for tag in tweet.find_all("a")
-                        if "#" in tag.get_text()
-                    ]
-                    mentions = [
-                        tag.get_text(strip=True)
-                        for tag in tweet.find_all("a")
-                        if "@" in tag.get_text()
-                    ]
-
-                    # Extract URLs in tweet
-                    urls = [
-                        tag.get("href", "Unknown")
-                        for tag in tweet.find_all("a")
-                        if "http" in tag.get("href", "")
-                    ]
-
-                    # Extract tweet text
-                    tweet_text = (
-                        tweet.find("div", {"lang": True}).get_text(strip=True)
-                        if tweet.find("div", {"lang": True})
-                        else "Unknown"
-                    )
-
-                    # Add tweet if it hasn't already been added
-                    if tweet_url and tweet_url not in tweet_df["Tweet URL"].values:
-                        new_tweet_data.append(
-                            {
-                                "Tweet URL": tweet_url,
-                                "Created At": created_at,
-                                "Text": tweet_text,
-                                "Tweet ID": tweet_id,
-                                "Likes": likes,
-                                "Retweets": retweets,
-                                "Replies": replies,
-                                "Hashtags": ", ".join(hashtags),
-                                "Mentions": ", ".join(mentions),
-                                "URLs": ", ".join(urls),
-                            }
-                        )
-                except Exception as e:
-                    print(f"Error extracting tweet: {e}")
-                    continue
-
-            new_tweet_df = pd.DataFrame(new_tweet_data)
+            metrics["scroll_iterations"] = metrics.get("scroll_iterations", 0) + 1
+            scrolls_this_driver += 1
+            parse_start = time.perf_counter()
+
+            if collector is not None:
+                # Read tweets straight from the timeline JSON the page fetched
+                records = []
+                for payload in collector.poll():
+                    records.extend(parse_timeline_payload(payload))
+                print(f"DEBUG: Found {len(records)} tweets in timeline responses.")
+                kind = collector.take_interstitial()
+            else:
+                page_source = driver.page_source
+                if capture_dir:
+                    capture_page_source(page_source, capture_dir, target_url)
+
+                # Extract tweets from the rendered page
+                records = extract_tweets(page_source, parser=parser)
+
+                # DEBUG: Print number of tweet articles found on the page
+                print(f"DEBUG: Found {count_articles(page_source)} tweet articles.")
+                kind = detect_interstitial(page_source)
+
+            new_tweet_count = 0
+            batch_start = len(tweet_records)
+            for record in records:
+                # Add tweet if its status hasn't already been added
+                key = dedupe_key(record["Tweet URL"])
+                if key not in seen_statuses:
+                    seen_statuses.add(key)
+                    tweet_record = TweetRecord.from_scraped(record)
+                    tweet_records.append(tweet_record)
+                    new_tweet_count += 1
+                    if not incremental:
+                        continue
+                    # Newest-first timeline: a run of stored tweets, or tweets older
+                    # than the high-water mark, means everything below is stored too
+                    if tweet_record.status_id in known_ids:
+                        known_run += 1
+                        metrics["tweets_known"] = metrics.get("tweets_known", 0) + 1
+                    else:
+                        known_run = 0
+                    if known_run >= KNOWN_RUN_TO_STOP:
+                        stop_reason = "known_run"
+                    elif (
+                        stop_before is not None
+                        and tweet_record.created_at is not None
+                        and tweet_record.created_at < stop_before
+                    ):
+                        stop_reason = "high_water"
+
+            metrics["parse_seconds"] = metrics.get("parse_seconds", 0.0) + (
+                time.perf_counter() - parse_start
+            )
+            if checkpoint is not None and new_tweet_count:
+                checkpoint.save(
+                    tweet_records[batch_start:], tweet_records, chronological=chronological
+                )
+            flush()
+
+            if kind:
+                consecutive_interstitials += 1
+                # The backoff sleep must not count towards the no-new-tweets timeout
+                start_time += blocked(kind, consecutive_interstitials)
+            else:
+                consecutive_interstitials = 0
 
             # DEBUG: Print number of new tweets added in this iteration
-            print(f"DEBUG: New tweets found this iteration: {len(new_tweet_df)}")
-
-            if not new_tweet_df.empty:
-                tweet_df = pd.concat([tweet_df, new_tweet_df], ignore_index=True)
+            print(f"DEBUG: New tweets found this iteration: {new_tweet_count}")
 
             # DEBUG: Print total tweets collected so far
-            print(f"DEBUG: Total tweets collected: {len(tweet_df)}")
+            print(f"DEBUG: Total tweets collected: {len(tweet_records)}")
+
+            if stop_reason:
+                print(f"Reached already-stored tweets ({stop_reason}). Stopping scrolling.")
+                break
 
-            if len(tweet_df) == prev_tweets_count:
+            if deadline is not None and time.time() >= deadline:
+                print("Per-URL deadline reached. Stopping scrolling.")
+                stop_reason = "deadline"
+                break
+
+            if len(tweet_records) == prev_tweets_count:
                 elapsed_time = time.time() - start_time
                 if elapsed_time >= max_wait_time:
                     print("No new tweets for the allotted time. Stopping scrolling.")
+                    stop_reason = "idle"
                     break
             else:
                 start_time = time.time()
 
-            prev_tweets_count = len(tweet_df)
+            prev_tweets_count = len(tweet_records)
 
-        return tweet_df
+            # Everything rendered so far has been harvested; empty it out of the DOM
+            prune_harvested_articles(driver)
+            heap_mb = browser_heap_mb(driver)
+            if heap_mb:
+                metrics["peak_heap_mb"] = max(metrics.get("peak_heap_mb") or 0, heap_mb)
+
+            oldest = min(
+                (r.created_at for r in tweet_records if r.created_at), default=None
+            )
+            over_heap = heap_mb is not None and heap_mb > max_heap_mb
+            # A Top-tab search restarts from the top, so recycling it only to reset the
+            # scroll count would replay the same results; it is recycled for memory only
+            if chronological:
+                recycle = oldest is not None and (
+                    over_heap or scrolls_this_driver >= recycle_after
+                )
+                mark = oldest
+            else:
+                recycle = over_heap
+                mark = len(tweet_records)
+            if recycle:
+                if mark == last_recycle_mark:
+                    # Reopening at the same point again would just repeat this window
+                    print("No progress since the last browser recycle. Stopping.")
+                    stop_reason = "no_progress"
+                    break
+                last_recycle_mark = mark
+                if chronological:
+                    # Resume the newest-first search below the oldest tweet harvested
+                    resume_url = narrow_until(search_url, oldest)
+                    resume_note = f"resuming before {oldest.isoformat()}"
+                else:
+                    # Reload from the top; harvested tweets are skipped by status ID
+                    resume_url = search_url
+                    resume_note = "reloading the search"
+                recycle_start = time.perf_counter()
+                print(
+                    f"DEBUG: Recycling browser after {scrolls_this_driver} scrolls "
+                    f"(heap {heap_mb or 0:.0f} MB); {resume_note}."
+                )
+                driver.quit()
+                browser["driver"] = None
+                driver, collector = open_search(resume_url)
+                scrolls_this_driver = 0
+                metrics["driver_recycles"] = metrics.get("driver_recycles", 0) + 1
+                metrics["recycle_seconds"] = metrics.get("recycle_seconds", 0.0) + (
+                    time.perf_counter() - recycle_start
+                )
+                start_time = time.time()
+
+        metrics["scroll_seconds"] = clock.lap()
+        metrics["tweets_seen"] = len(tweet_records)
+        metrics["stop_reason"] = stop_reason
+        if not metrics.get("interstitials"):
+            breaker.record_success()
+        flush(force=True)
+        return records_to_frame(tweet_records)
 
     finally:
-        driver.quit()
+        if browser["driver"] is not None:
+            browser["driver"].quit()
+        try:
+            # Hand over whatever was harvested before an exception, too
+            flush(force=True)
+        except Exception as e:
+            print(f"Error flushing harvested tweets for {target_url}: {e}")
+        for resource in owned:
+            resource.close()
+        metrics["total_seconds"] = clock.total()
 
 
 # -----------------------------
@@ -218,3 +542,4 @@ def url_scraper(target_url):
 
 # test_url = "https://x.com/search?q=(%23cityandguilds)%20until%3A2015-12-31%20since%3A2015-01-01&src=typed_query&f=top"
 # tweets = url_scraper(test_url)
+# tweets = url_scraper(test_url, mode="network")  # exact IDs and engagement counts
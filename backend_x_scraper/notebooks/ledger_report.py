@@ -0,0 +1,29 @@
+import argparse
+from def_run_ledger import (
+    default_ledger_path,
+    format_summary,
+    read_ledger,
+    summarise_ledger,
+)
+
+# Summarises output/run_ledger.jsonl so we can see where scrape time actually goes.
+# Usage: python ledger_report.py [--since 2025-05-01] [--tag hashtag_2025] [--run-id ...]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise the scrape run ledger.")
+    parser.add_argument("--ledger", default=str(default_ledger_path()))
+    parser.add_argument("--since", help="Only include entries started on/after this ISO date")
+    parser.add_argument("--tag", help="Only include entries for this tag")
+    parser.add_argument("--run-id", help="Only include entries from this process_year run")
+    args = parser.parse_args()
+
+    entries = read_ledger(args.ledger, since=args.since)
+    if args.tag:
+        entries = [e for e in entries if e.get("tag") == args.tag]
+    if args.run_id:
+        entries = [e for e in entries if e.get("run_id") == args.run_id]
+
+    if not entries:
+        print(f"No ledger entries found in {args.ledger}.")
+    else:
+        print(format_summary(summarise_ledger(entries)))
@@ -0,0 +1,378 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from def_fixture_replay import synthetic_article, synthetic_full_text, synthetic_tweet
+
+# Local stand-in for X's login flow and search timeline, for offline tests and load
+# benchmarks of url_scraper / process_year (see bench_pipeline.py). Point the scrapers
+# at it with X_BASE_URL=http://127.0.0.1:<port> and search URLs on the same host.
+#
+#   /login       email -> (optional) username -> password forms; sets auth_token
+#   /home        logged-in landing page (redirects to /login without the cookie)
+#   /search?q=   results page; its script loads pages from the timeline API on scroll
+#   /i/api/graphql/mock/SearchTimeline   JSON pages: rendered articles + tweet_results
+#   /<handle>/status/<id>   a served result's own page, its counts grown by one each
+#                (as a later engagement refresh would find them)
+#
+# Every query has `tweets` synthetic results, newest first (one every 37 minutes),
+# deterministic per query; until_time:<epoch> in q starts below that time. Injected
+# failures: `error_rate` of API calls answer 500, and more than `rate_limit` calls in
+# `rate_window` seconds answer 429; the page then shows X's interstitial text.
+# Usage: python mock_x_server.py [--port 8765] [--tweets 2000] [--latency-ms 50]
+
+NEWEST = datetime(2025, 4, 23, tzinfo=timezone.utc)
+SPACING = timedelta(minutes=37)
+HANDLES = ["cityandguilds", "apprentice_jo", "fe_news", "skills_uk", "salon_sam"]
+
+_UNTIL_TIME_RE = re.compile(r"until_time:(\d+)")
+_STATUS_PATH_RE = re.compile(r"^/\w+/status/(\d+)$")
+
+_SCROLL_SCRIPT = """
+<script>
+let cursor = %(cursor)s, loading = false;
+const list = document.getElementById('timeline');
+async function more() {
+  if (loading || cursor === null) return;
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 1500) return;
+  loading = true;
+  const response = await fetch('/i/api/graphql/mock/SearchTimeline?q=' +
+      encodeURIComponent(%(query)s) + '&cursor=' + cursor);
+  const notice = document.getElementById('notice');
+  if (response.ok) {
+    const page = await response.json();
+    list.insertAdjacentHTML('beforeend', page.html);
+    cursor = page.next_cursor;
+    notice.textContent = '';
+  } else {
+    notice.textContent = response.status === 429 ? 'Rate limit exceeded'
+        : 'Something went wrong. Try reloading.';
+  }
+  loading = false;
+}
+window.addEventListener('scroll', more);
+setInterval(more, 250);
+</script>
+"""
+
+
+class MockXState:
+    """Tunable behaviour and counters shared by the request handlers."""
+
+    def __init__(
+        self,
+        tweets=2000,
+        page_size=20,
+        overlap=3,
+        latency_ms=0,
+        error_rate=0.0,
+        rate_limit=None,
+        rate_window=60,
+        username_prompt=True,
+        seed=0,
+    ):
+        self.tweets = tweets
+        self.page_size = page_size
+        self.overlap = overlap  # results repeated from the previous page, as X does
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.username_prompt = username_prompt
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.api_calls = []  # timestamps, for the rate limit
+        self.counters = {
+            "pages": 0,
+            "status_pages": 0,
+            "api_calls": 0,
+            "errors": 0,
+            "rate_limited": 0,
+        }
+        self.tokens = set()
+        self.statuses = {}  # status ID -> (handle, created_at, tweet) of served results
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def inject_failure(self):
+        """Returns the HTTP status to fail an API call with, or None to serve it."""
+        now = time.time()
+        with self.lock:
+            self.counters["api_calls"] += 1
+            self.api_calls = [t for t in self.api_calls if t > now - self.rate_window]
+            self.api_calls.append(now)
+            if self.rate_limit is not None and len(self.api_calls) > self.rate_limit:
+                self.counters["rate_limited"] += 1
+                return 429
+            if self.rng.random() < self.error_rate:
+                self.counters["errors"] += 1
+                return 500
+        return None
+
+    def first_index(self, query):
+        """Index of the first result of `query` (after any until_time: bound)."""
+        match = _UNTIL_TIME_RE.search(query)
+        if not match:
+            return 0
+        until = datetime.fromtimestamp(int(match.group(1)), tz=timezone.utc)
+        return max(0, -(-(NEWEST - until) // SPACING))  # ceiling division
+
+    def results(self, query, start):
+        """Returns (articles html, tweet_results payload, next cursor) from `start`."""
+        start = max(0, start)
+        stop = min(self.tweets, start + self.page_size)
+        # Seed per query (without its time bound) so a resumed search sees the same tweets
+        base_query = _UNTIL_TIME_RE.sub("", query).strip()
+        query_seed = int(hashlib.sha1(base_query.encode()).hexdigest()[:8], 16)
+        articles, results, served = [], [], {}
+        for i in range(start, stop):
+            rng = random.Random(query_seed * 1_000_003 + i + self.seed)
+            status_id = 1_800_000_000_000_000_000 - i * 1000 - query_seed % 1000
+            handle = rng.choice(HANDLES)
+            created = NEWEST - i * SPACING
+            # The rendered article and the API payload show the same text and counts
+            tweet = synthetic_tweet(rng)
+            created_at = created.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            served[status_id] = (handle, created_at, tweet)
+            articles.append(
+                '<div data-testid="cellInnerDiv">'
+                + synthetic_article(status_id, handle, created_at, rng, tweet=tweet)
+                + "</div>"
+            )
+            results.append(
+                {
+                    "tweet_results": {
+                        "result": {
+                            "__typename": "Tweet",
+                            "core": {
+                                "user_results": {
+                                    "result": {"legacy": {"screen_name": handle}}
+                                }
+                            },
+                            "legacy": {
+                                "id_str": str(status_id),
+                                "created_at": created.strftime(
+                                    "%a %b %d %H:%M:%S +0000 %Y"
+                                ),
+                                "full_text": synthetic_full_text(status_id, tweet),
+                                "favorite_count": tweet["likes"],
+                                "retweet_count": tweet["retweets"],
+                                "reply_count": tweet["replies"],
+                                "entities": {
+                                    "hashtags": [{"text": "cityandguilds"}],
+                                    "user_mentions": [{"screen_name": "cityandguilds"}],
+                                    "urls": [
+                                        {
+                                            "url": "https://t.co/"
+                                            f"{status_id % 100000:05d}"
+                                        }
+                                    ],
+                                },
+                            },
+                        }
+                    }
+                }
+            )
+        with self.lock:
+            self.statuses.update(served)
+        next_cursor = stop - self.overlap if stop < self.tweets else None
+        payload = {"data": {"search_by_raw_query": {"entries": results}}}
+        return "".join(articles), payload, next_cursor
+
+
+class MockXHandler(BaseHTTPRequestHandler):
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output readable
+
+    def _delay(self):
+        if self.state.latency_ms:
+            jitter = self.state.rng.uniform(0.5, 1.5)
+            time.sleep(self.state.latency_ms * jitter / 1000)
+
+    def _send(self, status, body, content_type="text/html", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location, headers=()):
+        self.send_response(302)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+
+    def _logged_in(self):
+        cookies = self.headers.get("Cookie", "")
+        tokens = re.findall(r"auth_token=([0-9a-f]+)", cookies)
+        return any(token in self.state.tokens for token in tokens)
+
+    def _form(self, step, field, input_type="text"):
+        return self._send(
+            200,
+            "<html><head><title>Log in to X / X</title></head><body>"
+            f'<form method="post" action="/login"><input type="hidden" name="step" '
+            f'value="{step}"><input type="{input_type}" name="{field}" autofocus>'
+            "</form></body></html>",
+        )
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        self._delay()
+        if parts.path in ("/login", "/i/flow/login"):
+            return self._form("email", "text")
+        if parts.path in ("/", ""):
+            return self._send(200, "<html><body>Mock X</body></html>")
+        if not self._logged_in():
+            return self._redirect("/login")
+        if parts.path == "/home":
+            return self._send(200, "<html><title>Home / X</title><body>Home</body></html>")
+        if parts.path == "/search":
+            return self._search_page(params.get("q", [""])[0])
+        if parts.path.endswith("/SearchTimeline"):
+            return self._timeline(params)
+        match = _STATUS_PATH_RE.match(parts.path)
+        if match:
+            return self._status_page(int(match.group(1)))
+        return self._send(404, "<html><body>Not found</body></html>")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        step = form.get("step", [""])[0]
+        self._delay()
+        if step == "email":
+            if self.state.username_prompt:
+                return self._form("username", "text")
+            return self._form("password", "password", "password")
+        if step == "username":
+            return self._form("password", "password", "password")
+        if step == "password" and form.get("password"):
+            token = secrets.token_hex(20)
+            with self.state.lock:
+                self.state.tokens.add(token)
+            cookie = f"auth_token={token}; Path=/; Max-Age=2592000; HttpOnly"
+            return self._redirect("/home", headers=[("Set-Cookie", cookie)])
+        return self._form("email", "text")
+
+    def _search_page(self, query):
+        self.state.count("pages")
+        # Like X, even the first results arrive through the timeline API
+        script = _SCROLL_SCRIPT % {
+            "cursor": self.state.first_index(query),
+            "query": json.dumps(query),
+        }
+        self._send(
+            200,
+            f"<!DOCTYPE html><html><head><title>{escape(query)} - Search / X</title>"
+            '</head><body><main role="main"><section aria-labelledby="accessible-list">'
+            '<div id="timeline"></div><div id="notice"></div>'
+            f"</section></main>{script}</body></html>",
+        )
+
+    def _status_page(self, status_id):
+        self.state.count("status_pages")
+        with self.state.lock:
+            served = self.state.statuses.get(status_id)
+        if served is None:
+            # X's page for a deleted or never-seen status has no article
+            return self._send(200, "<html><body>This post is unavailable.</body></html>")
+        handle, created_at, tweet = served
+        grown = dict(
+            tweet,
+            likes=tweet["likes"] + 1,
+            retweets=tweet["retweets"] + 1,
+            replies=tweet["replies"] + 1,
+        )
+        article = synthetic_article(status_id, handle, created_at, None, tweet=grown)
+        self._send(
+            200,
+            f"<!DOCTYPE html><html><head><title>{handle} on X</title></head><body>"
+            f'<main role="main">{article}</main></body></html>',
+        )
+
+    def _timeline(self, params):
+        failure = self.state.inject_failure()
+        if failure:
+            return self._send(
+                failure, json.dumps({"errors": [{"code": failure}]}), "application/json"
+            )
+        query = params.get("q", [""])[0]
+        cursor = int(params.get("cursor", ["0"])[0])
+        articles, payload, next_cursor = self.state.results(query, cursor)
+        payload.update(html=articles, next_cursor=next_cursor)
+        self._send(200, json.dumps(payload), "application/json")
+
+
+def make_server(host="127.0.0.1", port=0, **options):
+    """
+    Returns an unstarted ThreadingHTTPServer serving the mock site; `options` are
+    MockXState's. Its address is server.base_url (port 0 picks a free port).
+    """
+    state = MockXState(**options)
+    handler = type("BoundMockXHandler", (MockXHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    return server
+
+
+def start_server(**options):
+    """Starts make_server(**options) in a background thread and returns the server."""
+    server = make_server(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local mock of X search.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tweets", type=int, default=2000, help="Results per query")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, help="API calls allowed per window")
+    parser.add_argument("--rate-window", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host,
+        args.port,
+        tweets=args.tweets,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+        seed=args.seed,
+    )
+    print(f"Mock X serving on {server.base_url} (X_BASE_URL={server.base_url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.state.counters))
@@ -0,0 +1,190 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pyprojroot import here
+
+from def_pipeline import Stage, format_results, run_pipeline
+
+# One command for the whole update, in place of starting searches/scrape_cron.py,
+# sentiment_cron.py and the R DuckDB cron separately:
+#
+#   urls -> scrape -> compact -> score -> export
+#                 \-> ledger
+#
+#   urls     rebuilds urls.csv for the current search window (scrape_cron)
+#   scrape   one incremental process_year pass over this year's lookup rows
+#   compact  canonical URLs and one row per status in each tag CSV (compact_outputs)
+#   ledger   ledger_summary.txt from the run ledger (ledger_report)
+#   score    sentiment_cron.py, in its own process so the model's memory is released
+#   export   VibeCheck's cron_duckdb.R (RDS and DuckDB) through Rscript
+#
+# Each stage is skipped when the content hashes of its inputs match its last
+# successful run (state in .pipeline_state.json), so a tick in which the scrape
+# finds nothing new only re-stats the CSVs. The scrape itself reads X, which no local
+# hash can see, so it reruns once it is older than --scrape-every minutes.
+# The Python stages read and write --output-dir (default output/): the lookup, the tag CSVs,
+# the run ledger and the state.
+# Usage: python pipeline.py [--dry-run] [--only score export] [--force export]
+#        [--scrape-every 55] [--workers 4] [--output-dir output]
+# RSCRIPT points at Rscript if it is not on PATH. cron_duckdb.R reads the CSVs from
+# the folder set in its folder_path.
+
+NOTEBOOKS_DIR = Path(__file__).resolve().parent
+
+
+def tag_csvs(output_dir):
+    """The per-tag CSVs in `output_dir` (everything but the lookup)."""
+    return [p for p in sorted(output_dir.glob("*.csv")) if p.name != "urls.csv"]
+
+
+def build_urls(output_dir):
+    from scrape_cron import update_lookup_csv
+
+    update_lookup_csv(output_dir=output_dir)
+
+
+def search_window():
+    from scrape_cron import get_previous_week_range
+
+    return {
+        "window": list(get_previous_week_range()),
+        "compound": os.getenv("SCRAPE_COMPOUND", "0") == "1",
+    }
+
+
+def scrape(year, output_dir, ledger_path):
+    from def_process_year import process_year
+
+    yields = process_year(
+        year, incremental=True, output_dir=output_dir, ledger_path=ledger_path
+    )
+    failed = [tag for tag, added in yields.items() if added is None]
+    if yields and len(failed) == len(yields):
+        raise RuntimeError(f"Every scrape failed ({', '.join(failed)})")
+
+
+def compact(output_dir):
+    from compact_outputs import compact_file
+
+    for path in tag_csvs(output_dir):
+        try:
+            before, after, rewritten = compact_file(path, apply=True)
+        except (KeyError, ValueError, OSError) as e:
+            print(f"[pipeline] compact: skipping {path.name}: {e}")
+            continue
+        if before != after or rewritten:
+            print(f"[pipeline] compact: {path.name}: {before} -> {after} rows")
+
+
+def summarise_ledger(ledger_path, summary_path):
+    from def_run_ledger import format_summary, read_ledger, summarise_ledger
+
+    entries = read_ledger(ledger_path)
+    summary = format_summary(summarise_ledger(entries)) if entries else "No entries."
+    summary_path.write_text(summary + "\n", encoding="utf-8")
+
+
+def run_command(command, cwd):
+    subprocess.run(command, cwd=cwd, check=True)
+
+
+def build_stages(output_dir, year, scrape_every_minutes):
+    """Returns the pipeline's stages for `output_dir` and the scrape `year`."""
+    urls_csv = output_dir / "urls.csv"
+    ledger_path = output_dir / "run_ledger.jsonl"
+    vibecheck_dir = here().parent / "VibeCheck"
+    return [
+        Stage(
+            "urls",
+            lambda: build_urls(output_dir),
+            outputs=lambda: [urls_csv],
+            params=search_window,
+        ),
+        Stage(
+            "scrape",
+            lambda: scrape(year, output_dir, ledger_path),
+            inputs=lambda: [urls_csv],
+            params=lambda: year,
+            deps=["urls"],
+            max_age=scrape_every_minutes * 60,
+        ),
+        Stage(
+            "compact",
+            lambda: compact(output_dir),
+            inputs=lambda: tag_csvs(output_dir),
+            deps=["scrape"],
+        ),
+        Stage(
+            "ledger",
+            lambda: summarise_ledger(ledger_path, output_dir / "ledger_summary.txt"),
+            inputs=lambda: [ledger_path],
+            outputs=lambda: [output_dir / "ledger_summary.txt"],
+            deps=["scrape"],
+        ),
+        Stage(
+            "score",
+            lambda: run_command(
+                [sys.executable, "sentiment_cron.py", "--output-dir", str(output_dir)],
+                NOTEBOOKS_DIR,
+            ),
+            inputs=lambda: [urls_csv, *tag_csvs(output_dir)],
+            deps=["compact"],
+        ),
+        Stage(
+            "export",
+            lambda: run_command(
+                [
+                    os.getenv("RSCRIPT", "Rscript"),
+                    str(vibecheck_dir / "inst" / "extdata" / "cron_duckdb.R"),
+                ],
+                vibecheck_dir,
+            ),
+            inputs=lambda: [urls_csv, *tag_csvs(output_dir)],
+            outputs=lambda: [vibecheck_dir / "data" / "combined_posts.rds"],
+            deps=["score"],
+        ),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stale stages of the pipeline.")
+    parser.add_argument("--output-dir", default=str(here("output")))
+    parser.add_argument("--year", default=str(datetime.now().year), help="Scrape year")
+    parser.add_argument(
+        "--scrape-every",
+        type=float,
+        default=float(os.getenv("PIPELINE_SCRAPE_EVERY", 55)),
+        help="Minutes before the scrape reruns with an unchanged lookup",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Stages run at once")
+    parser.add_argument("--only", nargs="*", help="Run just these stages")
+    parser.add_argument("--force", nargs="*", default=[], help="Run these even if fresh")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stages = build_stages(output_dir, args.year, args.scrape_every)
+    names = {stage.name for stage in stages}
+    unknown = set(args.only or []) | set(args.force)
+    if unknown - names:
+        parser.error(f"Unknown stages {sorted(unknown - names)}; choose from {sorted(names)}")
+
+    start = time.perf_counter()
+    results = run_pipeline(
+        stages,
+        output_dir / ".pipeline_state.json",
+        workers=args.workers,
+        force=args.force,
+        only=args.only,
+        dry_run=args.dry_run,
+    )
+    print(format_results(results))
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s.")
+    if any(row["status"] in ("failed", "blocked") for row in results):
+        sys.exit(1)
@@ -0,0 +1,225 @@
+import argparse
+import os
+import time
+from pathlib import Path
+
+from def_job_queue import (
+    DEFAULT_LEASE_SECONDS,
+    Heartbeat,
+    JobQueue,
+    LeaseLostError,
+    worker_name,
+)
+from def_file_lock import FileLock
+
+# Fans scraping and scoring out over several machines through the shared job queue
+# (def_job_queue). Any number of workers, on any host that can reach the queue file
+# and the output folder, claim jobs until the queue is empty:
+#   scrape_url  {"year", "tag"}   one process_year pass over one lookup row
+#   score_file  {"file"}          sentiment for the unscored rows of one tag CSV
+# Usage:
+#   python queue_worker.py enqueue-scrape --year 2020 [--tags hashtag_2020 ...]
+#   python queue_worker.py enqueue-score
+#   python queue_worker.py work [--kinds score_file] [--exit-when-idle]
+#   python queue_worker.py status
+# The queue lives at JOB_QUEUE_PATH (default output/job_queue.sqlite) and the sentiment
+# model at SENTIMENT_MODEL_DIR. Every host must see the same output folder (--output-dir,
+# default the project's output/), which holds urls.csv, the tag CSVs and the run ledger.
+# Scoring rewrites the whole CSV, so a score_file job and a scrape storing into the same
+# file take turns on its FileLock (def_file_lock).
+
+
+def default_output_dir():
+    from pyprojroot import here
+
+    return str(here("output"))
+
+
+def enqueue_scrape(queue, year, tags=None, output_dir=None):
+    """Adds one scrape_url job per lookup row for `year`. Returns the number added."""
+    import pandas as pd
+
+    urls = pd.read_csv(Path(output_dir or default_output_dir()) / "urls.csv")
+    rows = urls[urls["env_suffix"].astype(str) == str(year)]
+    if tags:
+        rows = rows[rows["tag"].isin(tags)]
+    added = 0
+    for tag in rows["tag"]:
+        added += queue.enqueue(
+            "scrape_url", {"year": str(year), "tag": tag}, key=f"scrape:{year}:{tag}"
+        )
+    return added
+
+
+def enqueue_score(queue, output_dir=None):
+    """Adds (or re-opens) a score_file job for every CSV with unscored rows."""
+    from def_pending_work import find_pending_files
+
+    output_dir = output_dir or default_output_dir()
+    added = 0
+    for filename in find_pending_files(output_dir, {"urls.csv", "log.txt"}):
+        added += queue.enqueue(
+            "score_file", {"file": filename}, key=f"score:{filename}", requeue=True
+        )
+    return added
+
+
+class JobRunner:
+    """
+    Runs claimed jobs in this process, loading the sentiment model on first use. Scrape
+    jobs use `pool` if given (default: a pool of the .env accounts per job).
+    """
+
+    def __init__(self, output_dir, model_dir=None, pool=None):
+        self.output_dir = output_dir
+        self.model_dir = model_dir
+        self.pool = pool
+        self.sentiment_pipeline = None
+
+    def run(self, job):
+        handler = getattr(self, f"run_{job['kind']}", None)
+        if handler is None:
+            raise ValueError(f"Unknown job kind '{job['kind']}'")
+        return handler(**job["payload"])
+
+    def run_scrape_url(self, year, tag):
+        from def_process_year import process_year
+
+        yields = process_year(year, tags=[tag], output_dir=self.output_dir, pool=self.pool)
+        if yields.get(tag) is None:
+            raise RuntimeError(f"Scrape of {tag} failed (see the run ledger)")
+        return {"tweets_new": int(yields[tag])}
+
+    def run_score_file(self, file):
+        from sentiment_cron import (
+            get_offline_pipeline,
+            stream_update_csv,
+            sweeper_sentiment_analysis,
+        )
+
+        if self.sentiment_pipeline is None:
+            if not self.model_dir or not Path(self.model_dir).exists():
+                raise FileNotFoundError(f"Model folder not found: {self.model_dir}")
+            self.sentiment_pipeline = get_offline_pipeline(Path(self.model_dir))
+            if self.sentiment_pipeline is None:
+                raise RuntimeError("Failed to load the sentiment pipeline")
+        # SENTIMENT_STREAM=1 scores big files in chunks, as sentiment_cron --stream does
+        score = (
+            stream_update_csv
+            if os.getenv("SENTIMENT_STREAM", "") == "1"
+            else sweeper_sentiment_analysis
+        )
+        csv_path = os.path.join(self.output_dir, file)
+        # Held from read to write, so a scrape storing into the file meanwhile waits
+        # instead of having its rows overwritten by this job's older copy
+        with FileLock(csv_path):
+            updated = score(csv_path, self.sentiment_pipeline)
+        if updated is None:
+            raise RuntimeError(f"Could not score {file}")
+        # The scorers count with pandas (numpy.int64, which json cannot serialise)
+        return {"rows_scored": int(updated)}
+
+
+def work(
+    queue,
+    runner,
+    kinds=None,
+    lease_seconds=DEFAULT_LEASE_SECONDS,
+    exit_when_idle=False,
+    poll_interval=30,
+    max_jobs=None,
+):
+    """Claims and runs jobs until the queue is empty (with exit_when_idle) or max_jobs."""
+    worker = worker_name()
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = queue.claim(worker, kinds=kinds, lease_seconds=lease_seconds)
+        if job is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+        print(
+            f"[{worker}] Job {job['id']} {job['kind']} {job['payload']} "
+            f"(attempt {job['attempt']})"
+        )
+        start = time.time()
+        try:
+            with Heartbeat(queue, job["id"], worker, lease_seconds):
+                result = runner.run(job)
+            queue.complete(job["id"], worker, result)
+            elapsed = time.time() - start
+            print(f"[{worker}] Job {job['id']} done in {elapsed:.0f}s: {result}")
+        except LeaseLostError as e:
+            print(f"[{worker}] {e}; result discarded.")
+        except Exception as e:
+            print(f"[{worker}] Job {job['id']} failed: {type(e).__name__}: {e}")
+            try:
+                queue.fail(job["id"], worker, f"{type(e).__name__}: {e}")
+            except LeaseLostError:
+                pass
+        done += 1
+        print_progress(queue)
+    return done
+
+
+def print_progress(queue):
+    for kind, counts in sorted(queue.progress().items()):
+        total = sum(counts.values())
+        finished = counts["done"] + counts["failed"]
+        print(
+            f"{kind}: {finished}/{total} finished ({counts['done']} done, "
+            f"{counts['failed']} failed), {counts['leased']} running, "
+            f"{counts['pending']} pending"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distributed scrape/score worker.")
+    parser.add_argument("--queue", default=None, help="Queue file (JOB_QUEUE_PATH)")
+    parser.add_argument("--output-dir", default=None, help="Folder of per-tag CSVs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scrape = commands.add_parser("enqueue-scrape", help="Queue one job per lookup row")
+    scrape.add_argument("--year", required=True)
+    scrape.add_argument("--tags", nargs="*")
+
+    commands.add_parser("enqueue-score", help="Queue one job per CSV with unscored rows")
+
+    work_parser = commands.add_parser("work", help="Claim and run jobs")
+    work_parser.add_argument("--kinds", nargs="*", choices=["scrape_url", "score_file"])
+    work_parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    work_parser.add_argument("--exit-when-idle", action="store_true")
+    work_parser.add_argument("--max-jobs", type=int)
+    work_parser.add_argument(
+        "--model-dir", default=os.getenv("SENTIMENT_MODEL_DIR"), help="Sentiment model"
+    )
+
+    commands.add_parser("status", help="Show queue progress and running jobs")
+    args = parser.parse_args()
+
+    queue = JobQueue(args.queue)
+    output_dir = args.output_dir or default_output_dir()
+    try:
+        if args.command == "enqueue-scrape":
+            added = enqueue_scrape(queue, args.year, args.tags, output_dir)
+            print(f"Queued {added} scrape jobs.")
+        elif args.command == "enqueue-score":
+            print(f"Queued {enqueue_score(queue, output_dir)} score jobs.")
+        elif args.command == "work":
+            runner = JobRunner(output_dir, model_dir=args.model_dir)
+            count = work(
+                queue,
+                runner,
+                kinds=args.kinds,
+                lease_seconds=args.lease_seconds,
+                exit_when_idle=args.exit_when_idle,
+                max_jobs=args.max_jobs,
+            )
+            print(f"Worker finished after {count} jobs.")
+        else:
+            print_progress(queue)
+            for job_id, kind, owner, left in queue.active_leases():
+                print(f"  job {job_id} ({kind}) on {owner}, lease {left:.0f}s left")
+    finally:
+        queue.close()
@@ -0,0 +1,56 @@
+import argparse
+import time
+from pyprojroot import here
+
+from def_engagement_refresh import refresh_engagement, select_refresh_candidates
+from def_run_ledger import append_ledger_entry, new_run_id, new_url_metrics
+
+# Refreshes Likes/Retweets/Replies of recently stored tweets without re-running the
+# searches: each known status page is revisited in one browser session, youngest first.
+# Usage: python refresh_cron.py [--max-age-days 14] [--limit 200] [--rate 20]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh engagement counts in place.")
+    parser.add_argument("--output-dir", default=str(here("output")))
+    parser.add_argument(
+        "--max-age-days", type=float, default=14, help="Only refresh tweets this recent"
+    )
+    parser.add_argument("--limit", type=int, default=200, help="Statuses per run")
+    parser.add_argument("--rate", type=float, default=20, help="Page loads per minute")
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument(
+        "--mode",
+        choices=["dom", "network"],
+        default=None,
+        help="How counts are read (default: REFRESH_MODE, else network)",
+    )
+    parser.add_argument("--runtime-minutes", type=float, default=60)
+    args = parser.parse_args()
+
+    candidates = select_refresh_candidates(
+        args.output_dir, max_age_days=args.max_age_days, limit=args.limit
+    )
+    print(f"Selected {len(candidates)} statuses to refresh.")
+    if not candidates:
+        raise SystemExit(0)
+
+    metrics = new_url_metrics(new_run_id(), "engagement_refresh", None)
+    try:
+        refresh_engagement(
+            candidates,
+            args.output_dir,
+            rate_per_minute=args.rate,
+            batch_size=args.batch_size,
+            mode=args.mode,
+            deadline=time.time() + args.runtime_minutes * 60,
+            metrics=metrics,
+        )
+    except Exception as e:
+        metrics["failure_reason"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        append_ledger_entry(metrics)
+    print(
+        f"Refreshed {metrics['statuses_refreshed']} statuses "
+        f"({metrics['statuses_missing']} missing), {metrics['rows_updated']} rows updated."
+    )
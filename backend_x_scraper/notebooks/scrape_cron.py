@@ -1,15 +1,19 @@
 import os
 import time
 from datetime import datetime, timedelta
+from functools import partial
 import pandas as pd
+from def_compound_query import compound_url, encode_members, search_term
 from def_process_year import process_year  # Your existing function
+from def_scheduler import YieldScheduler, run_scheduled
 
-# log the scheduler
-file = open(
-    r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\Python\monitor\output\log.txt",
-    "a",
-)
-file.write(f"{datetime.now()} - Scheduler started\n")
+# Search types combined into one OR search each in compound mode (SCRAPE_COMPOUND=1).
+# The account operators and the phrase variants are kept apart so neither query grows
+# long enough for X to start dropping results.
+COMPOUND_GROUPS = {
+    "accounts": ["hashtag", "from", "mention", "to"],
+    "phrases": ["phrase", "phrase_amp", "phrase_plus"],
+}
 
 
 def get_previous_week_range():
@@ -58,11 +62,53 @@ def construct_url(search_type, start_date, end_date):
     return url
 
 
-def update_lookup_csv():
+def compound_lookup(search_dict, current_year):
+    """
+    Replaces the per-type searches in `search_dict` ({tag: url}) with one OR search per
+    COMPOUND_GROUPS entry. Each compound row lists its member tags and their search terms
+    in a members column, which process_year uses to attribute tweets to the per-type tag
+    files. Search types not in any group keep their own row.
+
+    Returns:
+        list[dict]: Lookup rows with tag, url and members.
+    """
+    rows = []
+    grouped = set()
+    for group, search_types in COMPOUND_GROUPS.items():
+        member_tags = [f"{st}_{current_year}" for st in search_types]
+        member_tags = [tag for tag in member_tags if search_dict.get(tag)]
+        if not member_tags:
+            continue
+        grouped.update(member_tags)
+        rows.append(
+            {
+                "tag": f"compound_{group}_{current_year}",
+                "url": compound_url([search_dict[tag] for tag in member_tags]),
+                "members": encode_members(
+                    {tag: search_term(search_dict[tag]) for tag in member_tags}
+                ),
+            }
+        )
+    for tag, url in search_dict.items():
+        if tag not in grouped:
+            rows.append({"tag": tag, "url": url, "members": ""})
+    return rows
+
+
+def update_lookup_csv(compound=None, output_dir=None):
     """
     Builds a dynamic lookup of search tags and URLs using the previous week's date range,
     and saves it to the lookup CSV file used by process_year.
+
+    Args:
+        compound (bool, optional): Combine the searches into a few OR searches (see
+            compound_lookup) instead of one per search type, cutting the page loads and
+            scrolling per cycle. Defaults to the SCRAPE_COMPOUND environment variable.
+        output_dir (str or Path, optional): Folder to write urls.csv to (default: the
+            workspace's output/).
     """
+    if compound is None:
+        compound = os.getenv("SCRAPE_COMPOUND", "0") == "1"
     start_date, end_date = get_previous_week_range()
     current_year = str(datetime.now().year)
     search_types = [
@@ -83,15 +129,19 @@ def update_lookup_csv():
         search_dict[tag] = url
 
     # Create a DataFrame with the lookup information
-    df = pd.DataFrame(list(search_dict.items()), columns=["tag", "url"])
+    if compound:
+        df = pd.DataFrame(compound_lookup(search_dict, current_year))
+    else:
+        df = pd.DataFrame(list(search_dict.items()), columns=["tag", "url"])
     df["env_suffix"] = current_year  # This column is used by process_year
 
     # Determine the output directory (assumed to be at the workspace root)
-    try:
-        workspace_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-    except NameError:
-        workspace_root = os.getcwd()
-    output_dir = os.path.join(workspace_root, "output")
+    if output_dir is None:
+        try:
+            workspace_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        except NameError:
+            workspace_root = os.getcwd()
+        output_dir = os.path.join(workspace_root, "output")
     os.makedirs(output_dir, exist_ok=True)
 
     output_path = os.path.join(output_dir, "urls.csv")
@@ -103,6 +153,17 @@ def update_lookup_csv():
 
 
 if __name__ == "__main__":
+    # log the scheduler (opened here, so importing this module's helpers, as
+    # pipeline.py does, neither opens the log nor records a scheduler start)
+    file = open(
+        os.getenv(
+            "SCRAPE_LOG_PATH",
+            r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\Python\monitor\output\log.txt",
+        ),
+        "a",
+    )
+    file.write(f"{datetime.now()} - Scheduler started\n")
+
     # Testing functions
     print("Testing get_previous_week_range()")
     start_date, end_date = get_previous_week_range()
@@ -135,15 +196,20 @@ if __name__ == "__main__":
         print("urls.csv not found.")
 
     # Automatically proceed to main loop
-    runtime_seconds = 2 * 3600  # Run for 3 hours (in seconds)
-    script_start = time.time()
+    runtime_seconds = 2 * 3600  # Run for at most 2 hours (in seconds)
     current_year = str(datetime.now().year)
 
-    while time.time() - script_start < runtime_seconds:
-        print(f"\nRunning process_year for env_suffix {current_year}...")
-        try:
-            process_year(current_year)
-        except Exception as e:
-            print(f"Error in process_year: {e}")
-        print("Sleeping for 10 minutes before next iteration...")
-        time.sleep(600)
+    # Tags that keep producing new tweets are revisited every 10 minutes; tags that come
+    # back empty back off exponentially, and the loop ends early once all have converged.
+    # The 15-day windows overlap from run to run, so each pass scrapes incrementally:
+    # Latest timeline, stopping as soon as it reaches tweets that are already stored.
+    lookup_tags = pd.read_csv(output_csv)["tag"].tolist()
+    scheduler = YieldScheduler(lookup_tags, base_interval=600, max_interval=3600)
+    run_scheduled(
+        current_year,
+        scheduler,
+        time.time() + runtime_seconds,
+        partial(process_year, incremental=True),
+    )
+    file.write(f"{datetime.now()} - Scheduler finished\n{scheduler.summary()}\n")
+    file.close()
@@ -1,5 +1,9 @@
 from datetime import datetime, time
+import pandas as pd
+from pathlib import Path
+from pyprojroot import here
 from def_process_year import process_year
+from def_scheduler import YieldScheduler, run_scheduled
 
 
 def is_before_5pm():
@@ -7,10 +11,20 @@ def is_before_5pm():
     return now.time() < time(17, 0)
 
 
+def five_pm_today():
+    """Returns today's 5pm as a Unix timestamp (the scraping deadline)."""
+    return datetime.combine(datetime.now().date(), time(17, 0)).timestamp()
+
+
 if __name__ == "__main__":
     year = "2020"  # Change to the desired year
-    while is_before_5pm():
-        process_year(year)
+    urls = pd.read_csv(Path(str(here("output"))) / "urls.csv")
+    year_tags = urls.loc[urls["env_suffix"].astype(str) == year, "tag"].tolist()
+
+    # Re-scrape tags while they still yield new tweets; stop at 5pm or once all converge.
+    scheduler = YieldScheduler(year_tags, base_interval=60, max_interval=1800)
+    if is_before_5pm():
+        run_scheduled(year, scheduler, five_pm_today(), process_year)
 
 
 # 2025 first ran on 27th February 2025
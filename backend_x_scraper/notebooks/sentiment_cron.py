@@ -1,12 +1,20 @@
+import argparse
 import os
 import re
-import pandas as pd
-import torch
 from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
 from datetime import datetime
 import gc  # Garbage Collector for potentially large dataframes
 
+from def_file_lock import FileLock
+from def_pending_work import INVALID_TEXTS, MISSING_SENTIMENT, find_pending_files
+from def_profiling import StageProfiler
+
+# pandas, torch and transformers are imported lazily inside the functions that need them,
+# so a cron tick with nothing to score exits before paying several seconds of imports.
+
+# Rows per chunk in streaming mode (--stream); peak memory scales with this.
+STREAM_CHUNK_ROWS = int(os.getenv("SENTIMENT_CHUNK_ROWS", 50000))
+
 
 def parse_date_window_from_urls(url_csv_path):
     """
@@ -15,6 +23,8 @@ def parse_date_window_from_urls(url_csv_path):
     Returns (start_date, end_date) as strings in 'YYYY-MM-DD' format, or (None, None)
     if something goes wrong.
     """
+    import pandas as pd
+
     print(f"[DEBUG] Attempting to parse date window from {url_csv_path}")
     if not os.path.exists(url_csv_path):
         print(f"[WARNING] {url_csv_path} not found. No date window extracted.")
@@ -53,36 +63,46 @@ def parse_date_window_from_urls(url_csv_path):
         return None, None
 
 
-def get_offline_pipeline(model_folder: Path):
+def get_offline_pipeline(model_folder: Path, profiler=None):
     """
     Loads a local sentiment-analysis pipeline (tokenizer + PyTorch model)
     strictly from local files in 'model_folder'. Falls back to CPU if CUDA is not available.
     """
+    import torch
+    from transformers import (
+        AutoTokenizer,
+        AutoModelForSequenceClassification,
+        pipeline,
+    )
+
+    profiler = profiler or StageProfiler()
     device = "cuda" if torch.cuda.is_available() else "cpu"
     print(f"[INFO] Using device: {device}")
+    profiler.set_info(device=device, model_folder=str(model_folder))
 
     try:
         local_dir = str(model_folder)
         print(f"[DEBUG] Loading tokenizer and model from {local_dir}")
         # Ensure cache is not used if files might change, though local_files_only should handle this
         # cache_dir = os.path.join(local_dir, "hf_cache")
-        tokenizer = AutoTokenizer.from_pretrained(
-            local_dir, local_files_only=True
-        )  # , cache_dir=cache_dir)
-        model = AutoModelForSequenceClassification.from_pretrained(
-            local_dir,
-            local_files_only=True,
-            from_tf=False,  # , cache_dir=cache_dir
-        )
+        with profiler.stage("model_load"):
+            tokenizer = AutoTokenizer.from_pretrained(
+                local_dir, local_files_only=True
+            )  # , cache_dir=cache_dir)
+            model = AutoModelForSequenceClassification.from_pretrained(
+                local_dir,
+                local_files_only=True,
+                from_tf=False,  # , cache_dir=cache_dir
+            )
 
-        sentiment_pipe = pipeline(
-            "text-classification",
-            model=model,
-            tokenizer=tokenizer,
-            device=0
-            if device == "cuda"
-            else -1,  # Use device index 0 for CUDA, -1 for CPU
-        )
+            sentiment_pipe = pipeline(
+                "text-classification",
+                model=model,
+                tokenizer=tokenizer,
+                device=0
+                if device == "cuda"
+                else -1,  # Use device index 0 for CUDA, -1 for CPU
+            )
         print("[DEBUG] Sentiment pipeline created successfully.")
         return sentiment_pipe
     except Exception as e:
@@ -90,11 +110,18 @@ def get_offline_pipeline(model_folder: Path):
         return None
 
 
-def safe_sentiment_analysis(pipe, text_list):
+def safe_sentiment_analysis(pipe, text_list, profiler=None):
     """
     Runs sentiment analysis with the pipeline, handling NaN/NULL/empty strings.
     Returns 'unknown' for invalid/empty text entries or pipeline errors.
+
+    When profiling is enabled the texts are also tokenised once up front so that
+    tokenisation time and token counts can be reported separately from the forward pass
+    (the pipeline re-tokenises internally, so this costs a little extra time).
     """
+    import pandas as pd
+
+    profiler = profiler or StageProfiler()
     if not text_list:  # Handle empty input list
         return []
 
@@ -115,6 +142,15 @@ def safe_sentiment_analysis(pipe, text_list):
     labels = ["unknown"] * len(text_list)
 
     if texts_to_process:
+        profiler.count("texts", len(texts_to_process))
+        if profiler.enabled:
+            try:
+                with profiler.stage("tokenize"):
+                    encoded = pipe.tokenizer(texts_to_process, truncation=True)
+                profiler.count("tokens", sum(len(ids) for ids in encoded["input_ids"]))
+            except Exception as e:
+                print(f"[WARNING] Profiling tokenisation failed: {e}")
+
         try:
             # Process in batches if list is very large (optional, adjust batch_size as needed)
             # batch_size = 64
@@ -123,7 +159,8 @@ def safe_sentiment_analysis(pipe, text_list):
             #     batch = texts_to_process[i:i + batch_size]
             #     results_raw.extend(pipe(batch))
 
-            results_raw = pipe(texts_to_process)  # Process all at once if memory allows
+            with profiler.stage("forward"):
+                results_raw = pipe(texts_to_process)  # Process all at once if memory allows
 
             # Map results back to their original positions
             for original_index, result in zip(indices_to_process, results_raw):
@@ -143,6 +180,7 @@ def partial_update_csv(
     start_date: str,
     end_date: str,
     date_col="Created At",
+    profiler=None,
 ):
     """
     (First Pass) Updates sentiment values for rows in the CSV file that:
@@ -151,6 +189,9 @@ def partial_update_csv(
 
     Always saves back to the original CSV file. Returns rows updated count or None on failure.
     """
+    import pandas as pd
+
+    profiler = profiler or StageProfiler()
     print(
         f"[INFO] First Pass Processing: {os.path.basename(csv_path)} (Date Window: {start_date}-{end_date})"
     )
@@ -161,7 +202,8 @@ def partial_update_csv(
         return None
 
     try:
-        df = pd.read_csv(csv_path)
+        with profiler.stage("csv_read"):
+            df = pd.read_csv(csv_path)
         print(f"[DEBUG] Read {len(df)} rows for first pass.")
     except Exception as e:
         print(f"[ERROR] Could not read file {csv_path}: {e}")
@@ -233,12 +275,15 @@ def partial_update_csv(
             f"[INFO] First Pass: Analyzing sentiment for {rows_to_update} rows within date window..."
         )
         texts_to_analyze = df.loc[mask_update_final, "Text"].tolist()
-        sentiment_labels = safe_sentiment_analysis(sentiment_pipeline, texts_to_analyze)
+        sentiment_labels = safe_sentiment_analysis(
+            sentiment_pipeline, texts_to_analyze, profiler=profiler
+        )
         df.loc[mask_update_final, "sentiment"] = sentiment_labels
         rows_updated_count = rows_to_update
 
         try:
-            df.to_csv(csv_path, index=False)
+            with profiler.stage("csv_write"):
+                df.to_csv(csv_path, index=False)
             print(
                 f"[INFO] First Pass: Successfully updated {rows_updated_count} rows in {os.path.basename(csv_path)}"
             )
@@ -254,12 +299,15 @@ def partial_update_csv(
     return rows_updated_count
 
 
-def sweeper_sentiment_analysis(csv_path: str, sentiment_pipeline):
+def sweeper_sentiment_analysis(csv_path: str, sentiment_pipeline, profiler=None):
     """
     (Sweeper Pass) Updates sentiment for *any* remaining rows with missing
     sentiment ('NA' or 'unknown') AND valid text, regardless of date.
     Saves back to the original CSV. Returns count of rows updated in this pass.
     """
+    import pandas as pd
+
+    profiler = profiler or StageProfiler()
     print(f"[INFO] Sweeper Pass Processing: {os.path.basename(csv_path)}")
     rows_updated_count = 0
 
@@ -269,7 +317,8 @@ def sweeper_sentiment_analysis(csv_path: str, sentiment_pipeline):
 
     try:
         # Read the potentially updated file from the first pass
-        df = pd.read_csv(csv_path)
+        with profiler.stage("csv_read"):
+            df = pd.read_csv(csv_path)
         print(f"[DEBUG] Read {len(df)} rows for sweeper pass.")
     except Exception as e:
         print(f"[ERROR] Sweeper Pass: Could not read file {csv_path}: {e}")
@@ -307,12 +356,15 @@ def sweeper_sentiment_analysis(csv_path: str, sentiment_pipeline):
             f"[INFO] Sweeper Pass: Analyzing sentiment for {rows_to_update} remaining rows..."
         )
         texts_to_analyze = df.loc[mask_update_final, "Text"].tolist()
-        sentiment_labels = safe_sentiment_analysis(sentiment_pipeline, texts_to_analyze)
+        sentiment_labels = safe_sentiment_analysis(
+            sentiment_pipeline, texts_to_analyze, profiler=profiler
+        )
         df.loc[mask_update_final, "sentiment"] = sentiment_labels
         rows_updated_count = rows_to_update
 
         try:
-            df.to_csv(csv_path, index=False)
+            with profiler.stage("csv_write"):
+                df.to_csv(csv_path, index=False)
             print(
                 f"[INFO] Sweeper Pass: Successfully updated {rows_updated_count} rows in {os.path.basename(csv_path)}"
             )
@@ -328,8 +380,148 @@ def sweeper_sentiment_analysis(csv_path: str, sentiment_pipeline):
     return rows_updated_count
 
 
-def calculate_final_stats(csv_path: str):
-    """Reads a CSV and calculates final sentiment statistics."""
+def stream_update_csv(
+    csv_path: str,
+    sentiment_pipeline,
+    start_date=None,
+    end_date=None,
+    date_col="Created At",
+    chunk_rows=STREAM_CHUNK_ROWS,
+    profiler=None,
+):
+    """
+    Streaming version of partial_update_csv (with a date window) and
+    sweeper_sentiment_analysis (without one), for files too big to hold in memory.
+
+    The CSV is read `chunk_rows` rows at a time; each chunk's missing sentiment is
+    scored and the chunk is appended to a temporary file next to the original, which
+    replaces it (os.replace) once every chunk has been written. Peak memory therefore
+    depends on the chunk size, not the file size, and a run that fails part-way leaves
+    the original untouched. Values are read and written back as text, so nothing else
+    in the file changes. Returns rows updated, or None on failure.
+    """
+    import pandas as pd
+
+    profiler = profiler or StageProfiler()
+    print(
+        f"[INFO] Streaming Pass: {os.path.basename(csv_path)} "
+        f"(Date Window: {start_date}-{end_date}, {chunk_rows} rows per chunk)"
+    )
+    if not os.path.exists(csv_path):
+        print(f"[WARNING] File not found: {csv_path}")
+        return None
+
+    start_dt = pd.to_datetime(start_date) if start_date and end_date else None
+    end_dt = pd.to_datetime(end_date) if start_date and end_date else None
+    tmp_path = f"{csv_path}.tmp"
+    rows_updated_count = 0
+    rows_read = 0
+    try:
+        reader = pd.read_csv(
+            csv_path,
+            dtype=str,
+            keep_default_na=False,
+            na_values=[""],
+            chunksize=chunk_rows,
+        )
+        with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+            for chunk_index, chunk in enumerate(reader):
+                rows_read += len(chunk)
+                if "Text" not in chunk.columns:
+                    print("[WARNING] Streaming Pass: Skipping - No 'Text' column found.")
+                    out.close()
+                    os.remove(tmp_path)
+                    return 0
+                if "sentiment" not in chunk.columns:
+                    chunk["sentiment"] = pd.NA
+
+                sentiment = chunk["sentiment"].fillna("").str.strip()
+                text = chunk["Text"].fillna("").str.strip()
+                mask = sentiment.isin(MISSING_SENTIMENT) & ~text.isin(INVALID_TEXTS)
+                if start_dt is not None and date_col in chunk.columns:
+                    dates = pd.to_datetime(
+                        chunk[date_col], errors="coerce", utc=True
+                    ).dt.tz_convert(None)
+                    mask &= dates.between(start_dt, end_dt, inclusive="both")
+
+                if mask.any():
+                    chunk.loc[mask, "sentiment"] = safe_sentiment_analysis(
+                        sentiment_pipeline,
+                        chunk.loc[mask, "Text"].tolist(),
+                        profiler=profiler,
+                    )
+                    rows_updated_count += int(mask.sum())
+                with profiler.stage("csv_write"):
+                    chunk.to_csv(out, header=chunk_index == 0, index=False)
+                del chunk, sentiment, text, mask
+    except Exception as e:
+        print(f"[ERROR] Streaming Pass: Failed on {csv_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+
+    if rows_updated_count == 0:
+        # Leave the original (and its mtime) alone when nothing was scored
+        os.remove(tmp_path)
+        print("[INFO] Streaming Pass: No rows needed updating.")
+        return 0
+    os.replace(tmp_path, csv_path)
+    print(
+        f"[INFO] Streaming Pass: Updated {rows_updated_count} of {rows_read} rows "
+        f"in {os.path.basename(csv_path)}"
+    )
+    gc.collect()
+    return rows_updated_count
+
+
+def _add_final_stats(stats, df):
+    """Adds the sentiment counts of one frame (a whole file or a chunk) to `stats`."""
+    import pandas as pd
+
+    total_rows = len(df)
+    stats["total_rows"] += total_rows
+    if total_rows == 0:
+        return
+
+    if "sentiment" not in df.columns:
+        # If sentiment column doesn't exist after all passes, none have sentiment
+        stats["rows_without_sentiment"] += total_rows
+        if "Text" not in df.columns:
+            # If Text also doesn't exist, all without sentiment are due to missing Text
+            stats["rows_without_sentiment_na_text"] += total_rows
+        else:
+            # Calculate how many had NA/empty text
+            mask_na_text = df["Text"].isna() | df["Text"].astype(str).str.strip().eq("")
+            stats["rows_without_sentiment_na_text"] += int(mask_na_text.sum())
+        return
+
+    # Calculate final state
+    sentiment = df["sentiment"].astype(object).where(df["sentiment"].notna(), pd.NA)
+    mask_has_sentiment = sentiment.notna() & (sentiment != "unknown")
+    rows_with_sentiment = int(mask_has_sentiment.sum())
+    stats["rows_with_sentiment"] += rows_with_sentiment
+    stats["rows_without_sentiment"] += total_rows - rows_with_sentiment
+
+    if rows_with_sentiment < total_rows:
+        mask_no_sentiment = ~mask_has_sentiment
+        # Check for NA/empty text only among those *still* without sentiment
+        if "Text" in df.columns:
+            mask_na_text = df["Text"].isna() | df["Text"].astype(str).str.strip().eq("")
+            stats["rows_without_sentiment_na_text"] += int(
+                (mask_no_sentiment & mask_na_text).sum()
+            )
+        else:
+            # If Text column missing, all without sentiment count as NA text reason
+            stats["rows_without_sentiment_na_text"] += total_rows - rows_with_sentiment
+
+
+def calculate_final_stats(csv_path: str, chunk_rows=None):
+    """
+    Reads a CSV and calculates final sentiment statistics. With `chunk_rows` the file
+    is read that many rows at a time, as in stream_update_csv.
+    """
+    import pandas as pd
+
     stats = {
         "total_rows": 0,
         "rows_with_sentiment": 0,
@@ -337,52 +529,13 @@ def calculate_final_stats(csv_path: str):
         "rows_without_sentiment_na_text": 0,
     }
     try:
-        df = pd.read_csv(csv_path)
-        stats["total_rows"] = len(df)
-        if stats["total_rows"] == 0:
-            return stats  # Empty file
-
-        if "sentiment" not in df.columns:
-            # If sentiment column doesn't exist after all passes, none have sentiment
-            stats["rows_without_sentiment"] = stats["total_rows"]
-            if "Text" not in df.columns:
-                # If Text also doesn't exist, all without sentiment are due to missing Text
-                stats["rows_without_sentiment_na_text"] = stats["total_rows"]
-            else:
-                # Calculate how many had NA/empty text
-                mask_na_text = df["Text"].isna() | df["Text"].astype(
-                    str
-                ).str.strip().eq("")
-                stats["rows_without_sentiment_na_text"] = mask_na_text.sum()
-            return stats
-
-        # Calculate final state
-        df["sentiment"] = (
-            df["sentiment"].astype(object).where(df["sentiment"].notna(), pd.NA)
-        )
-        mask_has_sentiment = df["sentiment"].notna() & (df["sentiment"] != "unknown")
-        stats["rows_with_sentiment"] = mask_has_sentiment.sum()
-        stats["rows_without_sentiment"] = (
-            stats["total_rows"] - stats["rows_with_sentiment"]
-        )
-
-        if stats["rows_without_sentiment"] > 0:
-            mask_no_sentiment = ~mask_has_sentiment
-            # Check for NA/empty text only among those *still* without sentiment
-            if "Text" in df.columns:
-                mask_na_text = df["Text"].isna() | df["Text"].astype(
-                    str
-                ).str.strip().eq("")
-                stats["rows_without_sentiment_na_text"] = (
-                    mask_no_sentiment & mask_na_text
-                ).sum()
-            else:
-                # If Text column missing, all without sentiment count as NA text reason
-                stats["rows_without_sentiment_na_text"] = stats[
-                    "rows_without_sentiment"
-                ]
-
-        del df
+        if chunk_rows:
+            frames = pd.read_csv(csv_path, chunksize=chunk_rows)
+        else:
+            frames = [pd.read_csv(csv_path)]
+        for df in frames:
+            _add_final_stats(stats, df)
+            del df
         gc.collect()
         return stats
 
@@ -397,12 +550,76 @@ def calculate_final_stats(csv_path: str):
 #        MAIN
 # ====================
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nightly sentiment scoring job.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=os.getenv("SENTIMENT_PROFILE", "") == "1",
+        help="Time each stage and append a JSON summary to output/sentiment_profile.jsonl",
+    )
+    parser.add_argument(
+        "--output-dir",
+        default="../output/",
+        help="Folder holding the per-tag CSV files (default: ../output/)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        default=os.getenv("SENTIMENT_STREAM", "") == "1",
+        help="Read, score and rewrite each CSV in chunks (bounded memory for big files)",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=STREAM_CHUNK_ROWS,
+        help=f"Rows per chunk with --stream (default: {STREAM_CHUNK_ROWS})",
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        default=os.getenv("SENTIMENT_CASCADE", "") == "1",
+        help="Label confident texts with the cheap model (train_cascade.py) first",
+    )
+    parser.add_argument(
+        "--cascade-threshold",
+        type=float,
+        default=None,
+        help="Confidence the cheap label needs to skip the transformer (default: 0.9)",
+    )
+    parser.add_argument(
+        "--cascade-audit",
+        type=float,
+        default=float(os.getenv("SENTIMENT_CASCADE_AUDIT", 0.05)),
+        help="Share of cheap labels also checked against the transformer",
+    )
+    args = parser.parse_args()
+    profiler = StageProfiler(enabled=args.profile)
+
     start_time = datetime.now()
     print(f"[INFO] Starting script at {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
-    output_dir = "../output/"
+    output_dir = args.output_dir
     print(f"[INFO] Using output directory: {output_dir}")
 
+    # --- Pending-work check (stdlib only, before any heavy import) ---
+    ignore_files = {"urls.csv", "log.txt"}
+    try:
+        with profiler.stage("pending_check"):
+            pending_files = find_pending_files(output_dir, ignore_files)
+    except FileNotFoundError:
+        print(f"[ERROR] Output directory not found: {output_dir}. Exiting.")
+        exit(1)
+
+    if not pending_files:
+        print("[INFO] No rows are waiting for sentiment. Nothing to do.")
+        profiler.write(os.path.join(output_dir, "sentiment_profile.jsonl"))
+        exit(0)
+
+    with profiler.stage("import"):
+        import torch
+        import pandas  # noqa: F401  (warm the lazy imports used by the helpers)
+        import transformers  # noqa: F401
+
     urls_csv = os.path.join(output_dir, "urls.csv")
     start_date, end_date = parse_date_window_from_urls(urls_csv)
 
@@ -413,31 +630,60 @@ if __name__ == "__main__":
             "[INFO] No valid date window found - first pass will process all rows with missing sentiment"
         )
 
-    model_path_str = r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\R\vibe_check\backend_x_scraper\twitter-roberta-base-sentiment-latest"
+    model_path_str = os.getenv(
+        "SENTIMENT_MODEL_DIR",
+        r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\R\vibe_check\backend_x_scraper\twitter-roberta-base-sentiment-latest",
+    )
     model_folder = Path(model_path_str)
 
     if not model_folder.exists():
         print(f"[ERROR] Model folder not found: {model_path_str}. Exiting.")
         exit(1)
 
-    sentiment_pipeline = get_offline_pipeline(model_folder)
+    sentiment_pipeline = get_offline_pipeline(model_folder, profiler=profiler)
     if sentiment_pipeline is None:
         print("[ERROR] Failed to load sentiment pipeline. Exiting.")
         exit(1)
 
-    # --- File Discovery ---
-    ignore_files = {"urls.csv", "log.txt"}
-    try:
-        all_files = os.listdir(output_dir)
-    except FileNotFoundError:
-        print(f"[ERROR] Output directory not found: {output_dir}. Exiting.")
-        exit(1)
+    cascade = None
+    if args.cascade:
+        from def_sentiment_cascade import (
+            CASCADE_LABELS_FILE,
+            DEFAULT_THRESHOLD,
+            CascadePipeline,
+            CheapSentimentModel,
+            default_cascade_path,
+        )
 
-    csv_files = sorted(
-        [f for f in all_files if f.endswith(".csv") and f not in ignore_files]
-    )
+        cascade_path = default_cascade_path()
+        if cascade_path.exists():
+            with profiler.stage("cascade_load"):
+                cheap_model = CheapSentimentModel.load(cascade_path)
+            threshold = (
+                DEFAULT_THRESHOLD
+                if args.cascade_threshold is None
+                else args.cascade_threshold
+            )
+            cascade = CascadePipeline(
+                cheap_model,
+                sentiment_pipeline,
+                threshold,
+                audit_rate=args.cascade_audit,
+                labels_path=os.path.join(output_dir, CASCADE_LABELS_FILE),
+            )
+            sentiment_pipeline = cascade
+            print(f"[INFO] Cascade enabled ({cascade_path}, threshold {threshold}).")
+        else:
+            print(
+                f"[WARNING] No cascade model at {cascade_path} (run train_cascade.py); "
+                "scoring everything with the transformer."
+            )
+
+    # --- File Discovery ---
+    # Only files with rows still missing sentiment are read and scored.
+    csv_files = pending_files
     file_count = len(csv_files)
-    print(f"[INFO] Found {file_count} CSV files to process")
+    print(f"[INFO] Found {file_count} CSV files with pending sentiment to process")
 
     processed_files_pass1 = []
     failed_files_pass1 = []
@@ -449,13 +695,27 @@ if __name__ == "__main__":
         for idx, filename in enumerate(csv_files, start=1):
             print(f"\n[INFO] First Pass - File {idx}/{file_count}: {filename}")
             csv_path = os.path.join(output_dir, filename)
-            updated_count = partial_update_csv(
-                csv_path,
-                sentiment_pipeline,
-                start_date,
-                end_date,
-                date_col="Created At",
-            )
+            # Scrapers append to the same files; hold the lock from read to write
+            with FileLock(csv_path):
+                if args.stream:
+                    updated_count = stream_update_csv(
+                        csv_path,
+                        sentiment_pipeline,
+                        start_date,
+                        end_date,
+                        date_col="Created At",
+                        chunk_rows=args.chunk_rows,
+                        profiler=profiler,
+                    )
+                else:
+                    updated_count = partial_update_csv(
+                        csv_path,
+                        sentiment_pipeline,
+                        start_date,
+                        end_date,
+                        date_col="Created At",
+                        profiler=profiler,
+                    )
             if updated_count is not None:
                 processed_files_pass1.append(filename)
                 total_updated_pass1 += updated_count
@@ -481,7 +741,18 @@ if __name__ == "__main__":
                 f"\n[INFO] Sweeper Pass - File {idx}/{len(files_to_sweep)}: {filename}"
             )
             csv_path = os.path.join(output_dir, filename)
-            updated_count = sweeper_sentiment_analysis(csv_path, sentiment_pipeline)
+            with FileLock(csv_path):
+                if args.stream:
+                    updated_count = stream_update_csv(
+                        csv_path,
+                        sentiment_pipeline,
+                        chunk_rows=args.chunk_rows,
+                        profiler=profiler,
+                    )
+                else:
+                    updated_count = sweeper_sentiment_analysis(
+                        csv_path, sentiment_pipeline, profiler=profiler
+                    )
 
             if updated_count is not None:
                 processed_files_sweeper.append(filename)
@@ -513,7 +784,9 @@ if __name__ == "__main__":
         )
         for filename in files_for_final_stats:
             csv_path = os.path.join(output_dir, filename)
-            file_stats = calculate_final_stats(csv_path)
+            file_stats = calculate_final_stats(
+                csv_path, chunk_rows=args.chunk_rows if args.stream else None
+            )
             if file_stats:
                 final_agg_stats["files_analyzed_final"] += 1
                 final_agg_stats["total_rows"] += file_stats["total_rows"]
@@ -551,6 +824,9 @@ if __name__ == "__main__":
     if failed_files_sweeper:
         print(f"Files failed/skipped in Sweeper Pass: {len(failed_files_sweeper)}")
     print(f"Rows updated in Sweeper Pass: {total_updated_sweeper}")
+    if cascade is not None:
+        print(cascade.report())
+        profiler.set_info(cascade=dict(cascade.stats, threshold=cascade.threshold))
     print("-" * 75)
 
     if final_agg_stats["files_analyzed_final"] > 0:
@@ -591,6 +867,7 @@ if __name__ == "__main__":
         print("No CSV files were found to process.")
 
     print("=" * 75)
+    profiler.write(os.path.join(output_dir, "sentiment_profile.jsonl"))
     print("[INFO] Script complete.")
     # Clean up pipeline and release GPU memory if applicable
     del sentiment_pipeline
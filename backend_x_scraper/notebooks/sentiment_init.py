@@ -413,7 +413,10 @@ if __name__ == "__main__":
             "[INFO] No valid date window found - first pass will process all rows with missing sentiment"
         )
 
-    model_path_str = r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\R\vibe_check\backend_x_scraper\twitter-roberta-base-sentiment-latest"
+    model_path_str = os.getenv(
+        "SENTIMENT_MODEL_DIR",
+        r"C:\Users\TomHun\OneDrive - City & Guilds\Documents\Code\R\vibe_check\backend_x_scraper\twitter-roberta-base-sentiment-latest",
+    )
     model_folder = Path(model_path_str)
 
     if not model_folder.exists():
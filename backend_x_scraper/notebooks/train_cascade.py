@@ -0,0 +1,59 @@
+import argparse
+import time
+
+from pyprojroot import here
+
+from def_sentiment_cascade import (
+    CheapSentimentModel,
+    default_cascade_path,
+    holdout_split,
+    load_labelled_texts,
+    threshold_report,
+)
+
+# Trains the cheap first stage of the sentiment cascade (sentiment_cron.py --cascade)
+# on the labels RoBERTa has already written to the tag CSVs (skipping those the cascade
+# wrote itself, listed in output/sentiment_cascade_labels.txt), and reports, on a
+# held-out fifth of the texts, how many transformer calls each confidence threshold
+# would avoid and how often the cheap label agrees with the transformer's. The saved
+# model is then refitted on every labelled text.
+# Usage: python train_cascade.py [--thresholds 0.8 0.9 0.95] [--dry-run]
+# Retrain now and then as new scored tweets accumulate.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the cheap sentiment classifier.")
+    parser.add_argument("--output-dir", default=str(here("output")))
+    parser.add_argument("--model-path", default=str(default_cascade_path()))
+    parser.add_argument(
+        "--thresholds", nargs="*", type=float, default=[0.7, 0.8, 0.9, 0.95, 0.98]
+    )
+    parser.add_argument("--C", type=float, default=16.0, help="Inverse regularisation")
+    parser.add_argument("--dry-run", action="store_true", help="Report without saving")
+    args = parser.parse_args()
+
+    texts, labels = load_labelled_texts(args.output_dir)
+    print(f"Loaded {len(texts)} distinct labelled texts from {args.output_dir}.")
+    if not texts:
+        raise SystemExit("Nothing to train on; run sentiment_cron.py first.")
+
+    train_texts, train_labels, test_texts, test_labels = holdout_split(texts, labels)
+    start = time.perf_counter()
+    model = CheapSentimentModel(C=args.C).fit(train_texts, train_labels)
+    print(
+        f"Trained on {len(train_texts)} texts in {time.perf_counter() - start:.1f}s; "
+        f"evaluating on {len(test_texts)} held-out texts."
+    )
+    start = time.perf_counter()
+    rows = threshold_report(model, test_texts, test_labels, args.thresholds)
+    per_text_ms = 1000 * (time.perf_counter() - start) / max(len(test_texts), 1)
+    print(f"{'threshold':>10}{'avoided':>10}{'agreement':>11}{'overall':>10}")
+    for row in rows:
+        print(
+            f"{row['threshold']:>10.2f}{100 * row['avoided']:>9.1f}%"
+            f"{100 * row['agreement']:>10.1f}%{100 * row['overall']:>9.1f}%"
+        )
+    print(f"Cheap model: {per_text_ms:.3f} ms per text.")
+
+    if not args.dry_run:
+        CheapSentimentModel(C=args.C).fit(texts, labels).save(args.model_path)
+        print(f"Saved the cascade model to {args.model_path}.")